@@ -1,5 +1,7 @@
 from django.contrib.auth.models import BaseUserManager, AbstractUser
+from django.contrib.postgres.indexes import GinIndex, OpClass
 from django.db import models
+from django.db.models.functions import Upper
 from django.utils.translation import gettext_lazy as _
 from django.core.validators import RegexValidator
 
@@ -55,5 +57,12 @@ class User(AbstractUser):
 
     objects = UserManager()
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Username-Lookup und Admin-Suche (pg_trgm, passend zu icontains)
+            GinIndex(OpClass(Upper("username"), name="gin_trgm_ops"), name="accounts_user_username_trgm"),
+            GinIndex(OpClass(Upper("email"), name="gin_trgm_ops"), name="accounts_user_email_trgm"),
+        ]
+
     def __str__(self):
         return self.username or self.email
@@ -2,6 +2,9 @@ from django.contrib.auth import get_user_model, password_validation
 from django.db import IntegrityError
 from rest_framework import serializers
 
+from forum.blobs import store_upload
+from forum.media import ImageSizesMixin, register_image, strip_image_metadata
+
 User = get_user_model()
 
 
@@ -59,8 +62,9 @@ class RegisterSerializer(serializers.ModelSerializer):
 
 
 
-class MeSerializer(serializers.ModelSerializer):
+class MeSerializer(ImageSizesMixin, serializers.ModelSerializer):
     image_url = serializers.SerializerMethodField()
+    image_sizes = serializers.SerializerMethodField()
     username = serializers.CharField(
         required=False,
         allow_blank=False,
@@ -69,11 +73,13 @@ class MeSerializer(serializers.ModelSerializer):
 
     class Meta:
         model  = User
-        fields = ["id", "email", "username", "first_name", "last_name", "image", "image_url"]
+        fields = ["id", "email", "username", "first_name", "last_name", "image", "image_url", "image_sizes"]
         extra_kwargs = {
             "image": {"write_only": True, "required": False},
         }
 
+    image_size_sources = {"image_sizes": lambda user: user.image.url if user.image else None}
+
     def validate_username(self, value: str):
         username = value.strip()
         if not username:
@@ -91,6 +97,9 @@ class MeSerializer(serializers.ModelSerializer):
             return request.build_absolute_uri(url) if request else url
         return None
 
+    def get_image_sizes(self, obj):
+        return self.image_sizes(obj, obj.image.url if obj.image else None)
+
     def update(self, instance, validated_data):
         request = self.context.get("request")
         image = validated_data.pop("image", None)
@@ -104,9 +113,12 @@ class MeSerializer(serializers.ModelSerializer):
             setattr(instance, attr, val)
 
         if image is not None:
-            instance.image = image
+            # inhaltsadressiert statt avatars/<dateiname> (forum.blobs)
+            instance.image = store_upload(strip_image_metadata(image)).name
 
         instance.save()
+        if image is not None:
+            register_image(instance.image.name)
         return instance
 
 
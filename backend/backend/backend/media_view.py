@@ -1,28 +1,155 @@
 # backend/media_view.py
+import mimetypes
+import re
+import stat
 from pathlib import Path
 from django.conf import settings
-from django.http import FileResponse, Http404
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, parse_http_date_safe
 import logging
 
 logger = logging.getLogger("django.request")
 
+# Originale unter blobs/ (forum.blobs.blob_name, Name = SHA-256 des Inhalts)
+# ändern sich nie -> dürfen unbegrenzt gecacht werden. Ableitungen
+# (<hash>.<variante>.webp) nicht: process_images --reprocess überschreibt sie.
+HASHED_NAME_RE = re.compile(r"^blobs/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}(\.[a-z0-9]{1,5})?$")
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+_STREAM_BLOCK_SIZE = 64 * 1024
+
+
+def _etag(st) -> str:
+    return f'"{st.st_size:x}-{st.st_mtime_ns:x}"'
+
+
+def _parse_range(header: str, size: int):
+    """
+    Genau ein Bereich "bytes=a-b", "bytes=a-" oder "bytes=-n".
+    Gibt (start, end) inkl. end zurück, None bei nicht unterstützter
+    Syntax (-> ganze Datei) und "unsatisfiable" für Bereiche außerhalb.
+    """
+    match = _RANGE_RE.match(header.strip())
+    if not match or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if first == "":
+        length = int(last)
+        if length == 0:
+            return "unsatisfiable"
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        return "unsatisfiable"
+    return start, end
+
+
+def _if_range_matches(request, etag: str, last_modified: int) -> bool:
+    value = request.META.get("HTTP_IF_RANGE")
+    if not value:
+        return True
+    if value.startswith('"') or value.startswith("W/"):
+        return value == etag
+    since = parse_http_date_safe(value)
+    return since is not None and since >= last_modified
+
+
+def _read_range(path, start: int, length: int):
+    with open(path, "rb") as fh:
+        fh.seek(start)
+        while length > 0:
+            chunk = fh.read(min(_STREAM_BLOCK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
 
 def serve_media(request, path: str):
     """
     Servt Dateien unter MEDIA_ROOT, z.B. /media/post_images/foo.png
+    mit ETag/Last-Modified (304 auf If-None-Match/If-Modified-Since),
+    einem Byte-Bereich per Range (206/416) und Cache-Control – immutable
+    für Blob-Originale. MEDIA_SENDFILE überlässt die Auslieferung dem
+    Frontproxy (X-Accel-Redirect für nginx, X-Sendfile für Apache/lighttpd).
     """
     media_root = Path(settings.MEDIA_ROOT).resolve()
     full_path = (media_root / path).resolve()
 
     # Sicherheit: verhindert Path-Traversal (../../etc/passwd)
-    if not str(full_path).startswith(str(media_root)):
+    if not full_path.is_relative_to(media_root):
         logger.warning("Blocked media path traversal attempt: %s", full_path)
         raise Http404("Invalid path")
 
-    if not full_path.exists():
+    try:
+        st = full_path.stat()
+    except OSError:
+        st = None
+    if st is None or not stat.S_ISREG(st.st_mode):
         # wichtiger Log: wir sehen exakt, welchen Pfad Django nutzt
         logger.warning("Media file not found: %s", full_path)
         raise Http404("File not found")
 
+    etag = _etag(st)
+    last_modified = int(st.st_mtime)
+    content_type, encoding = mimetypes.guess_type(str(full_path))
+    if encoding or not content_type:
+        # z.B. .gz: als Download ausliefern, nicht als Content-Encoding
+        content_type = "application/octet-stream"
+
+    def finish(response):
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(last_modified)
+        response["Accept-Ranges"] = "bytes"
+        if HASHED_NAME_RE.search(path):
+            patch_cache_control(response, public=True, max_age=IMMUTABLE_MAX_AGE, immutable=True)
+        else:
+            patch_cache_control(response, public=True, max_age=settings.MEDIA_CACHE_SECONDS)
+        return response
+
+    # 304 bzw. 412 (If-Match/If-Unmodified-Since) ohne die Datei zu öffnen
+    conditional = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if conditional is not None:
+        return finish(conditional)
+
+    if settings.MEDIA_SENDFILE:
+        # Proxy liefert aus (inkl. Range), der Worker ist sofort wieder frei
+        response = HttpResponse(content_type=content_type)
+        relative = full_path.relative_to(media_root).as_posix()
+        if settings.MEDIA_SENDFILE == "x-accel":
+            response["X-Accel-Redirect"] = settings.MEDIA_ACCEL_REDIRECT_PREFIX + relative
+        else:
+            response["X-Sendfile"] = str(full_path)
+        return finish(response)
+
+    size = st.st_size
+    byte_range = None
+    range_header = request.META.get("HTTP_RANGE")
+    if range_header and _if_range_matches(request, etag, last_modified):
+        byte_range = _parse_range(range_header, size)
+
+    if byte_range == "unsatisfiable":
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{size}"
+        return finish(response)
+
+    if byte_range is not None:
+        start, end = byte_range
+        length = end - start + 1
+        body = () if request.method == "HEAD" else _read_range(full_path, start, length)
+        response = StreamingHttpResponse(body, status=206, content_type=content_type)
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+        response["Content-Length"] = str(length)
+        return finish(response)
+
+    if request.method == "HEAD":
+        response = HttpResponse(content_type=content_type)
+        response["Content-Length"] = str(size)
+        return finish(response)
+
     # Erfolgreiche Ausgabe
-    return FileResponse(open(full_path, "rb"))
+    response = FileResponse(open(full_path, "rb"), content_type=content_type)
+    return finish(response)
@@ -23,6 +23,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
 
     "rest_framework",
     "rest_framework_simplejwt.token_blacklist",
@@ -42,6 +43,7 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "forum.middleware.ServerTimingMiddleware",
 ]
 
 ROOT_URLCONF = "backend.urls"
@@ -74,6 +76,24 @@ DATABASES = {
     }
 }
 
+# Cache (Rollen, Antworten, Fragmente, Autocomplete): lokal locmem pro
+# Prozess, in Produktion geteilt – docker-compose.yml setzt
+# CACHE_BACKEND=django.core.cache.backends.redis.RedisCache mit
+# CACHE_LOCATION=redis://redis:6379/1; alternativ
+# django.core.cache.backends.memcached.PyMemcacheCache (Paket pymemcache)
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv("CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": os.getenv("CACHE_LOCATION", ""),
+    }
+}
+# Prozesslokale Backends sehen Invalidierungen anderer Worker nicht; Caches,
+# die davon abhängen (Rollen, Antworten), sind dann standardmäßig aus
+CACHE_SHARED = CACHES["default"]["BACKEND"] not in (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
 AUTH_USER_MODEL = "accounts.User"
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -95,6 +115,28 @@ STATICFILES_DIRS = [BASE_DIR / "static"] if (BASE_DIR / "static").exists() else
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# backend.media_view: Cache-Dauer für Dateien ohne Hash im Namen (z.B. Avatare)
+MEDIA_CACHE_SECONDS = int(os.getenv("MEDIA_CACHE_SECONDS", "3600"))
+# Auslieferung durch den Frontproxy: "" (Django streamt selbst),
+# "x-accel" (nginx, internal location unter MEDIA_ACCEL_REDIRECT_PREFIX)
+# oder "x-sendfile" (Apache mod_xsendfile/lighttpd, absoluter Pfad)
+MEDIA_SENDFILE = os.getenv("MEDIA_SENDFILE", "").lower()
+MEDIA_ACCEL_REDIRECT_PREFIX = os.getenv("MEDIA_ACCEL_REDIRECT_PREFIX", "/protected-media/")
+# forum.blobs: unreferenzierte Uploads erst nach dieser Zeit löschen
+# (Upload und Anlegen des Posts sind getrennte Requests)
+MEDIA_BLOB_GC_GRACE_HOURS = int(os.getenv("MEDIA_BLOB_GC_GRACE_HOURS", "24"))
+
+# Resumable Uploads (forum.uploads): Chunks liegen außerhalb von MEDIA_ROOT
+UPLOAD_CHUNK_DIR = os.getenv("UPLOAD_CHUNK_DIR", str(BASE_DIR / "upload_chunks"))
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(50 * 1024 * 1024)))
+# Summe der angekündigten Größen aller offenen Sessions pro User
+UPLOAD_USER_QUOTA_BYTES = int(os.getenv("UPLOAD_USER_QUOTA_BYTES", str(200 * 1024 * 1024)))
+UPLOAD_SESSION_TTL_HOURS = int(os.getenv("UPLOAD_SESSION_TTL_HOURS", "24"))
+# upload_post_images: Dateien pro Request und Threads für Dekodieren/Schreiben
+UPLOAD_MAX_FILES = int(os.getenv("UPLOAD_MAX_FILES", "20"))
+UPLOAD_WORKERS = int(os.getenv("UPLOAD_WORKERS", "4"))
+
 FRONTEND_URL = os.getenv("FRONTEND_URL",  "http://frontend:3000")
 
 CORS_ALLOW_ALL_ORIGINS = False
@@ -135,11 +177,70 @@ REST_FRAMEWORK = {
     "PAGE_SIZE": int(os.getenv("PAGE_SIZE", "10")),
 }
 
-if not DEBUG:
+# Format nach Accept bzw. Content-Type: JSON über orjson (forum.renderers,
+# forum.parsers), MessagePack (application/msgpack) für interne Aufrufe wie
+# das SSR des Frontends. Mit 0 nur DRFs JSON-Renderer/-Parser.
+FAST_CODECS_ENABLED = os.getenv("FAST_CODECS_ENABLED", "1") == "1"
+
+if FAST_CODECS_ENABLED:
+    REST_FRAMEWORK["DEFAULT_RENDERER_CLASSES"] = (
+        "forum.renderers.ORJSONRenderer",
+        "forum.renderers.MessagePackRenderer",
+    )
+    REST_FRAMEWORK["DEFAULT_PARSER_CLASSES"] = (
+        "forum.parsers.ORJSONParser",
+        "forum.parsers.MessagePackParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    )
+else:
     REST_FRAMEWORK["DEFAULT_RENDERER_CLASSES"] = (
         "rest_framework.renderers.JSONRenderer",
     )
 
+if DEBUG:
+    REST_FRAMEWORK["DEFAULT_RENDERER_CLASSES"] += (
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    )
+
+# Hintergrund-Tasks (forum.tasks): Thread-Pool pro Prozess
+BACKGROUND_WORKERS = int(os.getenv("BACKGROUND_WORKERS", "4"))
+BACKGROUND_TASKS_EAGER = os.getenv("BACKGROUND_TASKS_EAGER", "0") == "1"
+
+# Home-Feed: optionale Fan-out-on-write-Timelines (forum.feed)
+FEED_FANOUT_ENABLED = os.getenv("FEED_FANOUT_ENABLED", "0") == "1"
+# Communities mit mehr Mitgliedern werden beim Lesen gemischt (fan-out-on-read)
+FEED_FANOUT_MAX_MEMBERS = int(os.getenv("FEED_FANOUT_MAX_MEMBERS", "5000"))
+# Maximale Länge einer Timeline pro User (trim_feed_entries)
+FEED_TIMELINE_LENGTH = int(os.getenv("FEED_TIMELINE_LENGTH", "500"))
+
+# Typeahead /api/communities/autocomplete/: Cache-Dauer pro Eingabe
+AUTOCOMPLETE_CACHE_SECONDS = int(os.getenv("AUTOCOMPLETE_CACHE_SECONDS", "60"))
+
+# Antwort-Cache für anonyme Lesezugriffe (forum.response_cache). Die
+# Versionszähler müssen alle Worker sehen, daher standardmäßig nur mit
+# geteiltem Cache (CACHE_SHARED) an.
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "1" if CACHE_SHARED else "0") == "1"
+RESPONSE_CACHE_SECONDS = int(os.getenv("RESPONSE_CACHE_SECONDS", "30"))
+
+# Fragment-Cache pro Post/Kommentar (forum.fragments); Schlüssel enthält
+# updated_at, die Dauer begrenzt nur den Speicherbedarf
+FRAGMENT_CACHE_ENABLED = os.getenv("FRAGMENT_CACHE_ENABLED", "1") == "1"
+FRAGMENT_CACHE_SECONDS = int(os.getenv("FRAGMENT_CACHE_SECONDS", "3600"))
+
+# Listen von Posts/Kommentaren aus .values()-Projektionen statt über die
+# Serializer (forum.projections); Gleichheit prüft ProjectionParityTests
+PROJECTION_LISTS_ENABLED = os.getenv("PROJECTION_LISTS_ENABLED", "0") == "1"
+
+# POST /api/votes/batch/: maximale Anzahl Votes pro Request
+VOTE_BATCH_MAX = int(os.getenv("VOTE_BATCH_MAX", "200"))
+
+# Rollen-Cache (forum.roles) über Requests hinweg, nur mit geteiltem Cache:
+# sonst behielte ein entzogenes Mod-Recht in anderen Workern bis zu
+# ROLE_CACHE_SECONDS Gültigkeit. Ohne Cache lädt RoleResolver pro Request.
+ROLE_CACHE_ENABLED = os.getenv("ROLE_CACHE_ENABLED", "1" if CACHE_SHARED else "0") == "1"
+ROLE_CACHE_SECONDS = int(os.getenv("ROLE_CACHE_SECONDS", "300"))
+
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=int(os.getenv("JWT_ACCESS_MINUTES", "30"))),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=int(os.getenv("JWT_REFRESH_DAYS", "7"))),
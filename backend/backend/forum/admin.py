@@ -1,10 +1,10 @@
 # forum/admin.py
 
 from django.contrib import admin
-from django.db.models import Count, Q, Sum
 from django.utils.html import format_html
 from django.utils.text import Truncator
 
+from .counters import refresh_comment_counters, refresh_community_counters, refresh_post_counters
 from .models import (
     Community,
     Membership,
@@ -41,6 +41,50 @@ class CommentInline(admin.TabularInline):
 
 
 
+class CounterRefreshMixin:
+    """
+    Änderungen über den Admin (inkl. Inlines und Sammel-Löschen) laufen an
+    den inkrementellen Zählern (forum.counters) vorbei; danach werden die
+    betroffenen Communities/Posts neu berechnet. counter_targets(obj) liefert
+    (community_ids, post_ids), vor dem Speichern auch für den alten Stand
+    (z.B. Post in eine andere Community verschoben).
+    """
+
+    def counter_targets(self, obj):
+        raise NotImplementedError
+
+    def refresh_counters(self, targets):
+        community_ids, post_ids = set(), set()
+        for communities, posts in targets:
+            community_ids.update(communities)
+            post_ids.update(posts)
+        if post_ids:
+            refresh_post_counters(post_ids)
+            refresh_comment_counters(post_ids)
+        if community_ids:
+            refresh_community_counters(community_ids)
+
+    def save_model(self, request, obj, form, change):
+        old = type(obj).objects.filter(pk=obj.pk).first() if change else None
+        obj._counter_targets_before = [self.counter_targets(old)] if old else []
+        super().save_model(request, obj, form, change)
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        obj = form.instance
+        self.refresh_counters([*getattr(obj, "_counter_targets_before", []), self.counter_targets(obj)])
+
+    def delete_model(self, request, obj):
+        targets = [self.counter_targets(obj)]
+        super().delete_model(request, obj)
+        self.refresh_counters(targets)
+
+    def delete_queryset(self, request, queryset):
+        targets = [self.counter_targets(obj) for obj in queryset]
+        super().delete_queryset(request, queryset)
+        self.refresh_counters(targets)
+
+
 @admin.register(Community)
 class CommunityAdmin(admin.ModelAdmin):
     list_display = (
@@ -55,43 +99,27 @@ class CommunityAdmin(admin.ModelAdmin):
     list_filter = ("visibility", "created_at")
     search_fields = ("slug", "name", "description", "created_by__username", "created_by__email")
     ordering = ("-created_at",)
-    readonly_fields = ("created_at", "created_by")
+    readonly_fields = ("created_at", "created_by", "members_count", "posts_count")
     inlines = [MembershipInline]
     prepopulated_fields = {"slug": ("name",)}
     autocomplete_fields = ["created_by"]
 
-    def get_queryset(self, request):
-        qs = super().get_queryset(request)
-        return qs.annotate(
-            _members_count=Count(
-                "memberships",
-                filter=Q(
-                    memberships__role__in=[
-                        Membership.Role.MEMBER,
-                        Membership.Role.MODERATOR,
-                        Membership.Role.OWNER,
-                    ]
-                ),
-                distinct=True,
-            ),
-            _posts_count=Count(
-                "posts",
-                filter=Q(posts__is_deleted=False),
-                distinct=True,
-            ),
-        )
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        # Inline-Änderungen an Memberships laufen an den Zählern vorbei
+        refresh_community_counters([form.instance.pk])
 
-    @admin.display(description="Mitglieder", ordering="_members_count")
+    @admin.display(description="Mitglieder", ordering="members_count")
     def members_count_display(self, obj):
-        return obj._members_count
+        return obj.members_count
 
-    @admin.display(description="Beiträge", ordering="_posts_count")
+    @admin.display(description="Beiträge", ordering="posts_count")
     def posts_count_display(self, obj):
-        return obj._posts_count
+        return obj.posts_count
 
 
 @admin.register(Membership)
-class MembershipAdmin(admin.ModelAdmin):
+class MembershipAdmin(CounterRefreshMixin, admin.ModelAdmin):
     list_display = (
         "id",
         "community",
@@ -111,8 +139,11 @@ class MembershipAdmin(admin.ModelAdmin):
     autocomplete_fields = ["community", "user"]
     ordering = ("-created_at",)
 
+    def counter_targets(self, obj):
+        return [obj.community_id], []
+
 @admin.register(Post)
-class PostAdmin(admin.ModelAdmin):
+class PostAdmin(CounterRefreshMixin, admin.ModelAdmin):
     list_display = (
         "id",
         "title_short",
@@ -140,34 +171,27 @@ class PostAdmin(admin.ModelAdmin):
         "author__username",
         "author__email",
     )
-    readonly_fields = ("created_at", "updated_at")
+    readonly_fields = ("score", "upvotes", "downvotes", "comment_count", "created_at", "updated_at")
     autocomplete_fields = ["community", "author"]
     inlines = [PostImageInline, CommentInline]
     date_hierarchy = "created_at"
     ordering = ("-created_at",)
 
-    def get_queryset(self, request):
-        qs = super().get_queryset(request)
-        return qs.annotate(
-            _score=Sum("votes__value"),
-            _comment_count=Count(
-                "comments",
-                filter=Q(comments__is_deleted=False),
-                distinct=True,
-            ),
-        )
+    def counter_targets(self, obj):
+        # comment_count und Antwortzähler auch für Änderungen im CommentInline
+        return [obj.community_id], [obj.pk]
 
     @admin.display(description="Titel")
     def title_short(self, obj):
         return Truncator(obj.title).chars(60)
 
-    @admin.display(description="Score", ordering="_score")
+    @admin.display(description="Score", ordering="score")
     def score_display(self, obj):
-        return obj._score or 0
+        return obj.score
 
-    @admin.display(description="Kommentare", ordering="_comment_count")
+    @admin.display(description="Kommentare", ordering="comment_count")
     def comment_count_display(self, obj):
-        return obj._comment_count or 0
+        return obj.comment_count
 
 @admin.register(PostImage)
 class PostImageAdmin(admin.ModelAdmin):
@@ -213,7 +237,7 @@ class PostVoteAdmin(admin.ModelAdmin):
 
 
 @admin.register(Comment)
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(CounterRefreshMixin, admin.ModelAdmin):
     list_display = (
         "id",
         "post",
@@ -241,6 +265,9 @@ class CommentAdmin(admin.ModelAdmin):
     date_hierarchy = "created_at"
     ordering = ("-created_at",)
 
+    def counter_targets(self, obj):
+        return [], [obj.post_id]
+
     @admin.display(description="Community")
     def community_slug(self, obj):
         return obj.post.community.slug if obj.post and obj.post.community else "-"
@@ -0,0 +1,162 @@
+import hashlib
+import logging
+import os
+import re
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from .models import ImageAsset, MediaBlob, MediaReference
+
+logger = logging.getLogger(__name__)
+
+BLOB_PREFIX = "blobs/"
+_EXTENSION_RE = re.compile(r"^\.[a-z0-9]{1,5}$")
+
+
+def blob_name(digest: str, ext: str = "") -> str:
+    """Zwei Verzeichnisebenen aus dem Hash: blobs/ab/cd/abcd….jpg"""
+    return f"{BLOB_PREFIX}{digest[:2]}/{digest[2:4]}/{digest}{ext}"
+
+
+def hash_upload(file) -> tuple:
+    """(sha256, Größe) über file.chunks(), danach steht die Datei wieder am Anfang."""
+    h = hashlib.sha256()
+    size = 0
+    for chunk in file.chunks():
+        h.update(chunk)
+        size += len(chunk)
+    file.seek(0)
+    return h.hexdigest(), size
+
+
+def upload_extension(file) -> str:
+    ext = os.path.splitext(file.name or "")[1].lower()
+    return ext if _EXTENSION_RE.match(ext) else ""
+
+
+def claim_blob(digest: str, size: int, ext: str = "") -> MediaBlob:
+    """
+    Blob-Zeile zum Hash: bestehende bekommt ein frisches last_uploaded_at
+    (Schutz vor der GC), sonst wird sie angelegt.
+    """
+    now = timezone.now()
+    if MediaBlob.objects.filter(sha256=digest).update(last_uploaded_at=now):
+        blob = MediaBlob.objects.filter(sha256=digest).first()
+        if blob is not None:
+            return blob
+    blob, _ = MediaBlob.objects.get_or_create(
+        sha256=digest,
+        defaults={"name": blob_name(digest, ext), "size": size, "last_uploaded_at": now},
+    )
+    return blob
+
+
+def write_blob_file(blob, file) -> bool:
+    """
+    Schreibt die Datei des Blobs, falls sie fehlt – auch bei bestehendem
+    Blob, das heilt eine abgebrochene GC. True, wenn dieser Aufruf
+    geschrieben hat.
+    """
+    if default_storage.exists(blob.name):
+        return False
+    file.seek(0)
+    saved = default_storage.save(blob.name, file)
+    if saved != blob.name:
+        # paralleler Upload gleichen Inhalts war schneller
+        default_storage.delete(saved)
+        return False
+    return True
+
+
+def store_upload(file, ext=None) -> MediaBlob:
+    """
+    Speichert eine hochgeladene Datei inhaltsadressiert. Der Hash wird
+    blockweise über file.chunks() berechnet (Django hat große Uploads
+    bereits in eine Temp-Datei gestreamt); existiert der Blob schon, wird
+    nichts geschrieben und nur last_uploaded_at erneuert. ext überschreibt
+    die Endung aus dem Dateinamen (z.B. aus dem erkannten Bildformat).
+    """
+    digest, size = hash_upload(file)
+    blob = claim_blob(digest, size, upload_extension(file) if ext is None else ext)
+    write_blob_file(blob, file)
+    return blob
+
+
+def sync_references(owner: str, owner_id: int, names) -> None:
+    """
+    Referenzen eines Objekts auf den Stand `names` (Storage-Namen) bringen.
+    Namen außerhalb von BLOB_PREFIX (Altbestand, externe URLs) werden
+    ignoriert.
+    """
+    wanted = {n for n in names if n and n.startswith(BLOB_PREFIX)}
+    current = dict(
+        MediaReference.objects.filter(owner=owner, owner_id=owner_id)
+        .values_list("blob__name", "pk")
+    )
+    stale = [pk for name, pk in current.items() if name not in wanted]
+    if stale:
+        MediaReference.objects.filter(pk__in=stale).delete()
+    missing = wanted - current.keys()
+    if missing:
+        MediaReference.objects.bulk_create(
+            [
+                MediaReference(blob_id=pk, owner=owner, owner_id=owner_id)
+                for pk in MediaBlob.objects.filter(name__in=missing).values_list("pk", flat=True)
+            ],
+            ignore_conflicts=True,
+        )
+
+
+def drop_references(owner: str, owner_id: int) -> None:
+    MediaReference.objects.filter(owner=owner, owner_id=owner_id).delete()
+
+
+def collect_blob_garbage(grace_hours=None, batch_size: int = 500, dry_run: bool = False,
+                         stdout=None) -> int:
+    """
+    Löscht Blobs ohne Referenz, deren letzter Upload länger als grace_hours
+    zurückliegt (frische Uploads sind noch keinem Post zugeordnet), samt
+    Bild-Ableitungen. Pro Batch: Zeilen mit FOR UPDATE SKIP LOCKED sperren,
+    löschen, Dateien entfernen, committen. Parallele Uploads desselben
+    Inhalts warten auf die Sperre und schreiben die Datei danach neu;
+    neue Referenzen scheitern am Fremdschlüssel statt ins Leere zu zeigen.
+    Gibt die Anzahl gelöschter Blobs zurück.
+    """
+    if grace_hours is None:
+        grace_hours = settings.MEDIA_BLOB_GC_GRACE_HOURS
+    cutoff = timezone.now() - timedelta(hours=grace_hours)
+    unreferenced = MediaBlob.objects.filter(last_uploaded_at__lt=cutoff).filter(
+        ~Exists(MediaReference.objects.filter(blob=OuterRef("pk")))
+    )
+    if dry_run:
+        return unreferenced.count()
+
+    total = 0
+    while True:
+        with transaction.atomic():
+            blobs = list(
+                unreferenced.select_for_update(skip_locked=True, of=("self",))
+                .order_by("pk")
+                .values_list("pk", "name")[:batch_size]
+            )
+            if not blobs:
+                break
+            names = [name for _, name in blobs]
+            files = list(names)
+            for variants in ImageAsset.objects.filter(name__in=names).values_list("variants", flat=True):
+                files.extend(variants.values())
+            ImageAsset.objects.filter(name__in=names).delete()
+            MediaBlob.objects.filter(pk__in=[pk for pk, _ in blobs]).delete()
+            # vor dem Commit: schlägt das fehl, bleiben die Zeilen erhalten
+            # und store_upload schreibt fehlende Dateien beim nächsten Upload neu
+            for name in files:
+                default_storage.delete(name)
+        total += len(blobs)
+        if stdout is not None:
+            stdout.write(f"… {total} Blobs gelöscht")
+    return total
@@ -0,0 +1,304 @@
+from django.db import connection, transaction
+from django.db.models import Count, F, Q, Sum
+
+from .models import Community, Membership, Post, PostVote, Comment
+from .threads import path_ancestor_ids
+
+
+# Rollen, die als Mitglied zählen (PENDING nicht)
+COUNTED_ROLES = [
+    Membership.Role.MEMBER,
+    Membership.Role.MODERATOR,
+    Membership.Role.OWNER,
+]
+
+
+def apply_vote_change(post_id: int, old_value: int, new_value: int) -> None:
+    """
+    Überträgt eine Vote-Änderung (old -> new, jeweils -1/0/1) inkrementell
+    auf die gespeicherten Zähler des Posts.
+    """
+    if old_value == new_value:
+        return
+
+    updates = {"score": F("score") + (new_value - old_value)}
+    up_delta = int(new_value == 1) - int(old_value == 1)
+    down_delta = int(new_value == -1) - int(old_value == -1)
+    if up_delta:
+        updates["upvotes"] = F("upvotes") + up_delta
+    if down_delta:
+        updates["downvotes"] = F("downvotes") + down_delta
+
+    Post.objects.filter(pk=post_id).update(**updates)
+
+
+def adjust_comment_count(post_id: int, delta: int) -> None:
+    if delta:
+        Post.objects.filter(pk=post_id).update(comment_count=F("comment_count") + delta)
+
+
+def refresh_post_counters(post_ids) -> int:
+    """
+    Berechnet score/upvotes/downvotes/comment_count für die angegebenen
+    Posts aus PostVote/Comment neu. Gibt die Anzahl geänderter Posts zurück.
+    """
+    post_ids = list(post_ids)
+    if not post_ids:
+        return 0
+
+    changed = []
+    with transaction.atomic():
+        # erst sperren, dann zählen: Votes/Kommentare, die das Zeilen-Lock
+        # halten, sind danach committed und in den Aggregaten enthalten;
+        # spätere warten und wenden ihr Inkrement auf den neuen Stand an
+        posts = list(
+            Post.objects.select_for_update()
+            .filter(pk__in=post_ids)
+            .order_by("pk")
+            .only("id", "score", "upvotes", "downvotes", "comment_count")
+        )
+        votes = {
+            row["post_id"]: row
+            for row in PostVote.objects.filter(post_id__in=post_ids)
+            .values("post_id")
+            .annotate(
+                s=Sum("value"),
+                up=Count("id", filter=Q(value=PostVote.Value.UP)),
+                down=Count("id", filter=Q(value=PostVote.Value.DOWN)),
+            )
+        }
+        comments = dict(
+            Comment.objects.filter(post_id__in=post_ids, is_deleted=False)
+            .values("post_id")
+            .annotate(c=Count("id"))
+            .values_list("post_id", "c")
+        )
+
+        for post in posts:
+            v = votes.get(post.id) or {}
+            new = (
+                v.get("s") or 0,
+                v.get("up") or 0,
+                v.get("down") or 0,
+                comments.get(post.id, 0),
+            )
+            old = (post.score, post.upvotes, post.downvotes, post.comment_count)
+            if new != old:
+                post.score, post.upvotes, post.downvotes, post.comment_count = new
+                changed.append(post)
+
+        if changed:
+            Post.objects.bulk_update(
+                changed, ["score", "upvotes", "downvotes", "comment_count"]
+            )
+    return len(changed)
+
+
+def rebuild_post_counters(batch_size: int = 1000, stdout=None) -> int:
+    """Geht alle Posts in id-Batches durch und korrigiert die Zähler."""
+    last_id = 0
+    total = 0
+    while True:
+        ids = list(
+            Post.objects.filter(pk__gt=last_id)
+            .order_by("pk")
+            .values_list("pk", flat=True)[:batch_size]
+        )
+        if not ids:
+            break
+        total += refresh_post_counters(ids)
+        last_id = ids[-1]
+        if stdout is not None:
+            stdout.write(f"… bis Post {last_id}: {total} korrigiert")
+    return total
+
+
+def adjust_members_count(community_id: int, delta: int) -> None:
+    if delta:
+        Community.objects.filter(pk=community_id).update(
+            members_count=F("members_count") + delta
+        )
+
+
+def adjust_posts_count(community_id: int, delta: int) -> None:
+    if delta:
+        Community.objects.filter(pk=community_id).update(
+            posts_count=F("posts_count") + delta
+        )
+
+
+def membership_delta(old_role, new_role) -> int:
+    """+1/-1/0 je nachdem, ob ein Rollenwechsel die Mitgliederzahl ändert."""
+    return int(new_role in COUNTED_ROLES) - int(old_role in COUNTED_ROLES)
+
+
+def refresh_community_counters(community_ids) -> int:
+    """Berechnet members_count/posts_count für die Communities neu."""
+    community_ids = list(community_ids)
+    if not community_ids:
+        return 0
+
+    changed = []
+    with transaction.atomic():
+        # wie refresh_post_counters: Aggregate erst unter dem Zeilen-Lock
+        communities = list(
+            Community.objects.select_for_update()
+            .filter(pk__in=community_ids)
+            .order_by("pk")
+            .only("id", "members_count", "posts_count")
+        )
+        members = dict(
+            Membership.objects.filter(community_id__in=community_ids, role__in=COUNTED_ROLES)
+            .values("community_id")
+            .annotate(c=Count("id"))
+            .values_list("community_id", "c")
+        )
+        posts = dict(
+            Post.objects.filter(community_id__in=community_ids, is_deleted=False)
+            .values("community_id")
+            .annotate(c=Count("id"))
+            .values_list("community_id", "c")
+        )
+
+        for community in communities:
+            new = (members.get(community.id, 0), posts.get(community.id, 0))
+            if new != (community.members_count, community.posts_count):
+                community.members_count, community.posts_count = new
+                changed.append(community)
+
+        if changed:
+            Community.objects.bulk_update(changed, ["members_count", "posts_count"])
+    return len(changed)
+
+
+def rebuild_community_counters(batch_size: int = 500, stdout=None) -> int:
+    last_id = 0
+    total = 0
+    while True:
+        ids = list(
+            Community.objects.filter(pk__gt=last_id)
+            .order_by("pk")
+            .values_list("pk", flat=True)[:batch_size]
+        )
+        if not ids:
+            break
+        total += refresh_community_counters(ids)
+        last_id = ids[-1]
+        if stdout is not None:
+            stdout.write(f"… bis Community {last_id}: {total} korrigiert")
+    return total
+
+
+# --- Kommentar-Zähler (reply_count, descendant_count, last_reply_at) ----------
+
+_COMMENT_TABLE = Comment._meta.db_table
+
+_REPLY_CREATED_SQL = f"""
+    UPDATE {_COMMENT_TABLE}
+    SET descendant_count = descendant_count + 1,
+        reply_count = reply_count + (id = %(parent_id)s)::int,
+        last_reply_at = GREATEST(last_reply_at, %(created_at)s)
+    WHERE id = ANY(%(ancestor_ids)s)
+"""
+
+# last_reply_at nur neu bestimmen, wenn der gelöschte Kommentar der jüngste
+# war – als Range-Scan über (post, path): Nachfahren von a liegen zwischen
+# a.path und a.path mit "/" -> "0" am Ende (Collation "C")
+_REPLY_DELETED_SQL = f"""
+    UPDATE {_COMMENT_TABLE} a
+    SET descendant_count = a.descendant_count - 1,
+        reply_count = a.reply_count - (a.id = %(parent_id)s)::int,
+        last_reply_at = CASE
+            WHEN a.last_reply_at = %(created_at)s THEN (
+                SELECT max(d.created_at) FROM {_COMMENT_TABLE} d
+                WHERE d.post_id = a.post_id
+                  AND d.path > a.path
+                  AND d.path < left(a.path, -1) || '0'
+                  AND NOT d.is_deleted
+            )
+            ELSE a.last_reply_at
+        END
+    WHERE a.id = ANY(%(ancestor_ids)s)
+"""
+
+
+def _apply_reply_change(sql, comment) -> None:
+    ancestor_ids = path_ancestor_ids(comment.path)
+    if not ancestor_ids:
+        return
+    with connection.cursor() as cur:
+        cur.execute(sql, {
+            "ancestor_ids": ancestor_ids,
+            "parent_id": comment.parent_id,
+            "created_at": comment.created_at,
+        })
+
+
+def apply_reply_created(comment) -> None:
+    """Neue Antwort: Parent +1 Antwort, alle Vorfahren +1 Nachfahre."""
+    _apply_reply_change(_REPLY_CREATED_SQL, comment)
+
+
+def apply_reply_deleted(comment) -> None:
+    """Gegenstück zu apply_reply_created nach dem Soft-Delete."""
+    _apply_reply_change(_REPLY_DELETED_SQL, comment)
+
+
+_REFRESH_COMMENTS_SQL = f"""
+    WITH replies AS (
+        SELECT parent_id AS id, count(*) AS n
+        FROM {_COMMENT_TABLE}
+        WHERE post_id = ANY(%(post_ids)s) AND NOT is_deleted AND parent_id IS NOT NULL
+        GROUP BY parent_id
+    ),
+    descendants AS (
+        SELECT a.id::bigint AS id, count(*) AS n, max(d.created_at) AS last
+        FROM {_COMMENT_TABLE} d
+        CROSS JOIN LATERAL unnest(string_to_array(rtrim(d.path, '/'), '/')) AS a(id)
+        WHERE d.post_id = ANY(%(post_ids)s) AND NOT d.is_deleted AND a.id::bigint <> d.id
+        GROUP BY a.id::bigint
+    )
+    UPDATE {_COMMENT_TABLE} c
+    SET reply_count = COALESCE(r.n, 0),
+        descendant_count = COALESCE(d.n, 0),
+        last_reply_at = d.last
+    FROM {_COMMENT_TABLE} c2
+    LEFT JOIN replies r ON r.id = c2.id
+    LEFT JOIN descendants d ON d.id = c2.id
+    WHERE c.id = c2.id
+      AND c2.post_id = ANY(%(post_ids)s)
+      AND (c.reply_count, c.descendant_count, c.last_reply_at)
+          IS DISTINCT FROM (COALESCE(r.n, 0), COALESCE(d.n, 0), d.last)
+"""
+
+
+def refresh_comment_counters(post_ids) -> int:
+    """
+    Berechnet reply_count/descendant_count/last_reply_at aller Kommentare
+    der Posts neu (setzt Comment.path voraus). Gibt die Anzahl geänderter
+    Kommentare zurück.
+    """
+    post_ids = list(post_ids)
+    if not post_ids:
+        return 0
+    with transaction.atomic(), connection.cursor() as cur:
+        cur.execute(_REFRESH_COMMENTS_SQL, {"post_ids": post_ids})
+        return cur.rowcount
+
+
+def rebuild_comment_counters(batch_size: int = 500, stdout=None) -> int:
+    last_id = 0
+    total = 0
+    while True:
+        ids = list(
+            Post.objects.filter(pk__gt=last_id)
+            .order_by("pk")
+            .values_list("pk", flat=True)[:batch_size]
+        )
+        if not ids:
+            break
+        total += refresh_comment_counters(ids)
+        last_id = ids[-1]
+        if stdout is not None:
+            stdout.write(f"… bis Post {last_id}: {total} Kommentare korrigiert")
+    return total
@@ -0,0 +1,241 @@
+from django.conf import settings
+from django.db import connection
+
+from .counters import COUNTED_ROLES
+from .models import Community, FeedEntry, Membership, Post
+from .tasks import run_in_background
+
+# Sortierfelder, für die es pro Community einen passenden Index gibt
+MERGE_SORT_FIELDS = ["created_at", "score"]
+
+# Sortierung der Timeline-Tabelle (sort_key == created_at)
+TIMELINE_ORDERING = ["-created_at", "-id"]
+
+
+def _direction(ordering):
+    desc = ordering[0].startswith("-")
+    if any(o.startswith("-") != desc for o in ordering):
+        raise ValueError("Feed-Merge braucht eine einheitliche Sortierrichtung.")
+    return desc
+
+
+def _lateral_sql(ordering, with_cursor):
+    """
+    SELECT über alle Communities aus %s::bigint[], pro Community per
+    LATERAL höchstens %s Posts in Index-Reihenfolge.
+    Platzhalter: community_ids, [*after], limit
+    """
+    desc = _direction(ordering)
+    columns = [Post._meta.get_field(o.lstrip("-")).column for o in ordering]
+    direction = "DESC" if desc else "ASC"
+    cursor_sql = ""
+    if with_cursor:
+        cursor_sql = "AND ({}) {} ({})".format(
+            ", ".join(f"fp.{col}" for col in columns),
+            "<" if desc else ">",
+            ", ".join(["%s"] * len(columns)),
+        )
+    sql = f"""
+        SELECT {", ".join(f"p.{col}" for col in columns)}
+        FROM unnest(%s::bigint[]) AS c(id)
+        CROSS JOIN LATERAL (
+            SELECT {", ".join(f"fp.{col}" for col in columns)}
+            FROM {Post._meta.db_table} fp
+            WHERE fp.community_id = c.id
+              AND NOT fp.is_deleted
+              {cursor_sql}
+            ORDER BY {", ".join(f"fp.{col} {direction}" for col in columns)}
+            LIMIT %s
+        ) p
+    """
+    outer_order = ", ".join(f"{col} {direction}" for col in columns)
+    return sql, outer_order
+
+
+def merged_feed_ids(community_ids, ordering, after=None, limit=10):
+    """
+    Bounded k-way merge über mehrere Communities in einem Statement:
+    pro Community holt ein LATERAL-Subselect höchstens `limit` Posts per
+    Index-Scan (community_id, <sortfeld>, id), der äußere SELECT mischt diese
+    höchstens len(community_ids) * limit Zeilen und schneidet wieder auf
+    `limit` ab. Damit hängt der Aufwand nicht von der Gesamtzahl Posts ab.
+
+    ordering: z.B. ["-created_at", "-id"] (alle Felder gleiche Richtung)
+    after:    Sortierwerte des letzten Elements der Vorseite oder None
+    """
+    community_ids = list(community_ids)
+    if not community_ids or limit <= 0:
+        return []
+
+    lateral, outer_order = _lateral_sql(ordering, after is not None)
+    params = [community_ids, *(after or []), limit, limit]
+    sql = f"SELECT id FROM ({lateral}) m ORDER BY {outer_order} LIMIT %s"
+    with connection.cursor() as cur:
+        cur.execute(sql, params)
+        return [row[0] for row in cur.fetchall()]
+
+
+def timeline_feed_ids(user_id, community_ids, large_community_ids, after=None, limit=10):
+    """
+    Fan-out-on-read-Hybrid: ein Range-Scan über die Timeline des Users
+    (Index user, sort_key, post) plus – nur für Communities oberhalb von
+    FEED_FANOUT_MAX_MEMBERS – der LATERAL-Merge, beides in einem Statement.
+    Timeline-Zeilen aus Communities, die der User verlassen hat, werden über
+    community_ids ausgefiltert; UNION entfernt Doppelte, falls eine Community
+    nach dem Fan-out über die Schwelle gewachsen ist.
+    Sortierung immer TIMELINE_ORDERING.
+    """
+    entry_table = FeedEntry._meta.db_table
+    post_table = Post._meta.db_table
+    cursor_sql = "AND (fe.sort_key, fe.post_id) < (%s, %s)" if after is not None else ""
+    params = [user_id, list(community_ids), *(after or []), limit]
+
+    parts = [f"""
+        (SELECT fe.post_id AS id, fe.sort_key AS created_at
+         FROM {entry_table} fe
+         JOIN {post_table} fp ON fp.id = fe.post_id AND NOT fp.is_deleted
+         WHERE fe.user_id = %s
+           AND fe.community_id = ANY(%s)
+           {cursor_sql}
+         ORDER BY fe.sort_key DESC, fe.post_id DESC
+         LIMIT %s)
+    """]
+    large_community_ids = list(large_community_ids)
+    if large_community_ids:
+        lateral, _ = _lateral_sql(TIMELINE_ORDERING, after is not None)
+        # UNION ordnet Spalten nach Position zu: gleiche Reihenfolge wie oben
+        parts.append(f"(SELECT l.id, l.created_at FROM ({lateral}) l)")
+        params += [large_community_ids, *(after or []), limit]
+
+    sql = (
+        f"SELECT id FROM ({' UNION '.join(parts)}) t "
+        f"ORDER BY created_at DESC, id DESC LIMIT %s"
+    )
+    params.append(limit)
+    with connection.cursor() as cur:
+        cur.execute(sql, params)
+        return [row[0] for row in cur.fetchall()]
+
+
+def feed_community_ids(user):
+    return list(
+        Membership.objects.filter(user=user, role__in=COUNTED_ROLES)
+        .values_list("community_id", flat=True)
+    )
+
+
+def home_feed_ids(user, ordering, after=None, limit=10):
+    """
+    Einstieg für den Home-Feed. Mit FEED_FANOUT_ENABLED und Standard-
+    Sortierung aus der Timeline; ist die Timeline-Seite unvollständig
+    (getrimmt oder noch nicht befüllt), wird die Seite on-read gemischt.
+    """
+    community_ids = feed_community_ids(user)
+    if not community_ids:
+        return []
+
+    if settings.FEED_FANOUT_ENABLED and ordering == TIMELINE_ORDERING:
+        large_ids = list(
+            Community.objects.filter(
+                pk__in=community_ids,
+                members_count__gt=settings.FEED_FANOUT_MAX_MEMBERS,
+            ).values_list("pk", flat=True)
+        )
+        ids = timeline_feed_ids(user.pk, community_ids, large_ids, after, limit)
+        if len(ids) >= limit:
+            return ids
+
+    return merged_feed_ids(community_ids, ordering, after, limit)
+
+
+# --- Fan-out-on-write --------------------------------------------------------
+
+def fanout_post(post_id: int) -> int:
+    """Schreibt einen neuen Post in die Timelines aller Mitglieder."""
+    post = (
+        Post.objects.filter(pk=post_id, is_deleted=False)
+        .values("id", "community_id", "created_at", "community__members_count")
+        .first()
+    )
+    if not post or post["community__members_count"] > settings.FEED_FANOUT_MAX_MEMBERS:
+        return 0
+
+    sql = f"""
+        INSERT INTO {FeedEntry._meta.db_table} (user_id, post_id, community_id, sort_key)
+        SELECT m.user_id, %s, %s, %s
+        FROM {Membership._meta.db_table} m
+        WHERE m.community_id = %s AND m.role = ANY(%s)
+        ON CONFLICT (user_id, post_id) DO NOTHING
+    """
+    with connection.cursor() as cur:
+        cur.execute(sql, [
+            post["id"], post["community_id"], post["created_at"],
+            post["community_id"], [str(r) for r in COUNTED_ROLES],
+        ])
+        return cur.rowcount
+
+
+def backfill_timeline(user_id: int, community_id: int, length=None) -> int:
+    """Übernimmt die neuesten Posts einer Community in die Timeline des Users."""
+    length = length or settings.FEED_TIMELINE_LENGTH
+    is_large = Community.objects.filter(
+        pk=community_id, members_count__gt=settings.FEED_FANOUT_MAX_MEMBERS
+    ).exists()
+    if is_large:
+        return 0
+    sql = f"""
+        INSERT INTO {FeedEntry._meta.db_table} (user_id, post_id, community_id, sort_key)
+        SELECT %s, p.id, p.community_id, p.created_at
+        FROM {Post._meta.db_table} p
+        WHERE p.community_id = %s AND NOT p.is_deleted
+        ORDER BY p.created_at DESC, p.id DESC
+        LIMIT %s
+        ON CONFLICT (user_id, post_id) DO NOTHING
+    """
+    with connection.cursor() as cur:
+        cur.execute(sql, [user_id, community_id, length])
+        return cur.rowcount
+
+
+def drop_timeline_community(user_id: int, community_id: int) -> int:
+    deleted, _ = FeedEntry.objects.filter(user_id=user_id, community_id=community_id).delete()
+    return deleted
+
+
+def trim_timelines(user_ids=None, keep=None) -> int:
+    """Behält pro User nur die neuesten `keep` Einträge."""
+    keep = keep or settings.FEED_TIMELINE_LENGTH
+    user_filter = "WHERE user_id = ANY(%s)" if user_ids is not None else ""
+    params = [list(user_ids)] if user_ids is not None else []
+    sql = f"""
+        DELETE FROM {FeedEntry._meta.db_table} fe
+        USING (
+            SELECT id FROM (
+                SELECT id, row_number() OVER (
+                    PARTITION BY user_id ORDER BY sort_key DESC, post_id DESC
+                ) AS rn
+                FROM {FeedEntry._meta.db_table}
+                {user_filter}
+            ) ranked
+            WHERE rn > %s
+        ) old
+        WHERE fe.id = old.id
+    """
+    with connection.cursor() as cur:
+        cur.execute(sql, params + [keep])
+        return cur.rowcount
+
+
+def schedule_fanout(post) -> None:
+    if settings.FEED_FANOUT_ENABLED:
+        run_in_background(fanout_post, post.pk)
+
+
+def schedule_membership_change(user_id: int, community_id: int, is_member: bool) -> None:
+    """Nach join/approve Timeline nachfüllen, nach leave/remove bereinigen."""
+    if not settings.FEED_FANOUT_ENABLED:
+        return
+    if is_member:
+        run_in_background(backfill_timeline, user_id, community_id)
+    else:
+        run_in_background(drop_timeline_community, user_id, community_id)
@@ -0,0 +1,163 @@
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+
+FIELDS_PARAM = "fields"
+OMIT_PARAM = "omit"
+
+
+def _names(value: str) -> list:
+    return [n for n in (part.strip() for part in value.split(",")) if n]
+
+
+class Fieldset:
+    """
+    Auswahl aus ?fields=a,b (nur diese) und/oder ?omit=c,d (ohne diese) für
+    Lesezugriffe. Gegen die Felder eines Serializers geprüft wird erst in
+    select(), damit eine Auswahl auch für den Serializer einer Action gilt
+    (z.B. PostSerializer in CommunityViewSet.posts).
+    """
+
+    def __init__(self, include=None, omit=()):
+        self.include = include
+        self.omit = set(omit)
+
+    @classmethod
+    def from_request(cls, request):
+        if request is None or request.method not in ("GET", "HEAD"):
+            return None
+        params = request.query_params
+        if FIELDS_PARAM not in params and OMIT_PARAM not in params:
+            return None
+        include = _names(params[FIELDS_PARAM]) if FIELDS_PARAM in params else None
+        return cls(include, _names(params.get(OMIT_PARAM, "")))
+
+    def select(self, names) -> list:
+        """Verbleibende Namen in der Reihenfolge von names; unbekannte -> 400."""
+        names = list(names)
+        unknown = sorted(set(self.include or ()).union(self.omit) - set(names))
+        if unknown:
+            raise ValidationError({FIELDS_PARAM: f"Unbekannte Felder: {', '.join(unknown)}."})
+        wanted = set(names if self.include is None else self.include) - self.omit
+        return [n for n in names if n in wanted]
+
+
+class SparseFieldsetMixin:
+    """
+    Für Serializer: context["fieldset"] (von der View gesetzt, siehe
+    SparseFieldsetViewMixin) entfernt nicht gewählte Ausgabefelder;
+    schreibbare Felder bleiben, Auswahlen gibt es nur für GET.
+
+    fieldset_sources nennt für berechnete Felder die benötigten Modellpfade
+    (apply_fieldset -> .only()/select_related), verschachtelte Serializer
+    werden über ihre source vorab geladen (prefetch_related).
+    """
+
+    fieldset_sources = {}
+
+    def get_fields(self):
+        fields = super().get_fields()
+        fieldset = self.context.get("fieldset")
+        if fieldset is None:
+            return fields
+        keep = set(fieldset.select(n for n, f in fields.items() if not f.write_only))
+        return {n: f for n, f in fields.items() if n in keep or f.write_only}
+
+    def wants(self, name: str) -> bool:
+        return name in self.fields
+
+
+class SparseFieldsetViewMixin:
+    """
+    Für Views/ViewSets: Auswahl aus der Query in den Serializer-Kontext und
+    – für list/retrieve – per apply_fieldset in den Queryset. Actions mit
+    eigenem Serializer rufen apply_fieldset selbst auf.
+    """
+
+    fieldset_actions = ("list", "retrieve")
+
+    def get_fieldset(self):
+        return Fieldset.from_request(self.request)
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if getattr(self, "action", "list") in self.fieldset_actions:
+            queryset = apply_fieldset(queryset, self.get_serializer_class(), self.get_fieldset())
+        return queryset
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        fieldset = self.get_fieldset()
+        if fieldset is not None:
+            context["fieldset"] = fieldset
+        return context
+
+
+def _is_model_path(model, path: str) -> bool:
+    for part in path.split("__"):
+        if model is None:
+            return False
+        try:
+            field = model._meta.get_field(part)
+        except FieldDoesNotExist:
+            return False
+        model = field.related_model
+    return True
+
+
+_output_fields_cache = {}
+
+
+def _output_fields(serializer_class) -> dict:
+    fields = _output_fields_cache.get(serializer_class)
+    if fields is None:
+        fields = _output_fields_cache[serializer_class] = {
+            n: f for n, f in serializer_class().fields.items() if not f.write_only
+        }
+    return fields
+
+
+def apply_fieldset(queryset, serializer_class, fieldset):
+    """
+    Lädt nur, was die gewählten Felder brauchen: .only() auf deren Spalten
+    (plus Sortierspalten für Keyset-Cursor), select_related nur für
+    verwendete Relationen, prefetch_related nur für gewählte verschachtelte
+    Serializer. Annotationen (z.B. rank der Suche) bleiben unberührt. Ohne
+    Auswahl bleibt der Queryset unverändert.
+    """
+    if fieldset is None:
+        return queryset
+    model = queryset.model
+    fields = _output_fields(serializer_class)
+    sources = serializer_class.fieldset_sources
+
+    paths, prefetches = [], set()
+    for name in fieldset.select(fields):
+        field = fields[name]
+        if name in sources:
+            paths.extend(sources[name])
+        elif isinstance(field, serializers.ListSerializer):
+            prefetches.add(field.source)
+        elif isinstance(field, serializers.SerializerMethodField):
+            raise ImproperlyConfigured(
+                f"{serializer_class.__name__}.fieldset_sources: Eintrag für {name} fehlt."
+            )
+        else:
+            paths.append(field.source.replace(".", "__"))
+    paths.extend(o.lstrip("-") for o in queryset.query.order_by if isinstance(o, str))
+
+    columns = {model._meta.pk.name}
+    relations = set()
+    for path in paths:
+        if not _is_model_path(model, path):
+            continue
+        columns.add(path)
+        if "__" in path:
+            relations.add(path.rsplit("__", 1)[0])
+
+    queryset = queryset.select_related(None).prefetch_related(None)
+    if relations:
+        queryset = queryset.select_related(*relations)
+    if prefetches:
+        queryset = queryset.prefetch_related(*prefetches)
+    return queryset.only(*columns)
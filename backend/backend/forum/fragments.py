@@ -0,0 +1,130 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.fields import SkipField
+from rest_framework.relations import PKOnlyObject
+
+from .metrics import cache_stats
+
+fragment_cache_stats = cache_stats("fragments")
+
+
+class FragmentCacheMixin:
+    """
+    Cacht den vom Betrachter unabhängigen Teil der Ausgabe pro Objekt unter
+    (Modell, Serializer, id, updated_at, fragment_schema). Felder in
+    fragment_volatile_fields – eigener Vote/Rolle und Zähler, die per
+    .update() ohne updated_at geändert werden – kommen nie in den Cache und
+    werden bei jedem Treffer frisch aus der Instanz serialisiert.
+
+    fragment_dependencies(obj) nennt bereits geladene Werte verknüpfter
+    Objekte (Autor, Community, Bilder); weicht etwas davon ab, gilt das
+    Fragment als Fehlschlag. fragment_cacheable(obj) verhindert das
+    Speichern unfertiger Ausgaben (z.B. Bildableitungen noch in Arbeit).
+
+    Mit Feldauswahl (context["fieldset"], forum.fieldsets) wird nicht
+    gecacht – die Ausgabe ist unvollständig.
+
+    Seiten (PagePreloadListSerializer) lesen alle Fragmente mit einem
+    get_many in preload_page und schreiben die neuen mit einem set_many in
+    finish_page; Einzelobjekte einzeln. Nur Fehlschläge laufen durch die
+    übrigen preload_page-Hooks (Bild-Assets).
+    """
+
+    # bei Änderungen an Feldern/Ausgabe erhöhen -> alte Fragmente ungültig
+    fragment_schema = 1
+    fragment_volatile_fields = ()
+
+    def fragment_dependencies(self, obj) -> tuple:
+        return ()
+
+    def fragment_cacheable(self, obj) -> bool:
+        return True
+
+    def fragment_key(self, obj) -> str:
+        prefix = getattr(self, "_fragment_prefix", None)
+        if prefix is None:
+            request = self.context.get("request")
+            # Fragmente enthalten absolute URLs -> pro Host (Browser vs. SSR)
+            base = request.build_absolute_uri("/") if request is not None else ""
+            prefix = self._fragment_prefix = (
+                f"forum:frag:{self.Meta.model._meta.label_lower}:{type(self).__name__}"
+                f":v{self.fragment_schema}:{hashlib.sha1(base.encode()).hexdigest()[:10]}"
+            )
+        return f"{prefix}:{obj.pk}:{obj.updated_at.timestamp():.6f}"
+
+    def _fragments_enabled(self) -> bool:
+        return settings.FRAGMENT_CACHE_ENABLED and "fieldset" not in self.context
+
+    def preload_page(self, objs) -> None:
+        if not self._fragments_enabled():
+            super().preload_page(objs)
+            return
+        keys = {obj.pk: self.fragment_key(obj) for obj in objs}
+        found = cache.get_many(list(keys.values()))
+        # pk -> gültiges Fragment bzw. None (Fehlschlag)
+        page = {obj.pk: self._valid_fragment(obj, found.get(keys[obj.pk])) for obj in objs}
+        self.context["fragments"] = page
+        self.context["fragments_new"] = {}
+        misses = [obj for obj in objs if page[obj.pk] is None]
+        if misses:
+            super().preload_page(misses)
+
+    def finish_page(self, objs) -> None:
+        new = self.context.pop("fragments_new", None)
+        self.context.pop("fragments", None)
+        if new:
+            cache.set_many(new, settings.FRAGMENT_CACHE_SECONDS)
+
+    def _valid_fragment(self, obj, entry):
+        if entry is None:
+            return None
+        deps, fragment = entry
+        return fragment if deps == self.fragment_dependencies(obj) else None
+
+    def _field_value(self, field, instance):
+        # wie Serializer.to_representation für ein einzelnes Feld
+        attribute = field.get_attribute(instance)
+        check_for_none = attribute.pk if isinstance(attribute, PKOnlyObject) else attribute
+        return None if check_for_none is None else field.to_representation(attribute)
+
+    def to_representation(self, instance):
+        if not self._fragments_enabled():
+            return super().to_representation(instance)
+
+        page = self.context.get("fragments")
+        if page is not None and instance.pk in page:
+            fragment = page[instance.pk]
+        else:
+            page = None
+            fragment = self._valid_fragment(instance, cache.get(self.fragment_key(instance)))
+
+        if fragment is None:
+            fragment_cache_stats.miss()
+            data = super().to_representation(instance)
+            if self.fragment_cacheable(instance):
+                key = self.fragment_key(instance)
+                cached = (
+                    self.fragment_dependencies(instance),
+                    {k: v for k, v in data.items() if k not in self.fragment_volatile_fields},
+                )
+                if page is not None:
+                    self.context["fragments_new"][key] = cached
+                else:
+                    cache.set(key, cached, settings.FRAGMENT_CACHE_SECONDS)
+            return data
+
+        fragment_cache_stats.hit()
+        data = {}
+        for field in self._readable_fields:
+            name = field.field_name
+            if name not in self.fragment_volatile_fields:
+                if name in fragment:
+                    data[name] = fragment[name]
+                continue
+            try:
+                data[name] = self._field_value(field, instance)
+            except SkipField:
+                continue
+        return data
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from forum.threads import backfill_comment_paths
+
+
+class Command(BaseCommand):
+    help = (
+        "Setzt Comment.path (materialisierter Pfad) für alle Threads neu, "
+        "in Batches von Top-Level-Kommentaren."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Anzahl Top-Level-Kommentare pro Batch/Transaktion (Default: 500).",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options["batch_size"])
+        self.stdout.write(self.style.WARNING("Berechne Kommentar-Pfade neu …"))
+        changed = backfill_comment_paths(batch_size=batch_size, stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(f"Fertig: {changed} Kommentare aktualisiert."))
@@ -0,0 +1,60 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from forum.counters import COUNTED_ROLES
+from forum.feed import backfill_timeline, trim_timelines
+from forum.models import Membership
+
+
+class Command(BaseCommand):
+    help = (
+        "Befüllt die FeedEntry-Timelines (fan-out-on-write) aus den bestehenden "
+        "Memberships und Posts und kürzt sie anschließend auf FEED_TIMELINE_LENGTH."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--user",
+            type=int,
+            action="append",
+            help="Nur diese User-ID(s) befüllen (mehrfach möglich).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=200,
+            help="User pro Transaktion (Default: 200).",
+        )
+
+    def handle(self, *args, **options):
+        length = settings.FEED_TIMELINE_LENGTH
+        memberships = (
+            Membership.objects
+            .filter(
+                role__in=COUNTED_ROLES,
+                community__members_count__lte=settings.FEED_FANOUT_MAX_MEMBERS,
+            )
+            .order_by("user_id", "community_id")
+        )
+        if options["user"]:
+            memberships = memberships.filter(user_id__in=options["user"])
+
+        user_ids = list(memberships.values_list("user_id", flat=True).distinct())
+        batch_size = max(1, options["batch_size"])
+        self.stdout.write(self.style.WARNING(f"Befülle Timelines für {len(user_ids)} User …"))
+
+        inserted = 0
+        trimmed = 0
+        for start in range(0, len(user_ids), batch_size):
+            batch = user_ids[start:start + batch_size]
+            with transaction.atomic():
+                pairs = memberships.filter(user_id__in=batch).values_list("user_id", "community_id")
+                for user_id, community_id in pairs:
+                    inserted += backfill_timeline(user_id, community_id, length)
+                trimmed += trim_timelines(batch, length)
+            self.stdout.write(f"… {min(start + batch_size, len(user_ids))}/{len(user_ids)} User")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Fertig: {inserted} Einträge eingefügt, {trimmed} überzählige entfernt."
+        ))
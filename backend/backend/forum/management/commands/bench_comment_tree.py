@@ -0,0 +1,152 @@
+import random
+import statistics
+import time
+from collections import defaultdict
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from forum.models import Comment, Post
+from forum.threads import comment_path
+
+TABLE = Comment._meta.db_table
+
+RECURSIVE_THREAD_SQL = f"""
+    WITH RECURSIVE tree AS (
+        SELECT id, ARRAY[id] AS sort_path
+        FROM {TABLE} WHERE post_id = %s AND parent_id IS NULL
+        UNION ALL
+        SELECT c.id, tree.sort_path || c.id
+        FROM {TABLE} c JOIN tree ON c.parent_id = tree.id
+    )
+    SELECT id FROM tree ORDER BY sort_path
+"""
+PATH_THREAD_SQL = f"SELECT id FROM {TABLE} WHERE post_id = %s ORDER BY path"
+
+RECURSIVE_SUBTREE_SQL = f"""
+    WITH RECURSIVE tree AS (
+        SELECT id, ARRAY[id] AS sort_path FROM {TABLE} WHERE parent_id = %s
+        UNION ALL
+        SELECT c.id, tree.sort_path || c.id
+        FROM {TABLE} c JOIN tree ON c.parent_id = tree.id
+    )
+    SELECT id FROM tree ORDER BY sort_path
+"""
+PATH_SUBTREE_SQL = f"""
+    SELECT id FROM {TABLE}
+    WHERE post_id = %s AND path LIKE %s AND id <> %s
+    ORDER BY path
+"""
+
+RECURSIVE_COUNT_SQL = f"""
+    WITH RECURSIVE tree AS (
+        SELECT id FROM {TABLE} WHERE parent_id = %s
+        UNION ALL
+        SELECT c.id FROM {TABLE} c JOIN tree ON c.parent_id = tree.id
+    )
+    SELECT count(*) FROM tree
+"""
+PATH_COUNT_SQL = f"SELECT count(*) - 1 FROM {TABLE} WHERE post_id = %s AND path LIKE %s"
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark Kommentarbaum: rekursiver CTE über parent_id vs. "
+        "materialisierter Pfad (Comment.path) für ganzen Thread, Teilbaum "
+        "und Nachfahren-Zählung. Erzeugt einen synthetischen Thread in einer "
+        "Transaktion, die am Ende zurückgerollt wird."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--post", type=int, help="Post-ID (Default: neuester Post).")
+        parser.add_argument("--comments", type=int, default=10000, help="Thread-Größe (Default: 10000).")
+        parser.add_argument("--roots", type=float, default=0.02,
+                            help="Anteil Top-Level-Kommentare (Default: 0.02).")
+        parser.add_argument("--repeat", type=int, default=5, help="Wiederholungen (Default: 5).")
+        parser.add_argument("--seed", type=int, default=1)
+
+    def handle(self, *args, **options):
+        post = (
+            Post.objects.filter(pk=options["post"]).first() if options["post"]
+            else Post.objects.order_by("-created_at").first()
+        )
+        author = get_user_model().objects.order_by("pk").first()
+        if post is None or author is None:
+            raise CommandError("Kein Post/User vorhanden (seed_demo_data).")
+
+        with transaction.atomic():
+            root = self._build_thread(post, author, options)
+            n = Comment.objects.filter(post=post).count()
+            self.stdout.write(
+                f"Post {post.pk}: {n} Kommentare, Teilbaum-Wurzel {root.pk}"
+            )
+            cases = [
+                ("Thread komplett", RECURSIVE_THREAD_SQL, [post.pk],
+                 PATH_THREAD_SQL, [post.pk]),
+                ("Teilbaum", RECURSIVE_SUBTREE_SQL, [root.pk],
+                 PATH_SUBTREE_SQL, [post.pk, root.path + "%", root.pk]),
+                ("Nachfahren zählen", RECURSIVE_COUNT_SQL, [root.pk],
+                 PATH_COUNT_SQL, [post.pk, root.path + "%"]),
+            ]
+            for label, rec_sql, rec_params, path_sql, path_params in cases:
+                rec_ms, rec_rows = self._time(rec_sql, rec_params, options["repeat"])
+                path_ms, path_rows = self._time(path_sql, path_params, options["repeat"])
+                same = "gleich" if rec_rows == path_rows else "ABWEICHEND"
+                self.stdout.write(
+                    f"{label:<18} rekursiv {rec_ms:8.2f}ms  Pfad {path_ms:8.2f}ms  "
+                    f"(x{rec_ms / path_ms if path_ms else 0:5.1f}, Ergebnis {same})"
+                )
+            transaction.set_rollback(True)
+
+    def _build_thread(self, post, author, options):
+        """Zufälliger Baum; Anlage ebenenweise, damit Parents ihre id schon haben."""
+        rng = random.Random(options["seed"])
+        size = max(1, options["comments"])
+        parents = []
+        for i in range(size):
+            if i == 0 or rng.random() < options["roots"]:
+                parents.append(None)
+            else:
+                # bevorzugt jüngere Kommentare -> tiefere Verschachtelung
+                parents.append(rng.randint(max(0, i - 200), i - 1))
+
+        depth = []
+        for parent in parents:
+            depth.append(0 if parent is None else depth[parent] + 1)
+        levels = defaultdict(list)
+        for i, d in enumerate(depth):
+            levels[d].append(i)
+
+        objs = [None] * size
+        for d in sorted(levels):
+            batch = []
+            for i in levels[d]:
+                parent = objs[parents[i]] if parents[i] is not None else None
+                objs[i] = Comment(post=post, author=author, body=f"Bench {i}", parent=parent)
+                batch.append(objs[i])
+            Comment.objects.bulk_create(batch, batch_size=2000)
+            for obj in batch:
+                obj.path = comment_path(obj.parent.path if obj.parent else "", obj.pk)
+            Comment.objects.bulk_update(batch, ["path"], batch_size=2000)
+
+        # größter Teilbaum unter den Top-Level-Kommentaren
+        sizes = defaultdict(int)
+        for i in range(size):
+            j = i
+            while parents[j] is not None:
+                j = parents[j]
+            sizes[j] += 1
+        return objs[max(sizes, key=sizes.get)]
+
+    @staticmethod
+    def _time(sql, params, repeat):
+        timings = []
+        rows = None
+        with connection.cursor() as cur:
+            for _ in range(max(1, repeat)):
+                t0 = time.perf_counter()
+                cur.execute(sql, params)
+                rows = cur.fetchall()
+                timings.append((time.perf_counter() - t0) * 1000)
+        return statistics.median(timings), rows
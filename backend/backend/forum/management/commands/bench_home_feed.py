@@ -0,0 +1,71 @@
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from forum.feed import (
+    TIMELINE_ORDERING,
+    feed_community_ids,
+    merged_feed_ids,
+    timeline_feed_ids,
+)
+from forum.models import FeedEntry, Post
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark Home-Feed: fan-out-on-read (LATERAL-Merge) vs. "
+        "fan-out-on-write (FeedEntry-Timeline) für Seite 1 und tiefe Seiten. "
+        "Setzt befüllte Timelines voraus (backfill_feed_entries)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", type=int, help="User-ID (Default: User mit den meisten Memberships).")
+        parser.add_argument("--pages", type=int, default=20, help="Anzahl Seiten pro Durchlauf (Default: 20).")
+        parser.add_argument("--page-size", type=int, default=25, help="Seitengröße (Default: 25).")
+        parser.add_argument("--repeat", type=int, default=5, help="Durchläufe (Default: 5).")
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        if options["user"]:
+            user = User.objects.get(pk=options["user"])
+        else:
+            user = User.objects.annotate(n=Count("memberships")).order_by("-n").first()
+
+        community_ids = feed_community_ids(user)
+        entries = FeedEntry.objects.filter(user=user).count()
+        self.stdout.write(
+            f"User {user.pk}: {len(community_ids)} Communities, {entries} Timeline-Einträge"
+        )
+        if not entries:
+            self.stdout.write(self.style.WARNING("Keine Timeline – zuerst backfill_feed_entries ausführen."))
+
+        limit = options["page_size"] + 1
+
+        def on_read(after):
+            return merged_feed_ids(community_ids, TIMELINE_ORDERING, after, limit)
+
+        def on_write(after):
+            return timeline_feed_ids(user.pk, community_ids, [], after, limit)
+
+        for label, fetch in [("on-read (merge)", on_read), ("on-write (timeline)", on_write)]:
+            first_page, deep_pages = [], []
+            for _ in range(options["repeat"]):
+                after = None
+                for page in range(options["pages"]):
+                    t0 = time.perf_counter()
+                    ids = fetch(after)
+                    elapsed = (time.perf_counter() - t0) * 1000
+                    (first_page if page == 0 else deep_pages).append(elapsed)
+                    if len(ids) < limit:
+                        break
+                    last = ids[options["page_size"] - 1]
+                    created_at = Post.objects.filter(pk=last).values_list("created_at", flat=True).first()
+                    after = [created_at, last]
+            self.stdout.write(
+                f"{label:<22} Seite 1: {statistics.median(first_page):7.2f}ms  "
+                f"Folgeseiten: {statistics.median(deep_pages) if deep_pages else 0:7.2f}ms (Median)"
+            )
+
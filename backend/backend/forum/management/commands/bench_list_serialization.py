@@ -0,0 +1,74 @@
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from django.test import override_settings
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from forum.models import Comment, Post
+from forum.projections import comment_projection, post_projection
+from forum.serializers import CommentSerializer, PostSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Microbenchmark Listen-Serialisierung: DRF-Serializer vs. "
+        "Projektionspfad (forum.projections) für Seiten mit Posts und "
+        "Kommentaren, inkl. Abfragen. Ausgabe in Objekten/s."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--page-sizes", default="50,100", help="Seitengrößen (Default: 50,100).")
+        parser.add_argument("--repeat", type=int, default=20, help="Durchläufe pro Messung (Default: 20).")
+        parser.add_argument("--anonymous", action="store_true", help="Ohne User (kein my_vote).")
+
+    def handle(self, *args, **options):
+        user = AnonymousUser()
+        if not options["anonymous"]:
+            user = get_user_model().objects.annotate(n=Count("post_votes")).order_by("-n").first() or user
+        request = Request(APIRequestFactory().get("/api/posts/"))
+        request.user = user
+
+        posts = (
+            Post.objects.select_related("community", "author").prefetch_related("images")
+            .filter(is_deleted=False).order_by("-created_at")
+        )
+        # wie GET /api/comments/?post=<id>: Post mit den meisten Kommentaren
+        busiest = Post.objects.filter(is_deleted=False).order_by("-comment_count").first()
+        comments = (
+            Comment.objects.select_related("author")
+            .filter(post=busiest, is_deleted=False).order_by("created_at")
+        )
+        cases = [
+            ("Posts", posts, PostSerializer, post_projection),
+            ("Kommentare", comments, CommentSerializer, comment_projection),
+        ]
+
+        # Fragment-Cache aus: verglichen wird die Serialisierung selbst
+        with override_settings(FRAGMENT_CACHE_ENABLED=False):
+            for label, qs, serializer_class, projection in cases:
+                for size in map(int, options["page_sizes"].split(",")):
+                    def serializer():
+                        return serializer_class(list(qs[:size]), many=True, context={"request": request}).data
+
+                    def projected():
+                        return projection.render(projection.values(qs)[:size], request)
+
+                    rates = {}
+                    for name, run in [("Serializer", serializer), ("Projektion", projected)]:
+                        run()  # Aufwärmen (Feldplan, Verbindungen)
+                        timings = []
+                        for _ in range(options["repeat"]):
+                            t0 = time.perf_counter()
+                            count = len(run())
+                            timings.append(time.perf_counter() - t0)
+                        rates[name] = count / statistics.median(timings)
+                    self.stdout.write(
+                        f"{label:<11} Seite {size:>3}: Serializer {rates['Serializer']:8.0f} Obj/s  "
+                        f"Projektion {rates['Projektion']:8.0f} Obj/s  "
+                        f"(x{rates['Projektion'] / rates['Serializer']:.1f})"
+                    )
@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from forum.models import Post
+from forum.ranking import benchmark_recompute, recompute_ranks
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark: Rechenzeit der Rang-Neuberechnung in Abhängigkeit von der "
+        "Anzahl Posts (NumPy vs. zeilenweise), optional inkl. Datenbank."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            default="1000,10000,100000,1000000",
+            help="Kommagetrennte Postanzahlen (Default: 1000,10000,100000,1000000).",
+        )
+        parser.add_argument(
+            "--db",
+            action="store_true",
+            help="Zusätzlich einen vollständigen recompute_ranks()-Lauf auf der DB messen.",
+        )
+
+    def handle(self, *args, **options):
+        sizes = [int(s) for s in options["sizes"].split(",") if s.strip()]
+
+        self.stdout.write(f"{'Posts':>10} {'NumPy':>10} {'Python':>10} {'Faktor':>8} {'µs/Post':>8}")
+        for n, t_np, t_py in benchmark_recompute(sizes):
+            self.stdout.write(
+                f"{n:>10} {t_np * 1000:>8.2f}ms {t_py * 1000:>8.1f}ms "
+                f"{t_py / t_np:>7.1f}x {t_np / n * 1e6:>8.3f}"
+            )
+
+        if options["db"]:
+            count = Post.objects.filter(is_deleted=False).count()
+            t0 = time.perf_counter()
+            recompute_ranks()
+            elapsed = time.perf_counter() - t0
+            self.stdout.write(
+                f"DB-Lauf: {count} Posts in {elapsed:.2f}s "
+                f"({elapsed / max(count, 1) * 1e6:.1f} µs/Post)"
+            )
@@ -0,0 +1,87 @@
+import gzip
+import json
+import statistics
+import time
+
+import msgpack
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from django.test import override_settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from forum.models import Post
+from forum.renderers import MessagePackRenderer, ORJSONRenderer
+
+RENDERERS = [
+    ("DRF JSON", JSONRenderer()),
+    ("orjson", ORJSONRenderer()),
+    ("MessagePack", MessagePackRenderer()),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Microbenchmark Renderer: DRF-JSONRenderer vs. orjson vs. MessagePack "
+        "(forum.renderers) für typische Feed-Seiten. Ausgabe: Encode-Zeit, "
+        "Bytes roh und gzip; prüft, dass orjson dieselben Bytes liefert."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--page-sizes", default="10,50", help="Einträge pro Seite (Default: 10,50).")
+        parser.add_argument("--repeat", type=int, default=200, help="Durchläufe pro Messung (Default: 200).")
+
+    def handle(self, *args, **options):
+        client = APIClient()
+        user = get_user_model().objects.annotate(n=Count("post_votes")).order_by("-n").first()
+        if user is not None:
+            client.force_authenticate(user)
+        busiest = Post.objects.filter(is_deleted=False).order_by("-comment_count").values_list("pk", flat=True).first()
+        endpoints = [("Posts", "/api/posts/"), ("Home-Feed", "/api/feed/"), ("Communities", "/api/communities/")]
+        if busiest is not None:
+            endpoints.append(("Kommentare", f"/api/comments/?post={busiest}"))
+
+        with override_settings(ALLOWED_HOSTS=["testserver"], RESPONSE_CACHE_ENABLED=False):
+            for label, url in endpoints:
+                for size in map(int, options["page_sizes"].split(",")):
+                    data = self._page(client, url, size)
+                    if data is None:
+                        continue
+                    self._measure(f"{label} ({len(data['results'])})", data, options["repeat"])
+
+    def _page(self, client, url, size):
+        """Erste Seite des Endpunkts, mit Folgeseiten auf size Einträge aufgefüllt."""
+        response = client.get(url)
+        if response.status_code != 200 or "results" not in response.data:
+            return None
+        data = dict(response.data)
+        results = list(data["results"])
+        next_url = data.get("next")
+        while len(results) < size and next_url:
+            response = client.get(next_url.split("testserver", 1)[-1])
+            results.extend(response.data["results"])
+            next_url = response.data.get("next")
+        data["results"] = results[:size]
+        return data
+
+    def _measure(self, label, data, repeat):
+        expected = JSONRenderer().render(data)
+        parts = []
+        for name, renderer in RENDERERS:
+            content = renderer.render(data)
+            if renderer.format == "json" and content != expected:
+                self.stderr.write(f"{label}: {name} weicht von DRF JSON ab")
+            timings = []
+            for _ in range(repeat):
+                t0 = time.perf_counter()
+                renderer.render(data)
+                timings.append(time.perf_counter() - t0)
+            parts.append(
+                f"{name} {statistics.median(timings) * 1e6:7.0f} µs "
+                f"{len(content):>7} B ({len(gzip.compress(content)):>6} gz)"
+            )
+        self.stdout.write(f"{label:<17} " + "  ".join(parts))
+        # MessagePack muss dieselbe Struktur liefern wie JSON
+        if msgpack.unpackb(MessagePackRenderer().render(data), raw=False) != json.loads(expected):
+            self.stderr.write(f"{label}: MessagePack-Struktur weicht ab")
@@ -0,0 +1,66 @@
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from django.test import Client, override_settings
+
+from forum.metrics import cache_stats
+from forum.models import Community, Post
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark Antwort-Cache (forum.response_cache): anonyme GETs auf "
+        "Community-Verzeichnis, -Detail, -Posts und Kommentare eines Posts, "
+        "jeweils mit und ohne Cache (Requests/s, Trefferquote)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--community", help="Slug (Default: Community mit den meisten Posts).")
+        parser.add_argument("--requests", type=int, default=200, help="Requests pro Endpunkt (Default: 200).")
+
+    def handle(self, *args, **options):
+        if options["community"]:
+            community = Community.objects.get(slug=options["community"])
+        else:
+            community = Community.objects.annotate(n=Count("posts")).order_by("-n").first()
+        if community is None:
+            self.stdout.write(self.style.WARNING("Keine Communities – zuerst seed_demo_data ausführen."))
+            return
+        post = (
+            Post.objects.filter(community=community, is_deleted=False)
+            .order_by("-comment_count").first()
+        )
+
+        urls = [
+            "/api/communities/",
+            f"/api/communities/{community.slug}/",
+            f"/api/communities/{community.slug}/posts/",
+        ]
+        if post is not None:
+            urls.append(f"/api/posts/{post.pk}/comments/")
+
+        stats = cache_stats("responses")
+        client = Client()
+        with override_settings(ALLOWED_HOSTS=["testserver"]):
+            for url in urls:
+                self.stdout.write(url)
+                for enabled in (False, True):
+                    with override_settings(RESPONSE_CACHE_ENABLED=enabled):
+                        cache.clear()
+                        client.get(url)  # Aufwärmen bzw. Cache befüllen
+                        hits, misses = stats.hits, stats.misses
+                        t0 = time.perf_counter()
+                        for _ in range(options["requests"]):
+                            resp = client.get(url)
+                        elapsed = time.perf_counter() - t0
+                    assert resp.status_code == 200, resp.status_code
+                    served = (stats.hits - hits) + (stats.misses - misses)
+                    ratio = f"{(stats.hits - hits) / served:.0%}" if served else "-"
+                    self.stdout.write(
+                        f"  Cache {'an ' if enabled else 'aus'}: "
+                        f"{options['requests'] / elapsed:8.1f} req/s  "
+                        f"{elapsed / options['requests'] * 1000:6.2f}ms/Request  Treffer: {ratio}"
+                    )
+        self.stdout.write(self.style.SUCCESS("Fertig."))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from forum.uploads import expire_upload_sessions
+
+
+class Command(BaseCommand):
+    help = (
+        "Löscht abgelaufene Resumable-Upload-Sessions (UPLOAD_SESSION_TTL_HOURS) "
+        "samt ihrer Chunk-Dateien unter UPLOAD_CHUNK_DIR. Für Cron/Timer gedacht."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Anzahl Sessions pro Batch (Default: 500).",
+        )
+
+    def handle(self, *args, **options):
+        deleted = expire_upload_sessions(batch_size=max(1, options["batch_size"]), stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(f"Fertig: {deleted} Sessions gelöscht."))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from forum.blobs import collect_blob_garbage
+
+
+class Command(BaseCommand):
+    help = (
+        "Löscht inhaltsadressierte Uploads (forum.blobs) ohne Referenz, deren "
+        "letzter Upload älter als MEDIA_BLOB_GC_GRACE_HOURS ist, inkl. "
+        "Bild-Ableitungen. Für Cron/Timer gedacht."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--grace-hours", type=int, help="Überschreibt MEDIA_BLOB_GC_GRACE_HOURS.")
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Anzahl Blobs pro Batch/Transaktion (Default: 500).",
+        )
+        parser.add_argument("--dry-run", action="store_true", help="Nur zählen, nichts löschen.")
+
+    def handle(self, *args, **options):
+        if options["dry_run"]:
+            count = collect_blob_garbage(grace_hours=options["grace_hours"], dry_run=True)
+            self.stdout.write(f"{count} Blobs würden gelöscht.")
+            return
+        self.stdout.write(self.style.WARNING("Lösche unreferenzierte Blobs …"))
+        deleted = collect_blob_garbage(
+            grace_hours=options["grace_hours"],
+            batch_size=max(1, options["batch_size"]),
+            stdout=self.stdout,
+        )
+        self.stdout.write(self.style.SUCCESS(f"Fertig: {deleted} Blobs gelöscht."))
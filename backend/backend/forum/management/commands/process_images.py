@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from forum.media import backfill_image_assets
+
+
+class Command(BaseCommand):
+    help = (
+        "Erzeugt Thumbnails/WebP-Größen (forum.media.IMAGE_VARIANTS) für alle "
+        "referenzierten Bilder ohne fertiges ImageAsset, z.B. Uploads von vor "
+        "der Pipeline oder nach fehlgeschlagenen Hintergrund-Tasks."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--reprocess",
+            action="store_true",
+            help="Auch fertige Assets neu erzeugen (nach Änderung von IMAGE_VARIANTS).",
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.WARNING("Erzeuge Bild-Ableitungen …"))
+        done, failed = backfill_image_assets(reprocess=options["reprocess"], stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(f"Fertig: {done} verarbeitet, {failed} fehlgeschlagen."))
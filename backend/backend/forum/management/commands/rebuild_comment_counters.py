@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from forum.counters import rebuild_comment_counters
+
+
+class Command(BaseCommand):
+    help = (
+        "Berechnet reply_count/descendant_count/last_reply_at aller "
+        "Kommentare neu (in Batches von Posts). Setzt Comment.path voraus "
+        "(backfill_comment_paths)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Anzahl Posts pro Batch/Transaktion (Default: 500).",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options["batch_size"])
+        self.stdout.write(self.style.WARNING("Berechne Kommentar-Zähler neu …"))
+        changed = rebuild_comment_counters(batch_size=batch_size, stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(f"Fertig: {changed} Kommentare korrigiert."))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from forum.counters import rebuild_post_counters
+
+
+class Command(BaseCommand):
+    help = (
+        "Berechnet score/upvotes/downvotes/comment_count aller Posts "
+        "aus Votes und Kommentaren neu (in Batches)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Anzahl Posts pro Batch/Transaktion (Default: 1000).",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options["batch_size"])
+        self.stdout.write(self.style.WARNING("Berechne Post-Zähler neu …"))
+        changed = rebuild_post_counters(batch_size=batch_size, stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(f"Fertig: {changed} Posts korrigiert."))
@@ -0,0 +1,67 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from forum.ranking import recompute_ranks, recompute_recent_ranks
+
+
+class Command(BaseCommand):
+    help = (
+        "Berechnet hot_rank/rising_rank der Posts neu (vektorisiert in Batches). "
+        "Mit --loop läuft der Befehl als Hintergrund-Worker."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Alle Posts statt nur der letzten Tage neu berechnen.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+            help="Posts pro SELECT/UPDATE-Batch (Default: 5000).",
+        )
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Endlos wiederholen (für einen eigenen Worker-Container).",
+        )
+        parser.add_argument(
+            "--interval",
+            type=int,
+            default=60,
+            help="Sekunden zwischen zwei Läufen im --loop-Modus (Default: 60).",
+        )
+        parser.add_argument(
+            "--full-interval",
+            type=int,
+            default=0,
+            help=(
+                "Im --loop-Modus alle N Sekunden einen vollen Lauf über alle Posts "
+                "einschieben, sonst nur das aktuelle Fenster (Default: 0 = nie)."
+            ),
+        )
+
+    def handle(self, *args, **options):
+        run_all = options["all"]
+        full_interval = options["full_interval"]
+        last_full = time.monotonic()
+        while True:
+            started = time.monotonic()
+            if full_interval > 0 and started - last_full >= full_interval:
+                run_all = True
+            scope = "alle" if run_all else "Fenster"
+            if run_all:
+                changed = recompute_ranks(batch_size=max(1, options["batch_size"]))
+                run_all = False  # im Loop danach nur noch inkrementell
+                last_full = started
+            else:
+                changed = recompute_recent_ranks()
+            elapsed = time.monotonic() - started
+            self.stdout.write(f"Ränge aktualisiert ({scope}): {changed} Posts in {elapsed:.2f}s")
+
+            if not options["loop"]:
+                break
+            time.sleep(max(0, options["interval"] - elapsed))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from forum.counters import rebuild_community_counters
+
+
+class Command(BaseCommand):
+    help = (
+        "Gleicht members_count/posts_count aller Communities mit "
+        "Memberships und Posts ab und korrigiert Abweichungen."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Anzahl Communities pro Batch/Transaktion (Default: 500).",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options["batch_size"])
+        self.stdout.write(self.style.WARNING("Gleiche Community-Zähler ab …"))
+        changed = rebuild_community_counters(batch_size=batch_size, stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(f"Fertig: {changed} Communities korrigiert."))
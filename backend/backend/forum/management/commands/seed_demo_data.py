@@ -6,7 +6,13 @@ from django.core.management.base import BaseCommand
 from django.db import transaction
 from django.utils import timezone
 
-from forum.models import Community, Membership, Post, PostImage, PostVote, Comment
+from forum.counters import (
+    rebuild_comment_counters,
+    rebuild_community_counters,
+    rebuild_post_counters,
+)
+from forum.threads import backfill_comment_paths
+from forum.models import Community, Membership, Post, PostImage, PostVote, Comment, make_body_preview
 
 
 class Command(BaseCommand):
@@ -192,16 +198,19 @@ def seed_demo_data(stdout, force: bool = True):
                     minutes=random.randint(0, 60 * 24),
                 )
 
+                body = (
+                    f"Dies ist ein automatisch generierter Demo-Post von {author.username} "
+                    f"in der Community {c.slug}. "
+                    f"Ist wirklich nur zum Testen da."
+                )
                 posts_to_create.append(
                     Post(
                         community=c,
                         author=author,
                         title=f"Beitrag {_}",
-                        body=(
-                            f"Dies ist ein automatisch generierter Demo-Post von {author.username} "
-                            f"in der Community {c.slug}. "
-                            f"Ist wirklich nur zum Testen da."
-                        ),
+                        body=body,
+                        # bulk_create umgeht Post.save()
+                        body_preview=make_body_preview(body),
                         image_url="",
                         is_pinned=random.random() < 0.05,
                         is_locked=random.random() < 0.05,
@@ -287,6 +296,12 @@ def seed_demo_data(stdout, force: bool = True):
 
         PostVote.objects.bulk_create(votes_to_create, ignore_conflicts=True)
 
+        stdout.write("Berechne Post- und Community-Zähler …")
+        rebuild_post_counters()
+        rebuild_community_counters()
+        backfill_comment_paths()
+        rebuild_comment_counters()
+
         stdout.write(
         "Seed abgeschlossen:\n"
         f"- {User.objects.filter(email__endswith='@example.com').count()} User "
@@ -0,0 +1,100 @@
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count, Q, Sum
+
+from forum.counters import refresh_post_counters
+from forum.models import Post, PostVote
+from forum.votes import VOTE_VALUES, cast_votes
+
+
+class Command(BaseCommand):
+    help = (
+        "Stresstest für forum.votes.cast_votes: feuert viele parallele Votes "
+        "(inkl. Doppelklicks desselben Users) auf wenige Posts und prüft "
+        "danach score/upvotes/downvotes gegen die PostVote-Tabelle. "
+        "Verändert Votes – nur gegen Entwicklungsdaten ausführen."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--posts", type=int, nargs="+", help="Post-IDs (Default: die 3 neuesten Posts).")
+        parser.add_argument("--users", type=int, default=50, help="Anzahl beteiligter User (Default: 50).")
+        parser.add_argument("--votes", type=int, default=5000, help="Anzahl Vote-Aufrufe (Default: 5000).")
+        parser.add_argument("--workers", type=int, default=16, help="Parallele Threads (Default: 16).")
+        parser.add_argument("--batch-ratio", type=float, default=0.2,
+                            help="Anteil Batch-Aufrufe über alle Posts (Default: 0.2).")
+        parser.add_argument("--seed", type=int, default=1)
+
+    def handle(self, *args, **options):
+        post_ids = options["posts"] or list(
+            Post.objects.order_by("-created_at").values_list("pk", flat=True)[:3]
+        )
+        user_ids = list(
+            get_user_model().objects.order_by("pk").values_list("pk", flat=True)[: options["users"]]
+        )
+        if not post_ids or not user_ids:
+            raise CommandError("Keine Posts/User vorhanden (seed_demo_data).")
+
+        # Ausgangszustand abgleichen, damit nur Drift aus diesem Lauf zählt
+        refresh_post_counters(post_ids)
+
+        rng = random.Random(options["seed"])
+        calls = []
+        for _ in range(options["votes"]):
+            user_id = rng.choice(user_ids)
+            if rng.random() < options["batch_ratio"]:
+                calls.append((user_id, [(pid, rng.choice(VOTE_VALUES)) for pid in post_ids], False))
+            else:
+                calls.append((user_id, [(rng.choice(post_ids), rng.choice(VOTE_VALUES))], True))
+
+        def run(chunk):
+            # eine Verbindung pro Worker, Aufrufe verschachtelt über alle Worker
+            try:
+                for user_id, votes, toggle in chunk:
+                    cast_votes(user_id, votes, toggle=toggle)
+            finally:
+                connection.close()
+
+        self.stdout.write(
+            f"{len(calls)} Aufrufe, {len(user_ids)} User, Posts {post_ids}, {options['workers']} Threads"
+        )
+        t0 = time.perf_counter()
+        workers = options["workers"]
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for future in [pool.submit(run, calls[i::workers]) for i in range(workers)]:
+                future.result()
+        elapsed = time.perf_counter() - t0
+        self.stdout.write(f"{elapsed:.2f}s, {len(calls) / elapsed:.0f} Aufrufe/s")
+
+        expected = {
+            row["post_id"]: (
+                row["s"] or 0,
+                row["up"],
+                row["down"],
+            )
+            for row in PostVote.objects.filter(post_id__in=post_ids)
+            .values("post_id")
+            .annotate(
+                s=Sum("value"),
+                up=Count("id", filter=Q(value=PostVote.Value.UP)),
+                down=Count("id", filter=Q(value=PostVote.Value.DOWN)),
+            )
+        }
+        drift = 0
+        for pk, score, up, down in Post.objects.filter(pk__in=post_ids).values_list(
+            "pk", "score", "upvotes", "downvotes"
+        ):
+            want = expected.get(pk, (0, 0, 0))
+            ok = (score, up, down) == want
+            drift += not ok
+            self.stdout.write(
+                f"Post {pk}: gespeichert {(score, up, down)}, aus Votes {want} "
+                + ("OK" if ok else "DRIFT")
+            )
+        if drift:
+            raise CommandError(f"{drift} Post(s) mit abweichenden Zählern.")
+        self.stdout.write(self.style.SUCCESS("Zähler konsistent."))
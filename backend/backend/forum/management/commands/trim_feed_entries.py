@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from forum.feed import trim_timelines
+
+
+class Command(BaseCommand):
+    help = "Kürzt jede FeedEntry-Timeline auf die neuesten N Einträge."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--keep",
+            type=int,
+            default=None,
+            help="Einträge pro User behalten (Default: FEED_TIMELINE_LENGTH).",
+        )
+
+    def handle(self, *args, **options):
+        keep = options["keep"] or settings.FEED_TIMELINE_LENGTH
+        removed = trim_timelines(keep=keep)
+        self.stdout.write(self.style.SUCCESS(f"{removed} Einträge entfernt (behalten: {keep}/User)."))
@@ -0,0 +1,308 @@
+import io
+import logging
+import os
+from urllib.parse import unquote, urlparse
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import ExifTags, Image, ImageOps
+from rest_framework.exceptions import ValidationError
+
+from .models import ImageAsset
+from .tasks import run_in_background
+
+logger = logging.getLogger(__name__)
+
+# Ableitungen pro hochgeladenem Bild: Name -> (max. Breite, max. Höhe, zuschneiden).
+# Zugeschnittene Größen füllen das Format exakt (Avatare, Icons), die übrigen
+# werden proportional eingepasst und nie vergrößert.
+IMAGE_VARIANTS = {
+    "thumb": (64, 64, True),
+    "small": (320, 320, False),
+    "medium": (640, 640, False),
+    "large": (1280, 1280, False),
+}
+WEBP_QUALITY = 80
+
+# Angenommene Upload-Formate (Pillow-Name) und Endung der gespeicherten Datei
+IMAGE_FORMATS = {"JPEG": ".jpg", "PNG": ".png", "GIF": ".gif", "WEBP": ".webp"}
+
+
+# --- Namen/URLs ----------------------------------------------------------------
+
+def storage_name_from_url(url):
+    """
+    Storage-Name zu einer (absoluten oder relativen) Media-URL, None für
+    fremde URLs (z.B. externe Bilder aus den Demo-Daten).
+    """
+    if not url:
+        return None
+    path = urlparse(url).path
+    if not path.startswith(settings.MEDIA_URL):
+        return None
+    return unquote(path[len(settings.MEDIA_URL):]) or None
+
+
+def variant_name(name: str, variant: str) -> str:
+    """post_images/abc.jpg -> post_images/abc.small.webp"""
+    return f"{os.path.splitext(name)[0]}.{variant}.webp"
+
+
+# --- Verarbeitung ----------------------------------------------------------------
+
+def validate_image(file) -> str:
+    """
+    Dekodiert die Datei vollständig (nicht nur Header oder Content-Type)
+    und gibt die Endung zum erkannten Format zurück. Image.MAX_IMAGE_PIXELS
+    begrenzt Dekompressionsbomben.
+    """
+    try:
+        with Image.open(file) as img:
+            fmt = img.format
+            # JPEG: kompletter Datenstrom, aber IDCT in 1/8-Auflösung
+            img.draft(img.mode, (max(1, img.width // 8), max(1, img.height // 8)))
+            img.load()
+    except (OSError, ValueError, SyntaxError, Image.DecompressionBombError):
+        raise ValidationError("Datei ist kein gültiges Bild.")
+    finally:
+        file.seek(0)
+    if fmt not in IMAGE_FORMATS:
+        raise ValidationError(f"Bildformat {fmt} wird nicht unterstützt.")
+    return IMAGE_FORMATS[fmt]
+
+
+def _has_metadata(img) -> bool:
+    return bool(img.getexif()) or any(key in img.info for key in ("xmp", "XML:com.adobe.xmp", "exif"))
+
+
+def strip_image_metadata(file):
+    """
+    Entfernt EXIF (Kamera, GPS, ...) und XMP aus einem hochgeladenen Bild,
+    bevor das Original gespeichert und gehasht wird – Originale sind
+    öffentlich (image_url, "original" in den Größen-Maps). Die EXIF-
+    Orientierung wird vorher angewendet, das ICC-Profil bleibt. Dateien
+    ohne Metadaten und GIFs kommen unverändert zurück; JPEGs ohne Drehung
+    behalten ihre Quantisierungstabellen (quality="keep"). Erwartet eine
+    mit validate_image geprüfte Datei.
+    """
+    try:
+        with Image.open(file) as img:
+            if img.format not in ("JPEG", "PNG", "WEBP") or not _has_metadata(img):
+                return file
+            fmt = img.format
+            rotated = img.getexif().get(ExifTags.Base.Orientation, 1) != 1
+            params = {}
+            if img.info.get("icc_profile"):
+                params["icc_profile"] = img.info["icc_profile"]
+            out = ImageOps.exif_transpose(img) if rotated else img
+            if fmt == "JPEG":
+                params.update({"quality": 95} if rotated else {"quality": "keep"})
+            elif fmt == "PNG":
+                if "transparency" in img.info:
+                    params["transparency"] = img.info["transparency"]
+            else:
+                animated = getattr(img, "is_animated", False)
+                params.update(quality=90, save_all=animated and not rotated)
+            buf = io.BytesIO()
+            # ohne exif=/xmp= -> keine Metadaten in der neuen Datei
+            out.save(buf, format=fmt, **params)
+    except (OSError, ValueError, SyntaxError, Image.DecompressionBombError):
+        raise ValidationError("Datei ist kein gültiges Bild.")
+    finally:
+        file.seek(0)
+    return ContentFile(buf.getvalue(), name=file.name)
+
+
+def register_image(name: str) -> ImageAsset:
+    """
+    Legt das Asset zu einem gerade gespeicherten Original an und plant die
+    Ableitungen im Hintergrund-Pool (forum.tasks), also nach der Antwort.
+    """
+    asset, created = ImageAsset.objects.get_or_create(name=name)
+    if created or asset.status != ImageAsset.Status.READY:
+        run_in_background(process_image, name)
+    return asset
+
+
+def _prepare(img):
+    # EXIF-Orientierung anwenden, danach werden Metadaten nicht mitgeschrieben
+    img = ImageOps.exif_transpose(img)
+    has_alpha = "A" in img.getbands() or "transparency" in img.info
+    mode = "RGBA" if has_alpha else "RGB"
+    return img if img.mode == mode else img.convert(mode)
+
+
+def _render(img, width: int, height: int, crop: bool) -> bytes:
+    if crop:
+        out = ImageOps.fit(img, (width, height), Image.Resampling.LANCZOS)
+    else:
+        out = img.copy()
+        out.thumbnail((width, height), Image.Resampling.LANCZOS)
+    buf = io.BytesIO()
+    # ohne exif=/icc_profile= -> Ableitungen enthalten keine Metadaten
+    out.save(buf, format="WEBP", quality=WEBP_QUALITY, method=4)
+    return buf.getvalue()
+
+
+def process_image(name: str) -> bool:
+    """
+    Erzeugt alle IMAGE_VARIANTS als WebP neben dem Original und hält
+    Breite/Höhe (nach EXIF-Drehung) am ImageAsset fest. Nicht lesbare
+    Dateien werden als FAILED markiert. Gibt True bei Erfolg zurück.
+    """
+    try:
+        with default_storage.open(name, "rb") as fh, Image.open(fh) as original:
+            img = _prepare(original)
+            width, height = img.size
+            variants = {}
+            for variant, (max_w, max_h, crop) in IMAGE_VARIANTS.items():
+                data = _render(img, max_w, max_h, crop)
+                target = variant_name(name, variant)
+                if default_storage.exists(target):
+                    default_storage.delete(target)
+                variants[variant] = default_storage.save(target, ContentFile(data))
+    except (OSError, ValueError, Image.DecompressionBombError) as exc:
+        logger.warning("Bildableitung für %s fehlgeschlagen: %s", name, exc)
+        ImageAsset.objects.filter(name=name).update(status=ImageAsset.Status.FAILED)
+        return False
+
+    ImageAsset.objects.update_or_create(
+        name=name,
+        defaults={
+            "status": ImageAsset.Status.READY,
+            "width": width,
+            "height": height,
+            "variants": variants,
+        },
+    )
+    return True
+
+
+# --- Serializer ------------------------------------------------------------------
+
+def load_image_assets(urls) -> dict:
+    """
+    {storage_name: ImageAsset oder None} für alle Media-URLs, eine Abfrage.
+    None heißt: kein fertiges Asset (fremd, noch in Arbeit, fehlgeschlagen).
+    """
+    names = {n for n in map(storage_name_from_url, urls) if n}
+    if not names:
+        return {}
+    assets = dict.fromkeys(names)
+    for asset in ImageAsset.objects.filter(name__in=names, status=ImageAsset.Status.READY):
+        assets[asset.name] = asset
+    return assets
+
+
+def image_size_map(url, asset, absolute=None) -> dict:
+    """{"original": url, <Variante>: url, ...}; absolute macht URLs absolut (build_absolute_uri)."""
+    absolute = absolute or (lambda u: u)
+    sizes = {"original": absolute(url)}
+    if asset is not None:
+        for variant, name in asset.variants.items():
+            sizes[variant] = absolute(default_storage.url(name))
+    return sizes
+
+
+class ImageSizesMixin:
+    """
+    Für Serializer mit Größen-Maps ({"original": url, "thumb": url, ...}).
+    image_size_sources = {Ausgabefeld: Funktion(obj) -> URL oder Liste von
+    URLs} nennt die Bilder eines Objekts inkl. verschachtelter Serializer;
+    image_sources(obj) sammelt die URLs der ausgegebenen Felder (Feldauswahl:
+    ausgelassene Relationen sind nicht geladen). Assets liegen in
+    context["image_assets"]: für eine Seite vorab geladen (preload_page über
+    PagePreloadListSerializer), sonst pro Objekt nachgeladen.
+    """
+
+    image_size_sources = {}
+
+    def image_sources(self, obj) -> list:
+        urls = []
+        fields = self.fields
+        for name, source in self.image_size_sources.items():
+            if name not in fields:
+                continue
+            value = source(obj)
+            if isinstance(value, (list, tuple)):
+                urls.extend(value)
+            else:
+                urls.append(value)
+        return urls
+
+    def preload_page(self, objs) -> None:
+        self._load_image_assets(url for obj in objs for url in self.image_sources(obj))
+
+    def _load_image_assets(self, urls) -> dict:
+        assets = self.context.setdefault("image_assets", {})
+        missing = [
+            url for url in urls
+            if (name := storage_name_from_url(url)) and name not in assets
+        ]
+        if missing:
+            assets.update(load_image_assets(missing))
+        return assets
+
+    def image_sizes(self, obj, url):
+        if not url:
+            return None
+        asset = self._load_image_assets(self.image_sources(obj)).get(storage_name_from_url(url))
+        request = self.context.get("request")
+        return image_size_map(url, asset, request.build_absolute_uri if request else None)
+
+    def image_assets_ready(self, obj) -> bool:
+        """True, wenn alle eigenen Bilder fertige Ableitungen haben (Größen-Maps vollständig)."""
+        urls = self.image_sources(obj)
+        assets = self._load_image_assets(urls)
+        return all(assets.get(name) is not None for name in map(storage_name_from_url, urls) if name)
+
+    def image_dimensions(self, obj, url):
+        asset = self._load_image_assets(self.image_sources(obj)).get(storage_name_from_url(url))
+        return (asset.width, asset.height) if asset is not None else (None, None)
+
+
+def referenced_image_names():
+    """Storage-Namen aller Bilder, auf die Posts, Communities und Avatare verweisen."""
+    from django.contrib.auth import get_user_model
+
+    from .models import Community, Post, PostImage
+
+    urls = set(Post.objects.exclude(image_url="").values_list("image_url", flat=True))
+    urls.update(PostImage.objects.values_list("image_url", flat=True))
+    for icon, banner in Community.objects.values_list("icon_url", "banner_url"):
+        urls.update((icon, banner))
+    names = {n for n in map(storage_name_from_url, urls) if n}
+    names.update(
+        get_user_model().objects.exclude(image="").exclude(image__isnull=True)
+        .values_list("image", flat=True)
+    )
+    return names
+
+
+def backfill_image_assets(reprocess: bool = False, stdout=None) -> tuple:
+    """
+    Legt fehlende ImageAssets für bereits gespeicherte Bilder an und erzeugt
+    die Ableitungen synchron – für Uploads vor Einführung der Pipeline,
+    fehlgeschlagene Tasks oder geänderte IMAGE_VARIANTS (reprocess=True).
+    Gibt (verarbeitet, fehlgeschlagen) zurück.
+    """
+    names = referenced_image_names()
+    ready = set(
+        ImageAsset.objects.filter(name__in=names, status=ImageAsset.Status.READY)
+        .values_list("name", flat=True)
+    )
+    todo = sorted(names if reprocess else names - ready)
+    done = failed = 0
+    for name in todo:
+        if not default_storage.exists(name):
+            failed += 1
+            continue
+        ImageAsset.objects.get_or_create(name=name)
+        if process_image(name):
+            done += 1
+        else:
+            failed += 1
+        if stdout is not None and (done + failed) % 100 == 0:
+            stdout.write(f"… {done + failed}/{len(todo)}")
+    return done, failed
@@ -0,0 +1,97 @@
+import threading
+import time
+from contextlib import contextmanager
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+class CacheStats:
+    """Treffer/Fehlschläge eines Caches pro Prozess (Worker)."""
+
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def hit(self, n: int = 1) -> None:
+        with self._lock:
+            self.hits += n
+
+    def miss(self, n: int = 1) -> None:
+        with self._lock:
+            self.misses += n
+
+    def invalidated(self, n: int = 1) -> None:
+        with self._lock:
+            self.invalidations += n
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "hit_ratio": round(self.hits / total, 4) if total else None,
+            }
+
+
+def cache_stats(name: str) -> CacheStats:
+    with _registry_lock:
+        if name not in _registry:
+            _registry[name] = CacheStats(name)
+        return _registry[name]
+
+
+def all_cache_stats() -> dict:
+    with _registry_lock:
+        stats = list(_registry.values())
+    return {s.name: s.snapshot() for s in stats}
+
+
+class RequestTimings:
+    """
+    Messwerte eines Requests (Name, Dauer in ms, Beschreibung), als
+    Server-Timing-Header ausgegeben (forum.middleware). Threadsicher, damit
+    Worker-Threads eines Requests direkt eintragen können.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.entries = []
+
+    def add(self, name: str, ms: float, desc: str = "") -> None:
+        with self._lock:
+            self.entries.append((name, ms, desc))
+
+    @contextmanager
+    def measure(self, name: str, desc: str = ""):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, (time.perf_counter() - t0) * 1000, desc)
+
+    def header(self) -> str:
+        with self._lock:
+            entries = list(self.entries)
+        parts = []
+        for name, ms, desc in entries:
+            part = f"{name};dur={ms:.1f}"
+            if desc:
+                desc = desc.encode("ascii", "replace").decode().replace("\\", "").replace('"', "'")
+                part += f';desc="{desc}"'
+            parts.append(part)
+        return ", ".join(parts)
+
+
+def request_timings(request) -> RequestTimings:
+    """Timings des Requests; liegen am HttpRequest wie der RoleResolver."""
+    http_request = getattr(request, "_request", request)
+    timings = getattr(http_request, "_timings", None)
+    if timings is None:
+        timings = http_request._timings = RequestTimings()
+    return timings
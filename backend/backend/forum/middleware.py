@@ -0,0 +1,23 @@
+import time
+
+from .metrics import request_timings
+
+
+class ServerTimingMiddleware:
+    """
+    Gibt die in forum.metrics.request_timings gesammelten Messwerte plus
+    die Gesamtdauer als Server-Timing-Header aus (sichtbar z.B. in den
+    Browser-DevTools). Nur für Requests, die etwas gemessen haben.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        t0 = time.perf_counter()
+        response = self.get_response(request)
+        timings = getattr(request, "_timings", None)
+        if timings is not None and timings.entries:
+            timings.add("total", (time.perf_counter() - t0) * 1000)
+            response["Server-Timing"] = timings.header()
+        return response
@@ -0,0 +1,69 @@
+# Generated by Django 5.2.8 on 2026-10-17 12:17
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+BACKFILL_SQL = """
+UPDATE forum_post p
+SET score = v.s, upvotes = v.up, downvotes = v.down
+FROM (
+    SELECT post_id,
+           SUM(value) AS s,
+           COUNT(*) FILTER (WHERE value = 1) AS up,
+           COUNT(*) FILTER (WHERE value = -1) AS down
+    FROM forum_postvote
+    GROUP BY post_id
+) v
+WHERE v.post_id = p.id;
+
+UPDATE forum_post p
+SET comment_count = c.n
+FROM (
+    SELECT post_id, COUNT(*) AS n
+    FROM forum_comment
+    WHERE NOT is_deleted
+    GROUP BY post_id
+) c
+WHERE c.post_id = p.id;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forum', '0006_comment'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='downvotes',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='score',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='upvotes',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['community', 'is_pinned', 'created_at'], name='forum_post_communi_eeca36_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['community', 'is_pinned', 'score'], name='forum_post_communi_c54f88_idx'),
+        ),
+        migrations.RunSQL(BACKFILL_SQL, reverse_sql=migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.8 on 2026-10-17 12:18
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+BACKFILL_SQL = """
+UPDATE forum_community c
+SET members_count = (
+        SELECT COUNT(*) FROM forum_membership m
+        WHERE m.community_id = c.id
+          AND m.role IN ('member', 'moderator', 'owner')
+    ),
+    posts_count = (
+        SELECT COUNT(*) FROM forum_post p
+        WHERE p.community_id = c.id AND NOT p.is_deleted
+    );
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forum', '0007_post_counters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='community',
+            name='members_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='community',
+            name='posts_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='community',
+            index=models.Index(fields=['members_count', 'created_at'], name='forum_commu_members_c1f6fd_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='community',
+            index=models.Index(fields=['posts_count', 'created_at'], name='forum_commu_posts_c_87471c_idx'),
+        ),
+        migrations.RunSQL(BACKFILL_SQL, reverse_sql=migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.8 on 2026-10-17 12:21
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+# Entspricht forum.ranking.hot_rank(); rising_rank füllt der erste
+# Lauf von recompute_post_ranks.
+BACKFILL_SQL = """
+UPDATE forum_post
+SET hot_rank = ROUND((
+    SIGN(score) * LOG(GREATEST(ABS(score), 1))
+    + (EXTRACT(EPOCH FROM created_at) - 1700000000) / 45000.0
+)::numeric, 7);
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forum', '0008_community_counters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='hot_rank',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='rising_rank',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['community', 'is_pinned', 'hot_rank'], name='forum_post_communi_90e5ac_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['community', 'is_pinned', 'rising_rank'], name='forum_post_communi_7e8496_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['is_pinned', 'hot_rank'], name='forum_post_is_pinn_e6cc37_idx'),
+        ),
+        migrations.RunSQL(BACKFILL_SQL, reverse_sql=migrations.RunSQL.noop),
+    ]
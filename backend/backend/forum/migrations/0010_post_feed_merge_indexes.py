@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-17 12:23
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forum', '0009_post_ranks'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['community', 'created_at', 'id'], name='forum_post_communi_47276f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['community', 'score', 'id'], name='forum_post_communi_5fb799_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.8 on 2026-10-17 12:29
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.conf import settings
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_user_trigram_indexes'),
+        ('forum', '0012_search_vectors'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='community',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('slug'), name='gin_trgm_ops'), name='forum_comm_slug_trgm'),
+        ),
+        migrations.AddIndex(
+            model_name='community',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('name'), name='gin_trgm_ops'), name='forum_comm_name_trgm'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.8 on 2026-10-17 12:36
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+# Entspricht forum.threads.comment_path(); läuft vor dem Index-Aufbau
+BACKFILL_SQL = """
+WITH RECURSIVE tree AS (
+    SELECT id, lpad(id::text, 10, '0') || '/' AS path
+    FROM forum_comment
+    WHERE parent_id IS NULL
+    UNION ALL
+    SELECT c.id, tree.path || lpad(c.id::text, 10, '0') || '/'
+    FROM forum_comment c
+    JOIN tree ON c.parent_id = tree.id
+)
+UPDATE forum_comment c
+SET path = tree.path
+FROM tree
+WHERE c.id = tree.id;
+"""
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forum', '0013_community_trigram_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='path',
+            field=models.TextField(blank=True, db_collation='C', default='', editable=False),
+        ),
+        migrations.RunSQL(BACKFILL_SQL, reverse_sql=migrations.RunSQL.noop),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', 'path'], name='forum_comme_post_id_4c5677_idx'),
+        ),
+    ]
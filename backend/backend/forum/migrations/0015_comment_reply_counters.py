@@ -0,0 +1,61 @@
+# Generated by Django 5.2.8 on 2026-10-17 12:38
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+# Entspricht forum.counters.refresh_comment_counters() über alle Posts;
+# Vorfahren kommen aus Comment.path (0014)
+BACKFILL_SQL = """
+WITH replies AS (
+    SELECT parent_id AS id, count(*) AS n
+    FROM forum_comment
+    WHERE NOT is_deleted AND parent_id IS NOT NULL
+    GROUP BY parent_id
+),
+descendants AS (
+    SELECT a.id::bigint AS id, count(*) AS n, max(d.created_at) AS last
+    FROM forum_comment d
+    CROSS JOIN LATERAL unnest(string_to_array(rtrim(d.path, '/'), '/')) AS a(id)
+    WHERE NOT d.is_deleted AND a.id::bigint <> d.id
+    GROUP BY a.id::bigint
+)
+UPDATE forum_comment c
+SET reply_count = COALESCE(r.n, 0),
+    descendant_count = COALESCE(d.n, 0),
+    last_reply_at = d.last
+FROM forum_comment c2
+LEFT JOIN replies r ON r.id = c2.id
+LEFT JOIN descendants d ON d.id = c2.id
+WHERE c.id = c2.id AND (r.id IS NOT NULL OR d.id IS NOT NULL);
+"""
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forum', '0014_comment_path'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='descendant_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='last_reply_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='reply_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunSQL(BACKFILL_SQL, reverse_sql=migrations.RunSQL.noop),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', 'parent', 'descendant_count'], name='forum_comme_post_id_e66138_idx'),
+        ),
+    ]
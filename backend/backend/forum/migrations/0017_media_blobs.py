@@ -0,0 +1,41 @@
+# Generated by Django 5.2.8 on 2026-10-17 12:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forum', '0016_image_asset'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(max_length=64, unique=True)),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('size', models.PositiveBigIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_uploaded_at', models.DateTimeField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['last_uploaded_at'], name='forum_media_last_up_36c826_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='MediaReference',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('owner', models.CharField(max_length=30)),
+                ('owner_id', models.BigIntegerField()),
+                ('blob', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='references', to='forum.mediablob')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['owner', 'owner_id'], name='forum_media_owner_2d3541_idx')],
+                'unique_together': {('blob', 'owner', 'owner_id')},
+            },
+        ),
+    ]
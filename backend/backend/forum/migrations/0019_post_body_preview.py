@@ -0,0 +1,32 @@
+# Generated by Django 5.2.8 on 2026-10-17 13:01
+
+from django.db import migrations, models
+
+
+# Entspricht forum.models.make_body_preview() (BODY_PREVIEW_LENGTH = 280)
+BACKFILL_SQL = """
+UPDATE forum_post AS p
+SET body_preview = CASE
+    WHEN char_length(n.text) <= 280 THEN n.text
+    ELSE rtrim(left(n.text, 279)) || '…'
+END
+FROM (
+    SELECT id, btrim(regexp_replace(body, '\\s+', ' ', 'g')) AS text FROM forum_post
+) AS n
+WHERE p.id = n.id;
+"""
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forum', '0018_upload_sessions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='body_preview',
+            field=models.CharField(blank=True, default='', max_length=280),
+        ),
+        migrations.RunSQL(BACKFILL_SQL, reverse_sql=migrations.RunSQL.noop),
+    ]
@@ -1,7 +1,34 @@
+import uuid
+
 from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from django.db import models
+from django.db.models.functions import Upper
 from django.utils.text import slugify
 
+# Textsuche-Konfiguration für Post/Comment.search_vector (Inhalte sind deutsch)
+SEARCH_CONFIG = "german"
+
+
+# Länge von Post.body_preview (Feed-Karten), inkl. "…"
+BODY_PREVIEW_LENGTH = 280
+
+
+def make_body_preview(body: str) -> str:
+    """Whitespace zusammengefasst, auf BODY_PREVIEW_LENGTH Zeichen gekürzt."""
+    text = " ".join((body or "").split())
+    if len(text) <= BODY_PREVIEW_LENGTH:
+        return text
+    return text[:BODY_PREVIEW_LENGTH - 1].rstrip() + "…"
+
+
+class SearchVectorDeferringManager(models.Manager):
+    """search_vector wird nur für die Suche gebraucht – nicht in jedem SELECT laden."""
+
+    def get_queryset(self):
+        return super().get_queryset().defer("search_vector")
+
 
 class Community(models.Model):
     class Visibility(models.TextChoices):
@@ -26,11 +53,21 @@ class Community(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # Denormalisierte Zähler, gepflegt in forum.counters
+    members_count = models.PositiveIntegerField(default=0)
+    posts_count = models.PositiveIntegerField(default=0)
+
     class Meta:
         indexes = [
             models.Index(fields=["slug"]),
             models.Index(fields=["visibility"]),
             models.Index(fields=["created_at"]),
+            models.Index(fields=["members_count", "created_at"]),
+            models.Index(fields=["posts_count", "created_at"]),
+            # Typeahead/Suche (pg_trgm) auf UPPER(...): deckt icontains (Admin,
+            # SearchFilter) und word_similarity aus forum.search ab
+            GinIndex(OpClass(Upper("slug"), name="gin_trgm_ops"), name="forum_comm_slug_trgm"),
+            GinIndex(OpClass(Upper("name"), name="gin_trgm_ops"), name="forum_comm_name_trgm"),
         ]
         ordering = ["-created_at"]
 
@@ -78,6 +115,8 @@ class Post(models.Model):
     )
     title = models.CharField(max_length=200)
     body = models.TextField(blank=True)
+    # beim Speichern aus body abgeleitet (make_body_preview), für Listen ohne body
+    body_preview = models.CharField(max_length=BODY_PREVIEW_LENGTH, blank=True, default="")
     image_url = models.URLField(blank=True)
 
     is_pinned = models.BooleanField(default=False)
@@ -85,21 +124,60 @@ class Post(models.Model):
 
     is_deleted = models.BooleanField(default=False)
 
+    # Denormalisierte Zähler, gepflegt in forum.counters
+    score = models.IntegerField(default=0)
+    upvotes = models.PositiveIntegerField(default=0)
+    downvotes = models.PositiveIntegerField(default=0)
+    comment_count = models.PositiveIntegerField(default=0)
+
+    # Feed-Ränge, periodisch neu berechnet in forum.ranking
+    hot_rank = models.FloatField(default=0)
+    rising_rank = models.FloatField(default=0)
+
+    # Volltext (Titel stärker gewichtet), von Postgres bei jedem Write gepflegt
+    search_vector = models.GeneratedField(
+        expression=(
+            SearchVector("title", weight="A", config=SEARCH_CONFIG)
+            + SearchVector("body", weight="B", config=SEARCH_CONFIG)
+        ),
+        output_field=SearchVectorField(),
+        db_persist=True,
+    )
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = SearchVectorDeferringManager()
+
     class Meta:
         indexes = [
             models.Index(fields=["community", "created_at"]),
             models.Index(fields=["author", "created_at"]),
             models.Index(fields=["is_deleted"]),
             models.Index(fields=["is_pinned"]),
+            models.Index(fields=["community", "is_pinned", "created_at"]),
+            models.Index(fields=["community", "is_pinned", "score"]),
+            models.Index(fields=["community", "is_pinned", "hot_rank"]),
+            models.Index(fields=["community", "is_pinned", "rising_rank"]),
+            models.Index(fields=["is_pinned", "hot_rank"]),
+            # Merge-Feed: (community, sortfeld, id) deckt ORDER BY inkl. Tiebreaker ab
+            models.Index(fields=["community", "created_at", "id"]),
+            models.Index(fields=["community", "score", "id"]),
+            GinIndex(fields=["search_vector"]),
         ]
         ordering = ["-created_at"]
 
     def __str__(self):
         return f"[{self.community.slug}] {self.title[:50]}"
 
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None or "body" in update_fields:
+            self.body_preview = make_body_preview(self.body)
+            if update_fields is not None:
+                kwargs["update_fields"] = {*update_fields, "body_preview"}
+        super().save(*args, **kwargs)
+
 class PostImage(models.Model):
     post = models.ForeignKey(
         Post,
@@ -161,16 +239,190 @@ class Comment(models.Model):
 
     is_deleted = models.BooleanField(default=False)
 
+    # Materialisierter Pfad: ids aller Vorfahren und die eigene, je 10-stellig
+    # mit "/" abgeschlossen (forum.threads.comment_path). Collation "C", damit
+    # der Btree-Index sowohl ORDER BY path als auch LIKE 'präfix%' bedient.
+    path = models.TextField(default="", blank=True, editable=False, db_collation="C")
+
+    # Denormalisiert (forum.counters), nur nicht gelöschte Kommentare:
+    # direkte Antworten, alle Nachfahren, jüngster Nachfahre
+    reply_count = models.PositiveIntegerField(default=0)
+    descendant_count = models.PositiveIntegerField(default=0)
+    last_reply_at = models.DateTimeField(null=True, blank=True)
+
+    search_vector = models.GeneratedField(
+        expression=SearchVector("body", config=SEARCH_CONFIG),
+        output_field=SearchVectorField(),
+        db_persist=True,
+    )
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = SearchVectorDeferringManager()
+
     class Meta:
         indexes = [
+            GinIndex(fields=["search_vector"]),
             models.Index(fields=["post", "created_at"]),
             models.Index(fields=["author", "created_at"]),
             models.Index(fields=["post", "parent", "created_at"]),
+            # Thread in Anzeige-Reihenfolge / Teilbaum als ein Range-Scan
+            models.Index(fields=["post", "path"]),
+            # "meistdiskutierte Top-Level-Kommentare zuerst"
+            models.Index(fields=["post", "parent", "descendant_count"]),
         ]
         ordering = ["created_at"]
 
     def __str__(self):
-        return f"Comment {self.id} on post {self.post_id}"
\ No newline at end of file
+        return f"Comment {self.id} on post {self.post_id}"
+
+
+class FeedEntry(models.Model):
+    """
+    Vorberechnete Home-Feed-Zeile (fan-out-on-write), siehe forum.feed.
+    sort_key entspricht post.created_at, damit Cursor mit dem
+    On-Read-Feed kompatibel bleiben.
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="feed_entries"
+    )
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="feed_entries")
+    community = models.ForeignKey(Community, on_delete=models.CASCADE, related_name="+")
+    sort_key = models.DateTimeField()
+
+    class Meta:
+        unique_together = [("user", "post")]
+        indexes = [
+            models.Index(fields=["user", "sort_key", "post"]),
+            models.Index(fields=["user", "community"]),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} <- {self.post_id}"
+
+
+class ImageAsset(models.Model):
+    """
+    Metadaten und Ableitungen einer hochgeladenen Bilddatei (Post-Bilder,
+    Community-Banner/-Icons, Avatare), siehe forum.media. name ist der
+    Storage-Name des Originals, variants bildet Größe -> Storage-Name ab.
+    """
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pending"
+        READY = "ready", "Ready"
+        FAILED = "failed", "Failed"
+
+    name = models.CharField(max_length=255, unique=True)
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    width = models.PositiveIntegerField(null=True, blank=True)
+    height = models.PositiveIntegerField(null=True, blank=True)
+    variants = models.JSONField(default=dict, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "created_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.status})"
+
+
+class MediaBlob(models.Model):
+    """
+    Inhaltsadressierte Upload-Datei (forum.blobs): eine Datei pro SHA-256,
+    gleiche Uploads verweisen auf denselben Blob. last_uploaded_at schützt
+    frisch (erneut) hochgeladene, noch nicht referenzierte Blobs vor der GC.
+    """
+    sha256 = models.CharField(max_length=64, unique=True)
+    name = models.CharField(max_length=255, unique=True)
+    size = models.PositiveBigIntegerField()
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_uploaded_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["last_uploaded_at"]),
+        ]
+
+    def __str__(self):
+        return self.name
+
+
+class MediaReference(models.Model):
+    """
+    Verwendung eines Blobs durch ein Objekt, z.B. ("postimage", 17) oder
+    ("community", 3). Gepflegt per Signal (forum.signals); Blobs ohne
+    Referenz räumt collect_blob_garbage ab.
+    """
+    blob = models.ForeignKey(MediaBlob, on_delete=models.PROTECT, related_name="references")
+    owner = models.CharField(max_length=30)
+    owner_id = models.BigIntegerField()
+
+    class Meta:
+        unique_together = [("blob", "owner", "owner_id")]
+        indexes = [
+            models.Index(fields=["owner", "owner_id"]),
+        ]
+
+    def __str__(self):
+        return f"{self.owner}:{self.owner_id} -> {self.blob_id}"
+
+
+class UploadSession(models.Model):
+    """
+    Resumable Upload (forum.uploads): Client legt die Session mit Dateigröße
+    an, lädt nummerierte Chunks per PUT hoch (beliebige Reihenfolge,
+    wiederholbar) und schließt mit finalize ab. Abgelaufene Sessions räumt
+    expire_upload_sessions ab.
+    """
+
+    class Status(models.TextChoices):
+        OPEN = "open", "Open"
+        FINALIZED = "finalized", "Finalized"
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="upload_sessions"
+    )
+    filename = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100)
+    size = models.PositiveBigIntegerField()
+    chunk_size = models.PositiveIntegerField()
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.OPEN)
+    blob = models.ForeignKey(
+        MediaBlob, null=True, blank=True, on_delete=models.SET_NULL, related_name="+"
+    )
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "status"]),
+            models.Index(fields=["expires_at"]),
+        ]
+
+    @property
+    def chunk_count(self) -> int:
+        return max(1, -(-self.size // self.chunk_size))
+
+    def __str__(self):
+        return f"{self.id} ({self.user_id}, {self.status})"
+
+
+class UploadChunk(models.Model):
+    session = models.ForeignKey(UploadSession, on_delete=models.CASCADE, related_name="chunks")
+    number = models.PositiveIntegerField()
+    size = models.PositiveIntegerField()
+
+    class Meta:
+        unique_together = [("session", "number")]
+
+    def __str__(self):
+        return f"{self.session_id}#{self.number}"
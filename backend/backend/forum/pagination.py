@@ -0,0 +1,195 @@
+import base64
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db import models
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class FeedPagination(PageNumberPagination):
+    """
+    Standard: Seitenpaginierung wie bisher (?page=N).
+
+    Opt-in Keyset-Modus mit ?pagination=cursor bzw. ?cursor=<token>:
+    Die Sortierung des Querysets (z.B. -is_pinned, -created_at) wird um die
+    id als Tiebreaker ergänzt, der Cursor enthält die Sortierwerte des letzten
+    Elements. Folgeseiten filtern per WHERE statt OFFSET, es gibt keine
+    COUNT-Abfrage – jede Seite kostet gleich viel wie Seite 1.
+    Antwort: {"next": <url|null>, "results": [...]}
+    """
+
+    cursor_query_param = "cursor"
+    mode_query_param = "pagination"
+    invalid_cursor_message = "Ungültiger Cursor."
+    # True: Keyset-Modus ohne Opt-in (z.B. Suche)
+    always_cursor = False
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.use_cursor = (
+            self.always_cursor
+            or self.cursor_query_param in request.query_params
+            or request.query_params.get(self.mode_query_param) == "cursor"
+        )
+        if not self.use_cursor:
+            return super().paginate_queryset(queryset, request, view)
+
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        self.request = request
+        self.ordering = self._get_ordering(queryset)
+        queryset = queryset.order_by(*self.ordering)
+
+        token = request.query_params.get(self.cursor_query_param)
+        if token:
+            values = self._decode_cursor(queryset.model, token)
+            queryset = queryset.filter(self._after(values))
+
+        rows = list(queryset[: page_size + 1])
+        self.has_next = len(rows) > page_size
+        self.page = rows[:page_size]
+        return self.page
+
+    def get_paginated_response(self, data):
+        if not getattr(self, "use_cursor", False):
+            return super().get_paginated_response(data)
+        return Response(OrderedDict([
+            ("next", self.get_next_link()),
+            ("results", data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    def get_next_link(self):
+        if not getattr(self, "use_cursor", False):
+            return super().get_next_link()
+        if not self.has_next or not self.page:
+            return None
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, self.mode_query_param)
+        url = remove_query_param(url, self.page_query_param)
+        return replace_query_param(
+            url, self.cursor_query_param, self._encode_cursor(self.page[-1])
+        )
+
+    # --- Keyset-Helfer -------------------------------------------------------
+
+    @staticmethod
+    def _get_ordering(queryset):
+        ordering = [
+            o for o in (queryset.query.order_by or queryset.model._meta.ordering or [])
+            if isinstance(o, str)
+        ]
+        names = {o.lstrip("-") for o in ordering}
+        if "id" not in names and "pk" not in names:
+            last_desc = bool(ordering) and ordering[-1].startswith("-")
+            ordering.append("-id" if last_desc else "id")
+        return ordering
+
+    def _after(self, values):
+        """
+        Baut "Zeile kommt nach dem Cursor" als verschachteltes
+        a < x OR (a = x AND (b < y OR (b = y AND ...))).
+        """
+        condition = None
+        for field, value in reversed(list(zip(self.ordering, values))):
+            name = field.lstrip("-")
+            lookup = "lt" if field.startswith("-") else "gt"
+            step = Q(**{f"{name}__{lookup}": value})
+            if condition is not None:
+                step |= Q(**{name: value}) & condition
+            condition = step
+        return condition
+
+    def _encode_cursor(self, obj):
+        values = []
+        for field in self.ordering:
+            if isinstance(obj, dict):
+                # .values()-Zeile (forum.projections)
+                value = obj[field.lstrip("-")]
+            else:
+                value = obj
+                for part in field.lstrip("-").split("__"):
+                    value = getattr(value, part)
+            if hasattr(value, "isoformat"):
+                value = value.isoformat()
+            values.append(value)
+        raw = json.dumps({"o": self.ordering, "v": values}, separators=(",", ":"))
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+    def _decode_cursor(self, model, token):
+        try:
+            padded = token + "=" * (-len(token) % 4)
+            data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            values = data["v"]
+            if data["o"] != self.ordering or len(values) != len(self.ordering):
+                raise ValueError
+            decoded = []
+            for field, value in zip(self.ordering, values):
+                if value is None:
+                    raise ValueError
+                if isinstance(_resolve_field(model, field.lstrip("-")), models.DateTimeField):
+                    value = parse_datetime(value)
+                    if value is None:
+                        raise ValueError
+                decoded.append(value)
+            return decoded
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+
+
+class SearchPagination(FeedPagination):
+    """Keyset-Paginierung nach (-rank, -id) für /api/search/."""
+    always_cursor = True
+
+
+class MergedFeedPagination(FeedPagination):
+    """
+    Immer Keyset-Modus. Die ids einer Seite liefert
+    view.get_feed_page_ids(ordering, after, limit) (siehe forum.feed),
+    der Queryset der View liefert nur noch Annotationen/Joins für diese ids.
+    """
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.use_cursor = True
+        self.request = request
+        page_size = self.get_page_size(request)
+        self.ordering = self._get_ordering(queryset)
+
+        token = request.query_params.get(self.cursor_query_param)
+        after = self._decode_cursor(queryset.model, token) if token else None
+
+        ids = view.get_feed_page_ids(self.ordering, after, page_size + 1)
+        self.has_next = len(ids) > page_size
+        ids = ids[:page_size]
+
+        by_id = queryset.order_by().in_bulk(ids)
+        self.page = [by_id[i] for i in ids if i in by_id]
+        return self.page
+
+
+def _resolve_field(model, path):
+    field = None
+    for part in path.split("__"):
+        if model is None:
+            return None
+        try:
+            field = model._meta.get_field(part)
+        except FieldDoesNotExist:
+            return None  # Annotation o.ä.
+        model = field.related_model
+    return field
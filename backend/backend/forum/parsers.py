@@ -0,0 +1,31 @@
+import msgpack
+import orjson
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser, JSONParser
+
+
+class ORJSONParser(JSONParser):
+    """JSON-Bodies über orjson; andere Zeichensätze als UTF-8 wie bisher."""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+        if encoding.lower().replace("_", "-") not in ("utf-8", "utf8"):
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f"JSON parse error - {exc}")
+
+
+class MessagePackParser(BaseParser):
+    """Bodies mit Content-Type application/msgpack (Gegenstück zu MessagePackRenderer)."""
+
+    media_type = "application/msgpack"
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(stream.read(), raw=False)
+        except (ValueError, TypeError) as exc:
+            raise ParseError(f"MessagePack parse error - {str(exc) or type(exc).__name__}")
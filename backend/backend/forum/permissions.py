@@ -1,5 +1,6 @@
 from rest_framework.permissions import BasePermission, SAFE_METHODS
-from .models import Membership, Community, Post, Comment
+from .models import Community, Post, Comment
+from .roles import get_role_resolver
 
 
 class IsOwner(BasePermission):
@@ -10,9 +11,7 @@ class IsOwner(BasePermission):
             return True
         if not request.user.is_authenticated:
             return False
-        return Membership.objects.filter(
-            community=obj, user=request.user, role=Membership.Role.OWNER
-        ).exists()
+        return get_role_resolver(request).is_owner(obj.pk)
 
 
 class IsModOrOwnerForCommunity(BasePermission):
@@ -23,11 +22,7 @@ class IsModOrOwnerForCommunity(BasePermission):
             return True
         if not request.user.is_authenticated:
             return False
-        return Membership.objects.filter(
-            community=obj,
-            user=request.user,
-            role__in=[Membership.Role.MODERATOR, Membership.Role.OWNER],
-        ).exists()
+        return get_role_resolver(request).is_mod_or_owner(obj.pk)
 
 class IsAuthorOrModOrOwner(BasePermission):
     """
@@ -42,11 +37,7 @@ class IsAuthorOrModOrOwner(BasePermission):
             return False
         if obj.author_id == request.user.id:
             return True
-        return Membership.objects.filter(
-            community=obj.community,
-            user=request.user,
-            role__in=[Membership.Role.MODERATOR, Membership.Role.OWNER],
-        ).exists()
+        return get_role_resolver(request).is_mod_or_owner(obj.community_id)
 
 class IsCommentAuthorOrModOrOwner(BasePermission):
     """
@@ -61,8 +52,5 @@ class IsCommentAuthorOrModOrOwner(BasePermission):
             return False
         if obj.author_id == request.user.id:
             return True
-        return Membership.objects.filter(
-            community=obj.post.community,
-            user=request.user,
-            role__in=[Membership.Role.MODERATOR, Membership.Role.OWNER],
-        ).exists()
+        # community_id reicht – kein Nachladen von post.community
+        return get_role_resolver(request).is_mod_or_owner(obj.post.community_id)
@@ -0,0 +1,219 @@
+from collections import defaultdict
+from functools import cached_property
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.storage import default_storage
+from rest_framework import serializers
+from rest_framework.response import Response
+
+from .media import image_size_map, load_image_assets, storage_name_from_url
+from .models import PostImage
+from .serializers import CommentSerializer, PostImageSerializer, PostSerializer
+from .viewer import load_viewer_state
+
+# Serializer-Felder, deren to_representation für die Werte aus .values()
+# die Identität ist (int, bool, str) – sie werden ohne Aufruf übernommen
+_IDENTITY_FIELDS = (
+    serializers.IntegerField,
+    serializers.BooleanField,
+    serializers.CharField,
+    serializers.ReadOnlyField,
+    serializers.PrimaryKeyRelatedField,
+)
+
+
+class PageData:
+    """Seitenweise geladene Daten für berechnete Felder (Bilder, Assets, Viewer)."""
+
+    def __init__(self, request, names):
+        self.request = request
+        self.names = names
+        self.absolute = request.build_absolute_uri if request is not None else None
+        self.assets = {}
+        self.images = {}
+        self.viewer = None
+
+    def wants(self, name: str) -> bool:
+        return name in self.names
+
+    def avatar_url(self, row):
+        name = row["author__image"]
+        return default_storage.url(name) if name else None
+
+    def sizes(self, url):
+        if not url:
+            return None
+        return image_size_map(url, self.assets.get(storage_name_from_url(url)), self.absolute)
+
+
+class Projection:
+    """
+    Schneller Listenpfad: baut die Ausgabe eines Serializers aus
+    .values()-Zeilen statt aus Modellinstanzen. Der Feldplan wird einmal aus
+    den Feldern des Serializers übersetzt (gleiche Reihenfolge, gleiche
+    Konvertierung): Modellspalten, ReadOnlyField-Pfade (author.username ->
+    author__username) und Primärschlüssel-Relationen direkt, alle übrigen
+    Felder über computed = {Name: (Spalten, Funktion(row, page))}.
+    Unbekannte Feldtypen ohne Eintrag in computed -> ImproperlyConfigured,
+    damit neue Serializer-Felder nicht still fehlen. Eine Feldauswahl
+    (forum.fieldsets) kürzt Plan und Spalten.
+    """
+
+    def __init__(self, serializer_class, computed, preload=None):
+        self.serializer_class = serializer_class
+        self.computed = computed
+        self.preload = preload
+
+    @cached_property
+    def plan(self):
+        plan = []
+        for field in self.serializer_class()._readable_fields:
+            name = field.field_name
+            if name in self.computed:
+                plan.append((name, None, self.computed[name][1]))
+                continue
+            if isinstance(field, serializers.SerializerMethodField) or isinstance(
+                field, (serializers.BaseSerializer, serializers.ListField)
+            ):
+                raise ImproperlyConfigured(
+                    f"{self.serializer_class.__name__}.{name}: berechnetes Feld ohne Projektion."
+                )
+            column = field.source.replace(".", "__")
+            if isinstance(field, _IDENTITY_FIELDS):
+                plan.append((name, column, None))
+            else:
+                plan.append((name, column, field.to_representation))
+        return plan
+
+    @cached_property
+    def names(self) -> list:
+        return [name for name, _, _ in self.plan]
+
+    def plan_for(self, names=None) -> list:
+        if names is None:
+            return self.plan
+        names = set(names)
+        return [step for step in self.plan if step[0] in names]
+
+    def columns(self, names=None) -> set:
+        columns = {"id"}
+        for name, column, _ in self.plan_for(names):
+            columns.update([column] if column else self.computed[name][0])
+        return columns
+
+    def values(self, queryset, names=None):
+        """
+        Projektion des Querysets; Sortierspalten kommen dazu, damit die
+        Keyset-Paginierung ihren Cursor aus der letzten Zeile bauen kann.
+        """
+        ordering = {o.lstrip("-") for o in queryset.query.order_by if isinstance(o, str)}
+        return (
+            queryset.select_related(None)
+            .prefetch_related(None)
+            .values(*sorted(self.columns(names) | ordering))
+        )
+
+    def render_row(self, row, page, plan=None) -> dict:
+        item = {}
+        for name, column, convert in plan or self.plan:
+            if column is None:
+                item[name] = convert(row, page)
+            else:
+                value = row[column]
+                item[name] = value if convert is None or value is None else convert(value)
+        return item
+
+    def render(self, rows, request, names=None) -> list:
+        rows = list(rows)
+        plan = self.plan_for(names)
+        page = PageData(request, {name for name, _, _ in plan})
+        if self.preload is not None:
+            self.preload(rows, page)
+        render_row = self.render_row
+        return [render_row(row, page, plan) for row in rows]
+
+
+def paginated_projection(view, queryset, projection, fieldset=None):
+    """Wie list(): paginieren (Seiten- oder Keyset-Modus), Seite projiziert ausgeben."""
+    names = fieldset.select(projection.names) if fieldset is not None else None
+    queryset = projection.values(queryset, names)
+    page = view.paginate_queryset(queryset)
+    data = projection.render(page if page is not None else queryset, view.request, names)
+    if page is not None:
+        return view.get_paginated_response(data)
+    return Response(data)
+
+
+# --- Posts -----------------------------------------------------------------------
+
+def _image_asset(row, page):
+    return page.assets.get(storage_name_from_url(row["image_url"]))
+
+
+image_projection = Projection(
+    PostImageSerializer,
+    computed={
+        "width": ([], lambda row, page: getattr(_image_asset(row, page), "width", None)),
+        "height": ([], lambda row, page: getattr(_image_asset(row, page), "height", None)),
+        "sizes": ([], lambda row, page: page.sizes(row["image_url"])),
+    },
+)
+
+
+def _preload_posts(rows, page):
+    ids = [row["id"] for row in rows]
+    images = defaultdict(list)
+    if page.wants("images"):
+        # eine Abfrage für alle Bilder der Seite, Reihenfolge wie PostImage.Meta.ordering
+        for image in (
+            PostImage.objects.filter(post_id__in=ids)
+            .order_by(*PostImage._meta.ordering)
+            .values("post_id", *image_projection.columns())
+        ):
+            images[image["post_id"]].append(image)
+    page.images = images
+    urls = [row["image_url"] for row in rows] if page.wants("image_sizes") else []
+    if page.wants("author_image_sizes"):
+        urls.extend(page.avatar_url(row) for row in rows)
+    urls.extend(image["image_url"] for group in images.values() for image in group)
+    page.assets = load_image_assets(u for u in urls if u)
+    if page.wants("my_vote"):
+        user = page.request.user if page.request is not None else None
+        page.viewer = load_viewer_state(user, post_ids=ids)
+
+
+def _author_image_url(row, page):
+    url = page.avatar_url(row)
+    return page.absolute(url) if url and page.absolute else url
+
+
+post_projection = Projection(
+    PostSerializer,
+    computed={
+        "author_image_url": (["author__image"], _author_image_url),
+        "author_image_sizes": (["author__image"], lambda row, page: page.sizes(page.avatar_url(row))),
+        "image_sizes": (["image_url"], lambda row, page: page.sizes(row["image_url"])),
+        "images": ([], lambda row, page: [
+            image_projection.render_row(image, page) for image in page.images.get(row["id"], ())
+        ]),
+        "my_vote": ([], lambda row, page: page.viewer.vote(row["id"])),
+    },
+    preload=_preload_posts,
+)
+
+
+# --- Kommentare --------------------------------------------------------------------
+
+def _preload_comments(rows, page):
+    if page.wants("author_image_sizes"):
+        page.assets = load_image_assets(u for u in map(page.avatar_url, rows) if u)
+
+
+comment_projection = Projection(
+    CommentSerializer,
+    computed={
+        "author_image_url": (["author__image"], _author_image_url),
+        "author_image_sizes": (["author__image"], lambda row, page: page.sizes(page.avatar_url(row))),
+    },
+    preload=_preload_comments,
+)
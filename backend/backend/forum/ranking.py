@@ -0,0 +1,169 @@
+import math
+import time
+from datetime import timedelta
+
+import numpy as np
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import Post
+
+# Reddit-ähnlich: 10x Score entspricht ~12,5 Stunden Vorsprung
+HOT_TIME_DIVISOR = 45000.0
+# Referenzzeitpunkt, damit hot_rank in handlichen Größenordnungen bleibt
+HOT_EPOCH = 1_700_000_000
+
+RISING_WINDOW = timedelta(hours=24)
+RISING_GRAVITY = 1.5
+
+TOP_WINDOWS = {
+    "day": timedelta(days=1),
+    "week": timedelta(weeks=1),
+    "month": timedelta(days=30),
+    "all": None,
+}
+
+
+def apply_feed_ordering(qs, params):
+    """
+    Sortiert einen Post-Queryset nach ?ordering= (angepinnte Posts zuerst):
+      - created_at / -created_at / score / -score
+      - hot, rising
+      - top (+ ?t=day|week|month|all, Default day)
+    Unbekannte Werte fallen auf -created_at zurück.
+    """
+    ordering = params.get("ordering") or "-created_at"
+    key = ordering.lstrip("-")
+
+    if key in ["created_at", "score"]:
+        return qs.order_by("-is_pinned", ordering)
+    if key == "hot":
+        return qs.order_by("-is_pinned", "-hot_rank")
+    if key == "rising":
+        return qs.filter(
+            created_at__gte=timezone.now() - RISING_WINDOW,
+        ).order_by("-is_pinned", "-rising_rank")
+    if key == "top":
+        window = TOP_WINDOWS.get(params.get("t") or "day", TOP_WINDOWS["day"])
+        if window is not None:
+            qs = qs.filter(created_at__gte=timezone.now() - window)
+        return qs.order_by("-is_pinned", "-score", "-created_at")
+    return qs.order_by("-is_pinned", "-created_at")
+
+
+def hot_rank(score: int, created_at) -> float:
+    """Skalare Variante von hot_ranks() für einzelne (neue) Posts."""
+    order = math.log10(max(abs(score), 1))
+    sign = (score > 0) - (score < 0)
+    return round(sign * order + (created_at.timestamp() - HOT_EPOCH) / HOT_TIME_DIVISOR, 7)
+
+
+def hot_ranks(scores: np.ndarray, created_ts: np.ndarray) -> np.ndarray:
+    order = np.log10(np.maximum(np.abs(scores), 1))
+    return np.round(np.sign(scores) * order + (created_ts - HOT_EPOCH) / HOT_TIME_DIVISOR, 7)
+
+
+def rising_ranks(scores: np.ndarray, created_ts: np.ndarray, now_ts: float) -> np.ndarray:
+    """Score pro Alter (Stunden, gedämpft); außerhalb des Fensters 0."""
+    age_hours = np.maximum(now_ts - created_ts, 0) / 3600.0
+    ranks = scores / np.power(age_hours + 2.0, RISING_GRAVITY)
+    ranks[age_hours > RISING_WINDOW.total_seconds() / 3600.0] = 0.0
+    return np.round(ranks, 7)
+
+
+_UPDATE_SQL = """
+    UPDATE forum_post AS p
+    SET hot_rank = v.hot, rising_rank = v.rising
+    FROM unnest(%s::bigint[], %s::double precision[], %s::double precision[])
+        AS v(id, hot, rising)
+    WHERE p.id = v.id
+      AND (p.hot_rank IS DISTINCT FROM v.hot OR p.rising_rank IS DISTINCT FROM v.rising)
+"""
+
+
+def recompute_ranks(since=None, batch_size: int = 5000, stdout=None) -> int:
+    """
+    Berechnet hot_rank/rising_rank in id-Batches neu: pro Batch ein SELECT
+    (id, score, created_at), die Ränge vektorisiert mit NumPy und ein
+    einziges UPDATE ... FROM unnest(...). since=None heißt alle Posts.
+    Gibt die Anzahl geänderter Zeilen zurück.
+    """
+    now_ts = timezone.now().timestamp()
+    qs = Post.objects.filter(is_deleted=False)
+    if since is not None:
+        qs = qs.filter(created_at__gte=since)
+
+    last_id = 0
+    total = 0
+    while True:
+        rows = list(
+            qs.filter(pk__gt=last_id)
+            .order_by("pk")
+            .values_list("pk", "score", "created_at")[:batch_size]
+        )
+        if not rows:
+            break
+        ids = np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows))
+        scores = np.fromiter((r[1] for r in rows), dtype=np.float64, count=len(rows))
+        created = np.fromiter((r[2].timestamp() for r in rows), dtype=np.float64, count=len(rows))
+
+        hot = hot_ranks(scores, created)
+        rising = rising_ranks(scores, created, now_ts)
+
+        with transaction.atomic(), connection.cursor() as cur:
+            cur.execute(_UPDATE_SQL, [ids.tolist(), hot.tolist(), rising.tolist()])
+            total += cur.rowcount
+
+        last_id = int(ids[-1])
+        if stdout is not None:
+            stdout.write(f"… bis Post {last_id}: {total} aktualisiert")
+    return total
+
+
+def recompute_recent_ranks(stdout=None) -> int:
+    """
+    Regelmäßiger Lauf: alte Posts verlieren rising ohnehin und ändern ihren
+    Score kaum – daher nur das Rising-Fenster plus Puffer neu berechnen.
+    """
+    return recompute_ranks(since=timezone.now() - 3 * RISING_WINDOW, stdout=stdout)
+
+
+def _python_ranks(scores, created_ts, now_ts):
+    """Zeilenweise Referenz für den Benchmark."""
+    window_hours = RISING_WINDOW.total_seconds() / 3600.0
+    out = []
+    for s, c in zip(scores, created_ts):
+        order = math.log10(max(abs(s), 1))
+        sign = (s > 0) - (s < 0)
+        hot = round(sign * order + (c - HOT_EPOCH) / HOT_TIME_DIVISOR, 7)
+        age_hours = max(now_ts - c, 0) / 3600.0
+        rising = 0.0 if age_hours > window_hours else s / (age_hours + 2.0) ** RISING_GRAVITY
+        out.append((hot, round(rising, 7)))
+    return out
+
+
+def benchmark_recompute(sizes, repeat: int = 3):
+    """
+    Misst die reine Rechenzeit für n Posts: NumPy vs. Python-Schleife.
+    Liefert Tupel (n, numpy_sekunden, python_sekunden).
+    """
+    rng = np.random.default_rng(42)
+    now_ts = time.time()
+    results = []
+    for n in sizes:
+        scores = rng.integers(-50, 5000, size=n).astype(np.float64)
+        created = now_ts - rng.uniform(0, 365 * 86400, size=n)
+
+        best_np = float("inf")
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            hot_ranks(scores, created)
+            rising_ranks(scores, created, now_ts)
+            best_np = min(best_np, time.perf_counter() - t0)
+
+        t0 = time.perf_counter()
+        _python_ranks(scores.tolist(), created.tolist(), now_ts)
+        best_py = time.perf_counter() - t0
+
+        results.append((n, best_np, best_py))
+    return results
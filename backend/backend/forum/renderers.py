@@ -0,0 +1,52 @@
+import msgpack
+import orjson
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+# Typen ohne native Darstellung (datetime, Decimal, UUID, lazy Strings, ...)
+# wandelt DRFs Encoder um – gleiche Ausgabe wie beim Standard-Renderer
+_encode_default = JSONEncoder().default
+
+_ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    JSON über orjson, wie DRFs JSONRenderer mit den Standard-Einstellungen
+    (kompakt, UTF-8). Abweichungen nur bei Floats: Exponenten ohne führende
+    Null (1e-5 statt 1e-05) und NaN/Infinity als null statt Fehler – beim
+    Parsen gleichwertig. Eingerückte Ausgabe (Accept "; indent=") und Werte,
+    die orjson ablehnt (Ganzzahlen über 64 Bit, Nicht-String-Schlüssel),
+    übernimmt der Standard-Renderer.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        renderer_context = renderer_context or {}
+        if self.get_indent(accepted_media_type, renderer_context):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=_encode_default, option=_ORJSON_OPTIONS)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # wie DRF: Zeilentrenner U+2028/U+2029 für JavaScript escapen
+        return ret.replace("\u2028".encode(), b"\\u2028").replace("\u2029".encode(), b"\\u2029")
+
+
+class MessagePackRenderer(BaseRenderer):
+    """
+    MessagePack (Accept: application/msgpack) für Service-zu-Service-Aufrufe,
+    z.B. SSR des Frontends über das interne Netz. Gleiche Struktur wie JSON;
+    Datums-/Dezimalwerte als dieselben Strings wie in der JSON-Ausgabe.
+    """
+
+    media_type = "application/msgpack"
+    format = "msgpack"
+    charset = None
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return msgpack.packb(data, default=_encode_default, use_bin_type=True)
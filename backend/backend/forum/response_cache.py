@@ -0,0 +1,151 @@
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+
+from .metrics import cache_stats
+from .models import Community, Post
+
+response_cache_stats = cache_stats("responses")
+
+# Versions-Scopes: Community-Verzeichnis (GET /communities/) und je Community
+# (Detail, Posts, Kommentare ihrer Posts). Schreibzugriffe erhöhen die Version,
+# alte Cache-Einträge werden damit unerreichbar und laufen per TTL aus.
+DIRECTORY_SCOPE = "directory"
+
+
+def community_scope(community_id) -> str:
+    return f"community:{community_id}"
+
+
+def _version_key(scope: str) -> str:
+    return f"forum:ver:{scope}"
+
+
+def get_versions(scopes) -> list:
+    keys = [_version_key(scope) for scope in scopes]
+    found = cache.get_many(keys)
+    versions = []
+    for key in keys:
+        version = found.get(key)
+        if version is None:
+            # zeitbasiert statt 1: nach Verdrängung des Zählers darf keine
+            # alte Version wieder auftauchen
+            cache.add(key, time.time_ns(), None)
+            version = cache.get(key)
+        versions.append(version)
+    return versions
+
+
+def _bump(scopes) -> None:
+    for scope in scopes:
+        key = _version_key(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), None)
+        response_cache_stats.invalidated()
+
+
+def bump_versions(community_ids=(), directory: bool = False) -> None:
+    """
+    Nach dem Commit: sonst könnte ein paralleler Leser den alten Stand unter
+    der neuen Version cachen. Die Zähler liegen im geteilten Cache, sonst ist
+    RESPONSE_CACHE_ENABLED standardmäßig aus (siehe settings).
+    """
+    scopes = [community_scope(cid) for cid in set(community_ids) if cid is not None]
+    if directory:
+        scopes.append(DIRECTORY_SCOPE)
+    if scopes:
+        transaction.on_commit(lambda: _bump(scopes))
+
+
+# --- Scopes der gecachten Endpunkte ------------------------------------------------
+
+def directory_scopes(view, request, *args, **kwargs):
+    return [DIRECTORY_SCOPE]
+
+
+def community_slug_scopes(view, request, *args, **kwargs):
+    community_id = Community.objects.filter(slug=kwargs.get("slug")).values_list("pk", flat=True).first()
+    return None if community_id is None else [community_scope(community_id)]
+
+
+def post_community_scopes(view, request, *args, **kwargs):
+    community_id = Post.objects.filter(pk=kwargs.get("pk")).values_list("community_id", flat=True).first()
+    return None if community_id is None else [community_scope(community_id)]
+
+
+# --- Decorator -----------------------------------------------------------------------
+
+def _response_key(request, versions) -> str:
+    raw = "|".join([
+        request.build_absolute_uri(),
+        request.accepted_media_type or "",
+        ",".join(str(v) for v in versions),
+    ])
+    return "forum:resp:" + hashlib.sha256(raw.encode()).hexdigest()
+
+
+def _etag(content: bytes) -> str:
+    return '"' + hashlib.sha256(content).hexdigest()[:40] + '"'
+
+
+def cache_anonymous_response(scopes):
+    """
+    Für GET-Handler von ViewSets: Antworten an anonyme Clients werden
+    gerendert unter URL + Accept + Versionen der Scopes gecacht und mit
+    starkem ETag (Hash des Inhalts) ausgeliefert; If-None-Match -> 304.
+    scopes(view, request, *args, **kwargs) liefert die Scopes oder None
+    (z.B. unbekannte Community – dann ungecacht, die View antwortet 404).
+    Angemeldete User (my_vote/my_role) laufen immer durch die View.
+    """
+
+    def decorator(method):
+        @wraps(method)
+        def wrapper(view, request, *args, **kwargs):
+            if (
+                not settings.RESPONSE_CACHE_ENABLED
+                or request.method != "GET"
+                or request.user.is_authenticated
+            ):
+                return method(view, request, *args, **kwargs)
+            scope_list = scopes(view, request, *args, **kwargs)
+            if scope_list is None:
+                return method(view, request, *args, **kwargs)
+
+            key = _response_key(request, get_versions(scope_list))
+            entry = cache.get(key)
+            if entry is not None:
+                response_cache_stats.hit()
+                content_type, content, etag = entry
+                response = HttpResponse(content, content_type=content_type)
+            else:
+                response_cache_stats.miss()
+                response = view.finalize_response(
+                    request, method(view, request, *args, **kwargs), *args, **kwargs
+                )
+                response.render()
+                if response.status_code != 200:
+                    return response
+                etag = _etag(response.content)
+                cache.set(
+                    key,
+                    (response["Content-Type"], response.content, etag),
+                    settings.RESPONSE_CACHE_SECONDS,
+                )
+
+            response["ETag"] = etag
+            patch_vary_headers(response, ["Accept", "Authorization"])
+            # Clients/SSR dürfen speichern, müssen aber per ETag revalidieren
+            patch_cache_control(response, public=True, no_cache=True)
+            return get_conditional_response(request, etag=etag, response=response) or response
+
+        return wrapper
+
+    return decorator
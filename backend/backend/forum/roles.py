@@ -0,0 +1,129 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .metrics import cache_stats
+from .models import Membership
+
+MEMBER_ROLES = (
+    Membership.Role.MEMBER,
+    Membership.Role.MODERATOR,
+    Membership.Role.OWNER,
+)
+MOD_ROLES = (
+    Membership.Role.MODERATOR,
+    Membership.Role.OWNER,
+)
+
+_MISSING = object()
+
+# --- Prozessübergreifender Rollen-Cache (Django-Cache-Framework) -------------
+
+role_cache_stats = cache_stats("roles")
+
+# Cache-Werte: Rolle, "" für "kein Mitglied", TOMBSTONE nach Invalidierung
+_NO_ROLE = ""
+_TOMBSTONE = "!"
+# Solange der Tombstone liegt, wird nicht neu befüllt: ein Leser, der den
+# alten Wert noch vor dem Commit aus der DB geholt hat, kann ihn so nicht
+# wieder in den Cache schreiben
+INVALIDATION_GRACE_SECONDS = 5
+
+
+def role_cache_key(user_id, community_id) -> str:
+    return f"forum:role:{user_id}:{community_id}"
+
+
+def _load_role(user_id, community_id):
+    return (
+        Membership.objects.filter(user_id=user_id, community_id=community_id)
+        .values_list("role", flat=True)
+        .first()
+    )
+
+
+def get_cached_role(user_id, community_id):
+    """
+    Mit ROLE_CACHE_ENABLED=0 (Standard bei prozesslokalem Cache) direkt aus
+    der DB; RoleResolver hält das Ergebnis dann nur für den Request.
+    """
+    if not settings.ROLE_CACHE_ENABLED:
+        return _load_role(user_id, community_id)
+
+    key = role_cache_key(user_id, community_id)
+    cached = cache.get(key)
+    if cached is not None and cached != _TOMBSTONE:
+        role_cache_stats.hit()
+        return cached or None
+
+    role_cache_stats.miss()
+    role = _load_role(user_id, community_id)
+    if cached is None:
+        # add statt set: ein zwischenzeitlicher Tombstone gewinnt
+        cache.add(key, role or _NO_ROLE, settings.ROLE_CACHE_SECONDS)
+    return role
+
+
+def invalidate_role(user_id, community_id) -> None:
+    """
+    Sofort und nochmals nach dem Commit: Tombstone statt delete, damit
+    parallele Leser im Fenster bis zum Commit keinen alten Wert cachen.
+    """
+    if not settings.ROLE_CACHE_ENABLED:
+        return
+    key = role_cache_key(user_id, community_id)
+    cache.set(key, _TOMBSTONE, INVALIDATION_GRACE_SECONDS)
+    role_cache_stats.invalidated()
+    transaction.on_commit(lambda: cache.set(key, _TOMBSTONE, INVALIDATION_GRACE_SECONDS))
+
+
+
+class RoleResolver:
+    """
+    Rollen eines Users pro Community, pro Request höchstens ein Cache-/DB-
+    Zugriff je Community (get_cached_role). Permissions und Serializer teilen sich eine Instanz
+    (get_role_resolver), Prüfungen laufen danach aus dem Speicher.
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self._roles = {}
+
+    def role(self, community_id):
+        if not self.user or not self.user.is_authenticated or community_id is None:
+            return None
+        role = self._roles.get(community_id, _MISSING)
+        if role is _MISSING:
+            role = get_cached_role(self.user.pk, community_id)
+            self._roles[community_id] = role
+        return role
+
+    def is_member(self, community_id) -> bool:
+        return self.role(community_id) in MEMBER_ROLES
+
+    def is_mod_or_owner(self, community_id) -> bool:
+        return self.role(community_id) in MOD_ROLES
+
+    def is_owner(self, community_id) -> bool:
+        return self.role(community_id) == Membership.Role.OWNER
+
+    def remember(self, community_id, role) -> None:
+        """Rolle ist bereits bekannt (z.B. gerade angelegte Membership)."""
+        self._roles[community_id] = role
+
+    def forget(self, community_id) -> None:
+        """Nach einer Rollenänderung im selben Request neu laden."""
+        self._roles.pop(community_id, None)
+
+
+def get_role_resolver(request) -> RoleResolver:
+    """
+    Resolver des Requests. Liegt am zugrunde liegenden HttpRequest, damit
+    DRF-Request (Permissions) und Serializer-Context dieselbe Instanz sehen.
+    """
+    http_request = getattr(request, "_request", request)
+    resolver = getattr(http_request, "_role_resolver", None)
+    if resolver is None or resolver.user is not request.user:
+        resolver = RoleResolver(request.user)
+        http_request._role_resolver = resolver
+    return resolver
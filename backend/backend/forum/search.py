@@ -0,0 +1,110 @@
+from django.contrib.postgres.search import (
+    SearchHeadline, SearchQuery, SearchRank, TrigramWordSimilarity,
+)
+from django.db.models import F, FloatField, Q
+from django.db.models.functions import Cast, Greatest, Upper
+
+from .models import SEARCH_CONFIG, Comment, Community, Post
+
+HEADLINE_OPTIONS = {
+    "start_sel": "<mark>",
+    "stop_sel": "</mark>",
+    "max_words": 35,
+    "min_words": 15,
+    "max_fragments": 2,
+}
+
+
+def build_query(text: str) -> SearchQuery:
+    # websearch: "phrase", -ausschließen, OR – ohne Syntaxfehler bei Freitext
+    return SearchQuery(text, search_type="websearch", config=SEARCH_CONFIG)
+
+
+def _rank(query):
+    # ts_rank liefert real; als double casten, damit Cursor-Werte exakt
+    # zurück in die WHERE-Bedingung passen
+    return Cast(SearchRank(F("search_vector"), query), output_field=FloatField())
+
+
+def ranked(qs, query):
+    """Treffer (GIN-Index auf search_vector) nach ts_rank sortiert."""
+    return (
+        qs.filter(search_vector=query)
+        .annotate(rank=_rank(query))
+        .order_by("-rank", "-id")
+    )
+
+
+def post_headlines(ids, query):
+    """ts_headline nur für die Treffer einer Seite (teuer pro Zeile)."""
+    rows = (
+        Post.objects.filter(pk__in=ids)
+        .annotate(
+            title_hl=SearchHeadline("title", query, config=SEARCH_CONFIG, **HEADLINE_OPTIONS),
+            body_hl=SearchHeadline("body", query, config=SEARCH_CONFIG, **HEADLINE_OPTIONS),
+        )
+        .values_list("pk", "title_hl", "body_hl")
+    )
+    return {pk: {"title": title, "body": body} for pk, title, body in rows}
+
+
+def comment_headlines(ids, query):
+    rows = (
+        Comment.objects.filter(pk__in=ids)
+        .annotate(
+            body_hl=SearchHeadline("body", query, config=SEARCH_CONFIG, **HEADLINE_OPTIONS),
+        )
+        .values_list("pk", "body_hl")
+    )
+    return {pk: {"body": body} for pk, body in rows}
+
+
+# --- Typeahead (pg_trgm) ------------------------------------------------------
+
+AUTOCOMPLETE_LIMIT = 8
+AUTOCOMPLETE_MAX_LIMIT = 20
+# Trigramme brauchen 3 Zeichen; kürzere Eingaben nur als Präfix auf den Slug
+TRIGRAM_MIN_LENGTH = 3
+
+
+def normalize_term(text: str) -> str:
+    # Groß-/Kleinschreibung egal: Indizes liegen auf UPPER(...)
+    return " ".join(text.split()).upper()
+
+
+def autocomplete_communities(term: str, limit: int = AUTOCOMPLETE_LIMIT):
+    """
+    Top-N Communities zu einer Eingabe, nach Trigramm-Ähnlichkeit sortiert.
+    Alle Bedingungen laufen über die GIN-Indizes auf UPPER(slug)/UPPER(name):
+    Teilstring (LIKE '%Q%') oder word_similarity (Tippfehler).
+    """
+    term = normalize_term(term)
+    qs = Community.objects.alias(u_slug=Upper("slug"), u_name=Upper("name"))
+    if len(term) < TRIGRAM_MIN_LENGTH:
+        return qs.filter(u_slug__startswith=term).order_by("-members_count", "slug")[:limit]
+
+    return (
+        qs.filter(
+            Q(u_slug__contains=term)
+            | Q(u_name__contains=term)
+            | Q(u_name__trigram_word_similar=term)
+        )
+        .annotate(similarity=Greatest(
+            TrigramWordSimilarity(term, Upper("name")),
+            TrigramWordSimilarity(term, Upper("slug")),
+        ))
+        .order_by("-similarity", "-members_count", "slug")[:limit]
+    )
+
+
+def lookup_members(memberships, term: str):
+    """Filtert Memberships nach Username (Trigramm-Index auf UPPER(username))."""
+    term = normalize_term(term)
+    qs = memberships.alias(u_username=Upper("user__username"))
+    if len(term) < TRIGRAM_MIN_LENGTH:
+        return qs.filter(u_username__startswith=term)
+    return (
+        qs.filter(Q(u_username__contains=term) | Q(u_username__trigram_word_similar=term))
+        .annotate(similarity=TrigramWordSimilarity(term, Upper("user__username")))
+        .order_by("-similarity", "user__username")
+    )
@@ -1,16 +1,28 @@
 from django.contrib.auth import get_user_model
 from django.utils.text import slugify
+from django.db import transaction
+from django.utils import timezone
 from django.db.models import Count, Q
 from rest_framework import serializers
 
 from .models import Community, Membership, Post, PostImage, Comment
+from .counters import (
+    adjust_comment_count, adjust_members_count, adjust_posts_count, apply_reply_created,
+)
+from .ranking import hot_rank
+from .feed import schedule_fanout
+from .fieldsets import SparseFieldsetMixin
+from .fragments import FragmentCacheMixin
+from .media import ImageSizesMixin
+from .roles import get_role_resolver
+from .viewer import PagePreloadListSerializer, ViewerState, ViewerStateMixin
 
 User = get_user_model()
 
-class CommunitySerializer(serializers.ModelSerializer):
-    members_count = serializers.IntegerField(read_only=True)
-    posts_count = serializers.IntegerField(read_only=True)
+class CommunitySerializer(SparseFieldsetMixin, ImageSizesMixin, ViewerStateMixin, serializers.ModelSerializer):
     my_role = serializers.SerializerMethodField(read_only=True)
+    icon_sizes = serializers.SerializerMethodField()
+    banner_sizes = serializers.SerializerMethodField()
     banner_url = serializers.CharField(
         required=False,
         allow_blank=True,
@@ -27,6 +39,8 @@ class CommunitySerializer(serializers.ModelSerializer):
             "visibility",
             "icon_url",
             "banner_url",
+            "icon_sizes",
+            "banner_sizes",
             "created_by",
             "created_at",
             "members_count",
@@ -39,7 +53,20 @@ class CommunitySerializer(serializers.ModelSerializer):
             "members_count",
             "posts_count",
             "my_role",
+            "icon_sizes",
+            "banner_sizes",
         ]
+        list_serializer_class = PagePreloadListSerializer
+
+    fieldset_sources = {
+        "my_role": [],
+        "icon_sizes": ["icon_url"],
+        "banner_sizes": ["banner_url"],
+    }
+    image_size_sources = {
+        "icon_sizes": lambda c: c.icon_url,
+        "banner_sizes": lambda c: c.banner_url,
+    }
 
     def validate_slug(self, value):
         v = slugify(value or "")
@@ -52,26 +79,34 @@ class CommunitySerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         user = self.context["request"].user
         validated_data["created_by"] = user
-        comm = super().create(validated_data)
-        Membership.objects.create(
-            community=comm,
-            user=user,
-            role=Membership.Role.OWNER,
-        )
+        with transaction.atomic():
+            comm = super().create(validated_data)
+            Membership.objects.create(
+                community=comm,
+                user=user,
+                role=Membership.Role.OWNER,
+            )
+            adjust_members_count(comm.pk, 1)
+        comm.refresh_from_db(fields=["members_count"])
+        get_role_resolver(self.context["request"]).remember(comm.pk, Membership.Role.OWNER)
         return comm
 
-    def get_my_role(self, obj):
+    def load_viewer_state(self, objs):
         request = self.context.get("request")
-        if not request or not request.user.is_authenticated:
-            return None
-        m = getattr(obj, "_my_membership", None)
-        if m:
-            return m.role
-        membership = Membership.objects.filter(
-            community=obj,
-            user=request.user,
-        ).only("role").first()
-        return membership.role if membership else None
+        if request is not None and len(objs) == 1 and self.wants("my_role"):
+            # Einzelobjekt (retrieve/create/update): Rolle kennt meist schon
+            # der Resolver aus der Permission-Prüfung
+            return ViewerState(roles={objs[0].pk: get_role_resolver(request).role(objs[0].pk)})
+        return super().load_viewer_state(objs)
+
+    def get_my_role(self, obj):
+        return self.get_viewer_state(obj).role(obj.pk)
+
+    def get_icon_sizes(self, obj):
+        return self.image_sizes(obj, obj.icon_url)
+
+    def get_banner_sizes(self, obj):
+        return self.image_sizes(obj, obj.banner_url)
 
 class MembershipSerializer(serializers.ModelSerializer):
     username = serializers.ReadOnlyField(source="user.username")
@@ -95,19 +130,41 @@ class MembershipSerializer(serializers.ModelSerializer):
             "posts_count",
         ]
 
-class PostImageSerializer(serializers.ModelSerializer):
+class PostImageSerializer(ImageSizesMixin, serializers.ModelSerializer):
+    width = serializers.SerializerMethodField()
+    height = serializers.SerializerMethodField()
+    sizes = serializers.SerializerMethodField()
+
     class Meta:
         model = PostImage
-        fields = ["id", "image_url", "position"]
+        fields = ["id", "image_url", "position", "width", "height", "sizes"]
+
+    image_size_sources = {"sizes": lambda image: image.image_url}
 
-class PostSerializer(serializers.ModelSerializer):
+    def get_width(self, obj):
+        return self.image_dimensions(obj, obj.image_url)[0]
+
+    def get_height(self, obj):
+        return self.image_dimensions(obj, obj.image_url)[1]
+
+    def get_sizes(self, obj):
+        return self.image_sizes(obj, obj.image_url)
+
+
+def _avatar_url(user):
+    img = getattr(user, "image", None)
+    return img.url if img else None
+
+
+class PostSerializer(FragmentCacheMixin, SparseFieldsetMixin, ImageSizesMixin, ViewerStateMixin,
+                     serializers.ModelSerializer):
     community_slug   = serializers.ReadOnlyField(source="community.slug")
     author_email     = serializers.ReadOnlyField(source="author.email")
     author_username  = serializers.ReadOnlyField(source="author.username")
     author_image_url = serializers.SerializerMethodField()
-    score            = serializers.IntegerField(read_only=True)
-    my_vote          = serializers.IntegerField(read_only=True)
-    comment_count    = serializers.IntegerField(read_only=True)
+    author_image_sizes = serializers.SerializerMethodField()
+    image_sizes      = serializers.SerializerMethodField()
+    my_vote          = serializers.SerializerMethodField()
 
     is_pinned = serializers.BooleanField(required=False)
     is_locked = serializers.BooleanField(required=False)
@@ -129,14 +186,19 @@ class PostSerializer(serializers.ModelSerializer):
             "author_email",
             "author_username",
             "author_image_url", 
+            "author_image_sizes",
             "title",
             "body",
+            "body_preview",
             "image_url",
+            "image_sizes",
             "images",
             "image_urls",
             "is_pinned",
             "is_locked",
             "score",
+            "upvotes",
+            "downvotes",
             "my_vote",
             "created_at",
             "updated_at",
@@ -147,34 +209,48 @@ class PostSerializer(serializers.ModelSerializer):
             "author_email",
             "author_username",
             "author_image_url", 
+            "author_image_sizes",
             "community_slug",
+            "body_preview",
+            "image_sizes",
             "images",
             "score",
+            "upvotes",
+            "downvotes",
             "my_vote",
             "created_at",
             "updated_at",
             "comment_count",
         ]
+        list_serializer_class = PagePreloadListSerializer
+
+    # Zähler ändern sich per .update() ohne updated_at, my_vote je Betrachter
+    fragment_volatile_fields = ("score", "upvotes", "downvotes", "comment_count", "my_vote")
+    fragment_schema = 2
+
+    fieldset_sources = {
+        "author_image_url": ["author__image"],
+        "author_image_sizes": ["author__image"],
+        "image_sizes": ["image_url"],
+        "my_vote": [],
+    }
+    image_size_sources = {
+        "image_sizes": lambda p: p.image_url,
+        "author_image_sizes": lambda p: _avatar_url(p.author),
+        "images": lambda p: [image.image_url for image in p.images.all()],
+    }
 
     def validate(self, attrs):
         request = self.context["request"]
-        user = request.user
         community = (
             attrs.get("community")
             or getattr(self.instance, "community", None)
         )
 
+        roles = get_role_resolver(request)
+
         if request.method == "POST" and community:
-            is_member = Membership.objects.filter(
-                community=community,
-                user=user,
-                role__in=[
-                    Membership.Role.MEMBER,
-                    Membership.Role.MODERATOR,
-                    Membership.Role.OWNER,
-                ],
-            ).exists()
-            if not is_member:
+            if not roles.is_member(community.pk):
                 raise serializers.ValidationError(
                     {"community": "Du musst Mitglied der Community sein, um zu posten."}
                 )
@@ -182,12 +258,7 @@ class PostSerializer(serializers.ModelSerializer):
         wants_pin = "is_pinned" in attrs
         wants_lock = "is_locked" in attrs
         if (wants_pin or wants_lock) and community:
-            is_mod_or_owner = Membership.objects.filter(
-                community=community,
-                user=user,
-                role__in=[Membership.Role.MODERATOR, Membership.Role.OWNER],
-            ).exists()
-            if not is_mod_or_owner:
+            if not roles.is_mod_or_owner(community.pk):
                 raise serializers.ValidationError(
                     {"detail": "Nur Moderatoren oder Owner dürfen Beiträge anpinnen oder sperren."}
                 )
@@ -199,16 +270,23 @@ class PostSerializer(serializers.ModelSerializer):
         first_image = image_urls[0] if image_urls else None
         if first_image and "image_url" not in validated_data:
             validated_data["image_url"] = first_image
+        validated_data["hot_rank"] = hot_rank(0, timezone.now())
 
-        post = super().create(validated_data)
+        with transaction.atomic():
+            post = super().create(validated_data)
 
-        for idx, url in enumerate(image_urls, start=1):
-            PostImage.objects.create(
-                post=post,
-                image_url=url,
-                position=idx,
-            )
+            for idx, url in enumerate(image_urls, start=1):
+                PostImage.objects.create(
+                    post=post,
+                    image_url=url,
+                    position=idx,
+                )
+            adjust_posts_count(post.community_id, 1)
+            schedule_fanout(post)
         return post
+
+    def get_my_vote(self, obj):
+        return self.get_viewer_state(obj).vote(obj.pk)
     
     def get_author_image_url(self, obj):
         img = getattr(obj.author, "image", None)
@@ -218,11 +296,28 @@ class PostSerializer(serializers.ModelSerializer):
         url = img.url
         return request.build_absolute_uri(url) if request else url
 
+    def get_image_sizes(self, obj):
+        return self.image_sizes(obj, obj.image_url)
+
+    def fragment_dependencies(self, obj):
+        author = obj.author
+        return (
+            obj.community.slug, author.username, author.email, _avatar_url(author),
+            tuple((i.pk, i.image_url, i.position) for i in obj.images.all()),
+        )
+
+    def fragment_cacheable(self, obj):
+        return self.image_assets_ready(obj)
+
+    def get_author_image_sizes(self, obj):
+        return self.image_sizes(obj, _avatar_url(obj.author))
 
-class CommentSerializer(serializers.ModelSerializer):
+
+class CommentSerializer(FragmentCacheMixin, SparseFieldsetMixin, ImageSizesMixin, serializers.ModelSerializer):
     author_email = serializers.ReadOnlyField(source="author.email")
     author_username = serializers.ReadOnlyField(source="author.username")
     author_image_url  = serializers.SerializerMethodField()
+    author_image_sizes = serializers.SerializerMethodField()
 
     class Meta:
         model = Comment
@@ -234,8 +329,12 @@ class CommentSerializer(serializers.ModelSerializer):
             "author_email",
             "author_username",
             "author_image_url", 
+            "author_image_sizes",
             "body",
             "is_deleted",
+            "reply_count",
+            "descendant_count",
+            "last_reply_at",
             "created_at",
             "updated_at",
         ]
@@ -244,10 +343,24 @@ class CommentSerializer(serializers.ModelSerializer):
             "author_email",
             "author_username",
             "author_image_url", 
+            "author_image_sizes",
             "is_deleted",
+            "reply_count",
+            "descendant_count",
+            "last_reply_at",
             "created_at",
             "updated_at",
         ]
+        list_serializer_class = PagePreloadListSerializer
+
+    # Soft-Delete und Antwort-Zähler laufen per .update() ohne updated_at
+    fragment_volatile_fields = ("is_deleted", "reply_count", "descendant_count", "last_reply_at")
+
+    fieldset_sources = {
+        "author_image_url": ["author__image"],
+        "author_image_sizes": ["author__image"],
+    }
+    image_size_sources = {"author_image_sizes": lambda c: _avatar_url(c.author)}
 
     def validate(self, attrs):
         request = self.context["request"]
@@ -256,16 +369,7 @@ class CommentSerializer(serializers.ModelSerializer):
         if not post:
             return attrs
 
-        is_member = Membership.objects.filter(
-            community=post.community,
-            user=request.user,
-            role__in=[
-                Membership.Role.MEMBER,
-                Membership.Role.MODERATOR,
-                Membership.Role.OWNER,
-            ],
-        ).exists()
-        if not is_member:
+        if not get_role_resolver(request).is_member(post.community_id):
             raise serializers.ValidationError(
                 {"post": "Du musst Mitglied der Community sein, um zu kommentieren."}
             )
@@ -281,7 +385,12 @@ class CommentSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         request = self.context["request"]
         validated_data["author"] = request.user
-        return super().create(validated_data)
+        with transaction.atomic():
+            # Comment.path setzt forum.signals.set_comment_path
+            comment = super().create(validated_data)
+            adjust_comment_count(comment.post_id, 1)
+            apply_reply_created(comment)
+        return comment
     
     def get_author_image_url(self, obj):
         img = getattr(obj.author, "image", None)
@@ -290,3 +399,47 @@ class CommentSerializer(serializers.ModelSerializer):
         request = self.context.get("request")
         url = img.url
         return request.build_absolute_uri(url) if request else url
+
+    def get_author_image_sizes(self, obj):
+        return self.image_sizes(obj, _avatar_url(obj.author))
+
+    def fragment_dependencies(self, obj):
+        author = obj.author
+        return (author.username, author.email, _avatar_url(author))
+
+    def fragment_cacheable(self, obj):
+        return self.image_assets_ready(obj)
+
+
+class PostSearchResultSerializer(PostSerializer):
+    rank = serializers.FloatField(read_only=True)
+    highlight = serializers.SerializerMethodField()
+
+    class Meta(PostSerializer.Meta):
+        fields = PostSerializer.Meta.fields + ["rank", "highlight"]
+
+    fragment_volatile_fields = PostSerializer.fragment_volatile_fields + ("rank", "highlight")
+    fieldset_sources = {**PostSerializer.fieldset_sources, "highlight": []}
+
+    def get_highlight(self, obj):
+        return self.context.get("headlines", {}).get(obj.pk)
+
+
+class CommentSearchResultSerializer(CommentSerializer):
+    post_title = serializers.ReadOnlyField(source="post.title")
+    community_slug = serializers.ReadOnlyField(source="post.community.slug")
+    rank = serializers.FloatField(read_only=True)
+    highlight = serializers.SerializerMethodField()
+
+    class Meta(CommentSerializer.Meta):
+        fields = CommentSerializer.Meta.fields + ["post_title", "community_slug", "rank", "highlight"]
+
+    fragment_volatile_fields = CommentSerializer.fragment_volatile_fields + ("rank", "highlight")
+    fieldset_sources = {**CommentSerializer.fieldset_sources, "highlight": []}
+
+    def fragment_dependencies(self, obj):
+        return super().fragment_dependencies(obj) + (obj.post.title, obj.post.community.slug)
+
+    def get_highlight(self, obj):
+        return self.context.get("headlines", {}).get(obj.pk)
+
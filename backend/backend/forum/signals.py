@@ -0,0 +1,113 @@
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .blobs import drop_references, sync_references
+from .media import storage_name_from_url
+from .models import Comment, Community, Membership, Post, PostImage
+from .response_cache import bump_versions
+from .roles import invalidate_role
+from .threads import comment_path
+
+
+@receiver(post_save, sender=Membership)
+@receiver(post_delete, sender=Membership)
+def invalidate_membership_role(sender, instance, **kwargs):
+    # deckt join/leave, members_promote/demote/remove/approve/decline,
+    # Community-Anlage und Kaskaden-Löschungen ab
+    invalidate_role(instance.user_id, instance.community_id)
+
+
+# --- Materialisierter Pfad (Comment.path) -------------------------------------------
+
+@receiver(post_save, sender=Comment)
+def set_comment_path(sender, instance, raw=False, **kwargs):
+    # jeder Insert-Pfad (API, Admin, Shell); der Pfad enthält die eigene id
+    if instance.path or raw:
+        return
+    parent_path = ""
+    if instance.parent_id is not None:
+        if Comment.parent.is_cached(instance) and instance.parent.path:
+            parent_path = instance.parent.path
+        else:
+            parent_path = (
+                Comment.objects.filter(pk=instance.parent_id).values_list("path", flat=True).first()
+            )
+        if not parent_path:
+            raise ValueError("Comment.path des Parents fehlt – backfill_comment_paths ausführen.")
+    instance.path = comment_path(parent_path, instance.pk)
+    Comment.objects.filter(pk=instance.pk).update(path=instance.path)
+
+
+# --- Versionen des Antwort-Caches (forum.response_cache) ---------------------------
+# .update()-Pfade ohne Signal (Soft-Delete, Restore, Votes) erhöhen die
+# Versionen direkt in den Views bzw. in cast_votes.
+
+@receiver(post_save, sender=Community)
+@receiver(post_delete, sender=Community)
+@receiver(post_save, sender=Membership)
+@receiver(post_delete, sender=Membership)
+def bump_community_version(sender, instance, **kwargs):
+    # Mitgliederzahl, Name, Bilder: Detail und Verzeichnis
+    community_id = instance.pk if sender is Community else instance.community_id
+    bump_versions([community_id], directory=True)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def bump_post_version(sender, instance, created=False, **kwargs):
+    # neue/gelöschte Posts ändern posts_count im Verzeichnis
+    bump_versions([instance.community_id], directory=created or kwargs["signal"] is post_delete)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def bump_comment_version(sender, instance, **kwargs):
+    # Community aus dem schon geladenen Post, sonst nur die eine Spalte
+    if Comment.post.is_cached(instance):
+        community_id = instance.post.community_id
+    else:
+        community_id = (
+            Post.objects.filter(pk=instance.post_id).values_list("community_id", flat=True).first()
+        )
+    if community_id is not None:
+        bump_versions([community_id])
+
+
+# --- Blob-Referenzen (forum.blobs) -------------------------------------------------
+
+# Modell -> (Referenz-Owner, Felder mit Media-URLs bzw. Storage-Namen)
+_MEDIA_FIELDS = {
+    Post._meta.label: ("post", ["image_url"]),
+    PostImage._meta.label: ("postimage", ["image_url"]),
+    Community._meta.label: ("community", ["icon_url", "banner_url"]),
+    settings.AUTH_USER_MODEL: ("user", ["image"]),
+}
+
+
+def _media_names(instance, fields):
+    for field in fields:
+        value = getattr(instance, field)
+        if hasattr(value, "name"):
+            # FileField (Avatar): Storage-Name direkt
+            yield value.name
+        else:
+            yield storage_name_from_url(value)
+
+
+def sync_media_references(sender, instance, update_fields=None, **kwargs):
+    owner, fields = _MEDIA_FIELDS[sender._meta.label]
+    if update_fields is not None and not set(fields) & set(update_fields):
+        # z.B. last_login, Zähler-Updates
+        return
+    sync_references(owner, instance.pk, _media_names(instance, fields))
+
+
+def drop_media_references(sender, instance, **kwargs):
+    owner, _ = _MEDIA_FIELDS[sender._meta.label]
+    drop_references(owner, instance.pk)
+
+
+for _label in _MEDIA_FIELDS:
+    post_save.connect(sync_media_references, sender=_label, dispatch_uid=f"media-refs-save:{_label}")
+    post_delete.connect(drop_media_references, sender=_label, dispatch_uid=f"media-refs-delete:{_label}")
@@ -0,0 +1,47 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.BACKGROUND_WORKERS,
+                thread_name_prefix="forum-bg",
+            )
+        return _executor
+
+
+def _run(fn, args, kwargs):
+    close_old_connections()
+    try:
+        fn(*args, **kwargs)
+    except Exception:
+        logger.exception("Hintergrund-Task %s fehlgeschlagen", getattr(fn, "__name__", fn))
+    finally:
+        # Threads des Pools halten sonst dauerhaft eine DB-Verbindung offen
+        connection.close()
+
+
+def run_in_background(fn, *args, **kwargs) -> None:
+    """
+    Führt fn(*args, **kwargs) nach dem Commit der aktuellen Transaktion in
+    einem begrenzten Thread-Pool aus, also außerhalb des Request-Threads.
+    Mit BACKGROUND_TASKS_EAGER=1 (Tests/Debugging) synchron nach dem Commit.
+    Fehler werden geloggt, nicht weitergereicht – Reparatur erfolgt über
+    die jeweiligen Backfill-/Reconcile-Commands.
+    """
+    if settings.BACKGROUND_TASKS_EAGER:
+        transaction.on_commit(lambda: fn(*args, **kwargs))
+        return
+    transaction.on_commit(lambda: _get_executor().submit(_run, fn, args, kwargs))
@@ -0,0 +1,263 @@
+import base64
+import json
+
+from django.db import connection, transaction
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+
+from .models import Comment
+
+THREAD_DEFAULT_DEPTH = 6
+THREAD_MAX_DEPTH = 20
+# Antworten pro Knoten (Breite)
+THREAD_DEFAULT_LIMIT = 20
+THREAD_MAX_LIMIT = 100
+# Obergrenze Knoten pro Antwort, unabhängig von Tiefe/Breite
+THREAD_MAX_NODES = 500
+
+INVALID_CURSOR_MESSAGE = "Ungültiger Cursor."
+
+# ?ordering= für Kommentarlisten, z.B. -descendant_count ("meistdiskutiert")
+COMMENT_ORDERING_FIELDS = ["created_at", "reply_count", "descendant_count"]
+
+_TABLE = Comment._meta.db_table
+
+# Rekursiver CTE, breitenweise: pro Knoten per LATERAL höchstens limit + 1
+# Kinder in Anzeige-Reihenfolge (Index post, parent, created_at). Die
+# (limit + 1)-te Zeile (rn > limit) ist nur Marker für "weitere Antworten"
+# und wird nicht weiter expandiert. Gelöschte Kommentare erscheinen nur,
+# wenn sie Antworten haben (als Platzhalter). Postgres wertet den CTE
+# bedarfsgesteuert aus – das äußere LIMIT bricht die Rekursion also ab.
+# has_replies: sichtbare Kinder nach denselben Regeln – reply_count zählt
+# nur nicht gelöschte und übersähe Antworten unter Platzhaltern.
+_THREAD_SQL = """
+    WITH RECURSIVE tree AS (
+        (SELECT c.id, c.parent_id, c.created_at, 1 AS depth,
+                row_number() OVER (ORDER BY c.created_at, c.id) AS rn
+         FROM {table} c
+         WHERE c.post_id = %(post_id)s
+           AND {parent_sql}
+           {after_sql}
+           AND {visible_sql}
+         ORDER BY c.created_at, c.id
+         LIMIT %(limit)s + 1)
+        UNION ALL
+        SELECT k.id, k.parent_id, k.created_at, t.depth + 1, k.rn
+        FROM tree t
+        CROSS JOIN LATERAL (
+            SELECT c.id, c.parent_id, c.created_at,
+                   row_number() OVER (ORDER BY c.created_at, c.id) AS rn
+            FROM {table} c
+            WHERE c.post_id = %(post_id)s
+              AND c.parent_id = t.id
+              AND {visible_sql}
+            ORDER BY c.created_at, c.id
+            LIMIT %(limit)s + 1
+        ) k
+        WHERE t.rn <= %(limit)s AND t.depth < %(depth)s
+    )
+    SELECT t.id, t.parent_id, t.created_at, t.depth, t.rn,
+           EXISTS (
+               SELECT 1 FROM {table} c
+               WHERE c.post_id = %(post_id)s AND c.parent_id = t.id AND {visible_sql}
+           ) AS has_replies
+    FROM tree t
+    LIMIT %(max_nodes)s + 1
+"""
+
+_VISIBLE_SQL = (
+    f"(NOT c.is_deleted OR EXISTS (SELECT 1 FROM {_TABLE} x WHERE x.parent_id = c.id))"
+)
+
+
+def encode_thread_cursor(parent_id, after=None) -> str:
+    """Fortsetzung: Antworten auf parent_id (None = Top-Level) nach `after`."""
+    values = None
+    if after is not None:
+        created_at, pk = after
+        values = [created_at.isoformat(), pk]
+    raw = json.dumps({"p": parent_id, "v": values}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_thread_cursor(token: str):
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        parent_id = data["p"]
+        if parent_id is not None:
+            parent_id = int(parent_id)
+        after = None
+        if data["v"] is not None:
+            created_at, pk = data["v"]
+            created_at = parse_datetime(created_at)
+            if created_at is None:
+                raise ValueError
+            after = (created_at, int(pk))
+        return parent_id, after
+    except (TypeError, ValueError, KeyError):
+        raise NotFound(INVALID_CURSOR_MESSAGE)
+
+
+def thread_rows(post_id, parent_id=None, after=None, depth=THREAD_DEFAULT_DEPTH,
+                limit=THREAD_DEFAULT_LIMIT, max_nodes=THREAD_MAX_NODES):
+    """
+    Ein Statement für einen Ausschnitt des Kommentarbaums ab parent_id.
+    Liefert (rows, depth): rows als Dicts in Breitenreihenfolge, depth die
+    tatsächlich vollständig geladene Tiefe (kleiner als angefragt, wenn
+    max_nodes gegriffen hat).
+    """
+    params = {
+        "post_id": post_id,
+        "limit": limit,
+        "depth": depth,
+        "max_nodes": max_nodes,
+    }
+    if parent_id is None:
+        parent_sql = "c.parent_id IS NULL"
+    else:
+        parent_sql = "c.parent_id = %(parent_id)s"
+        params["parent_id"] = parent_id
+    after_sql = ""
+    if after is not None:
+        after_sql = "AND (c.created_at, c.id) > (%(after_ts)s, %(after_id)s)"
+        params["after_ts"], params["after_id"] = after
+
+    sql = _THREAD_SQL.format(
+        table=_TABLE,
+        parent_sql=parent_sql,
+        after_sql=after_sql,
+        visible_sql=_VISIBLE_SQL,
+    )
+    with connection.cursor() as cur:
+        cur.execute(sql, params)
+        columns = [col[0] for col in cur.description]
+        rows = [dict(zip(columns, row)) for row in cur.fetchall()]
+
+    if len(rows) > max_nodes:
+        # Breitensuche: nur die letzte Ebene ist unvollständig – verwerfen
+        cut = rows[-1]["depth"]
+        rows = [r for r in rows if r["depth"] < cut]
+        depth = cut - 1
+    return rows, depth
+
+
+def build_thread(rows, serialized, parent_id, depth, limit):
+    """
+    Baut aus den flachen Zeilen und den (in einem Durchlauf) serialisierten
+    Kommentaren den verschachtelten Baum – linear in der Anzahl Knoten.
+    Knoten mit weiteren, nicht geladenen Antworten bekommen in "more" einen
+    Cursor für GET /posts/<id>/thread/?cursor=...
+    Gibt (top_level_nodes, top_level_more) zurück.
+    """
+    data_by_id = {item["id"]: item for item in serialized}
+    nodes = {}
+    children = {parent_id: []}
+    truncated = set()
+
+    for row in sorted(rows, key=lambda r: (r["created_at"], r["id"])):
+        if row["rn"] > limit:
+            truncated.add(row["parent_id"])
+            continue
+        node = data_by_id.get(row["id"])
+        if node is None:
+            continue
+        if node["is_deleted"]:
+            node.update(body="", author=None, author_email=None,
+                        author_username=None, author_image_url=None,
+                        author_image_sizes=None)
+        node["depth"] = row["depth"]
+        node["replies"] = []
+        node["more"] = None
+        nodes[row["id"]] = (node, row)
+        children[row["id"]] = node["replies"]
+        children.setdefault(row["parent_id"], []).append(node)
+
+    for node_id, (node, row) in nodes.items():
+        if node_id in truncated:
+            last = nodes[node["replies"][-1]["id"]][1] if node["replies"] else None
+            after = (last["created_at"], last["id"]) if last else None
+            node["more"] = encode_thread_cursor(node_id, after)
+        elif row["depth"] >= depth and row["has_replies"]:
+            node["more"] = encode_thread_cursor(node_id)
+
+    top = children[parent_id]
+    more = None
+    if parent_id in truncated:
+        last = nodes[top[-1]["id"]][1] if top else None
+        more = encode_thread_cursor(parent_id, (last["created_at"], last["id"]) if last else None)
+    return top, more
+
+
+# --- Materialisierter Pfad (Comment.path) -------------------------------------
+
+PATH_SEGMENT_WIDTH = 10
+
+
+def comment_path(parent_path: str, pk: int) -> str:
+    """Pfad eines Kommentars: Pfad des Parents plus eigene id (10-stellig + "/")."""
+    return f"{parent_path or ''}{pk:0{PATH_SEGMENT_WIDTH}d}/"
+
+
+def path_depth(path: str) -> int:
+    return len(path) // (PATH_SEGMENT_WIDTH + 1)
+
+
+def path_ancestor_ids(path: str) -> list:
+    """ids aller Vorfahren (Wurzel zuerst), ohne den Kommentar selbst."""
+    return [int(segment) for segment in path.split("/")[:-2]]
+
+
+def subtree(comment, include_self=False):
+    """
+    Alle Nachfahren eines Kommentars in Anzeige-Reihenfolge (Tiefensuche)
+    als ein Range-Scan über den Index (post, path).
+    """
+    if not comment.path:
+        raise ValueError("Comment.path fehlt – backfill_comment_paths ausführen.")
+    qs = Comment.objects.filter(post_id=comment.post_id, path__startswith=comment.path)
+    if not include_self:
+        qs = qs.exclude(pk=comment.pk)
+    return qs.order_by("path")
+
+
+_BACKFILL_PATHS_SQL = f"""
+    WITH RECURSIVE tree AS (
+        SELECT id, lpad(id::text, {PATH_SEGMENT_WIDTH}, '0') || '/' AS path
+        FROM {_TABLE}
+        WHERE parent_id IS NULL AND id = ANY(%s)
+        UNION ALL
+        SELECT c.id, tree.path || lpad(c.id::text, {PATH_SEGMENT_WIDTH}, '0') || '/'
+        FROM {_TABLE} c
+        JOIN tree ON c.parent_id = tree.id
+    )
+    UPDATE {_TABLE} c
+    SET path = tree.path
+    FROM tree
+    WHERE c.id = tree.id AND c.path IS DISTINCT FROM tree.path
+"""
+
+
+def backfill_comment_paths(batch_size: int = 500, stdout=None) -> int:
+    """
+    Setzt Comment.path für alle Threads neu, in Batches von Top-Level-
+    Kommentaren (jeweils inkl. aller Antworten). Gibt die Anzahl
+    geänderter Zeilen zurück.
+    """
+    last_id = 0
+    total = 0
+    while True:
+        root_ids = list(
+            Comment.objects.filter(parent__isnull=True, pk__gt=last_id)
+            .order_by("pk")
+            .values_list("pk", flat=True)[:batch_size]
+        )
+        if not root_ids:
+            break
+        with transaction.atomic(), connection.cursor() as cur:
+            cur.execute(_BACKFILL_PATHS_SQL, [root_ids])
+            total += cur.rowcount
+        last_id = root_ids[-1]
+        if stdout is not None:
+            stdout.write(f"… bis Kommentar {last_id}: {total} aktualisiert")
+    return total
@@ -0,0 +1,283 @@
+import hashlib
+import os
+import shutil
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+from rest_framework.exceptions import APIException, ValidationError
+
+from .blobs import claim_blob, hash_upload, store_upload, write_blob_file
+from .media import strip_image_metadata, validate_image
+from .models import UploadChunk, UploadSession
+
+# Lese-/Kopierblöcke: Speicherbedarf pro Request unabhängig von der Chunk-Größe
+_BLOCK_SIZE = 64 * 1024
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+class UploadSessionExpired(APIException):
+    status_code = 410
+    default_detail = "Upload-Session abgelaufen."
+    default_code = "upload_session_expired"
+
+
+# --- Mehrere Dateien in einem Request -------------------------------------------------
+
+def _get_pool() -> ThreadPoolExecutor:
+    # eigener Pool: der Request wartet auf die Ergebnisse, darf also nicht
+    # hinter Hintergrund-Tasks (forum.tasks) anstehen
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(
+                max_workers=settings.UPLOAD_WORKERS,
+                thread_name_prefix="forum-upload",
+            )
+        return _pool
+
+
+def _prepare_file(index, file, timings):
+    with timings.measure(f"file{index}-decode", file.name):
+        ext = validate_image(file)
+        file = strip_image_metadata(file)
+    with timings.measure(f"file{index}-hash"):
+        digest, size = hash_upload(file)
+    return file, ext, digest, size
+
+
+def _write_file(index, blob, file, timings):
+    with timings.measure(f"file{index}-write"):
+        return write_blob_file(blob, file)
+
+
+def store_uploads(files, timings) -> list:
+    """
+    Speichert mehrere Bilddateien alles-oder-nichts: erst werden alle
+    parallel vollständig dekodiert, von Metadaten befreit (forum.media) und
+    gehasht (ein ungültiges Bild -> ValidationError mit Index, nichts
+    geschrieben), dann die Blob-Zeilen in einer Transaktion angelegt und
+    die Dateien parallel geschrieben. Schlägt
+    ein Schreiben fehl, werden die in diesem Aufruf geschriebenen Dateien
+    gelöscht und danach die Zeilen zurückgerollt. Dauer pro Datei und Phase landet
+    in timings (Server-Timing). Gibt die Blobs in Reihenfolge von files zurück.
+    """
+    pool = _get_pool()
+    with timings.measure("upload-validate"):
+        futures = [pool.submit(_prepare_file, i, f, timings) for i, f in enumerate(files)]
+        prepared, errors = [], {}
+        for index, future in enumerate(futures):
+            try:
+                prepared.append(future.result())
+            except ValidationError as exc:
+                errors[str(index)] = exc.detail
+    if errors:
+        raise ValidationError({"detail": "Nur Bilddateien sind erlaubt.", "files": errors})
+
+    written = []
+    with transaction.atomic():
+        blobs = [claim_blob(digest, size, ext) for _, ext, digest, size in prepared]
+        # gleicher Inhalt mehrfach im Request -> nur einmal schreiben
+        unique = {}
+        for index, (blob, (file, *_)) in enumerate(zip(blobs, prepared)):
+            unique.setdefault(blob.pk, (index, blob, file))
+        try:
+            with timings.measure("upload-write"):
+                futures = {
+                    pool.submit(_write_file, index, blob, file, timings): blob
+                    for index, blob, file in unique.values()
+                }
+                failure = None
+                for future, blob in futures.items():
+                    try:
+                        if future.result():
+                            written.append(blob.name)
+                    except Exception as exc:
+                        failure = failure or exc
+                if failure is not None:
+                    raise failure
+        except Exception:
+            # vor dem Rollback: solange die Blob-Zeilen gesperrt sind, wartet
+            # ein paralleler Upload gleichen Inhalts und findet die Datei
+            # danach nicht mehr vor, schreibt sie also selbst
+            for name in written:
+                default_storage.delete(name)
+            raise
+    return blobs
+
+
+# --- Resumable Uploads (Sessions) ------------------------------------------------------
+
+def chunk_dir(session) -> Path:
+    return Path(settings.UPLOAD_CHUNK_DIR) / str(session.pk)
+
+
+def create_session(user, filename: str, size: int, content_type: str) -> UploadSession:
+    """
+    Legt eine Session an, sofern Dateigröße und Kontingent des Users
+    (Summe der offenen Sessions, UPLOAD_USER_QUOTA_BYTES) es erlauben.
+    """
+    if not content_type.startswith("image/"):
+        raise ValidationError({"content_type": "Nur Bilddateien sind erlaubt."})
+    if size <= 0 or size > settings.UPLOAD_MAX_BYTES:
+        raise ValidationError({"size": f"Dateigröße muss zwischen 1 und {settings.UPLOAD_MAX_BYTES} Bytes liegen."})
+
+    now = timezone.now()
+    with transaction.atomic():
+        # serialisiert parallele Session-Anlagen desselben Users (Kontingent)
+        get_user_model().objects.select_for_update().filter(pk=user.pk).first()
+        reserved = (
+            UploadSession.objects.filter(
+                user=user, status=UploadSession.Status.OPEN, expires_at__gt=now
+            ).aggregate(total=Sum("size"))["total"]
+            or 0
+        )
+        if reserved + size > settings.UPLOAD_USER_QUOTA_BYTES:
+            raise ValidationError(
+                {"size": "Upload-Kontingent erschöpft – offene Uploads abschließen oder abbrechen."}
+            )
+        return UploadSession.objects.create(
+            user=user,
+            filename=os.path.basename(filename)[:255] or "upload",
+            content_type=content_type,
+            size=size,
+            chunk_size=settings.UPLOAD_CHUNK_SIZE,
+            expires_at=now + timedelta(hours=settings.UPLOAD_SESSION_TTL_HOURS),
+        )
+
+
+def check_session_open(session) -> None:
+    if session.expires_at <= timezone.now():
+        raise UploadSessionExpired()
+    if session.status != UploadSession.Status.OPEN:
+        raise ValidationError({"detail": "Upload-Session ist bereits abgeschlossen."})
+
+
+def expected_chunk_length(session, number: int) -> int:
+    if number < 0 or number >= session.chunk_count:
+        raise ValidationError({"number": f"Chunk-Nummer muss zwischen 0 und {session.chunk_count - 1} liegen."})
+    if number == session.chunk_count - 1:
+        return session.size - number * session.chunk_size
+    return session.chunk_size
+
+
+def write_chunk(session, number: int, stream, length: int) -> UploadChunk:
+    """
+    Schreibt einen Chunk blockweise aus dem Request-Body auf die Platte
+    (nie ganz im Speicher) und ersetzt einen evtl. vorhandenen atomar –
+    abgebrochene oder wiederholte PUTs hinterlassen keine halben Chunks.
+    """
+    check_session_open(session)
+    expected = expected_chunk_length(session, number)
+    if length != expected:
+        raise ValidationError({"detail": f"Chunk {number} muss genau {expected} Bytes lang sein."})
+
+    directory = chunk_dir(session)
+    directory.mkdir(parents=True, exist_ok=True)
+    target = directory / f"{number}.part"
+    tmp = directory / f"{number}.{uuid.uuid4().hex}.tmp"
+    written = 0
+    try:
+        with open(tmp, "wb") as fh:
+            while written < length:
+                block = stream.read(min(_BLOCK_SIZE, length - written))
+                if not block:
+                    break
+                fh.write(block)
+                written += len(block)
+        if written != length:
+            raise ValidationError({"detail": f"Chunk {number} unvollständig ({written}/{length} Bytes)."})
+        os.replace(tmp, target)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+    chunk, _ = UploadChunk.objects.update_or_create(
+        session=session, number=number, defaults={"size": length}
+    )
+    return chunk
+
+
+def received_chunks(session) -> list:
+    return sorted(session.chunks.values_list("number", flat=True))
+
+
+def finalize_session(session_id, user, sha256=None) -> UploadSession:
+    """
+    Setzt die Chunks in Reihenfolge zusammen und speichert das Ergebnis
+    inhaltsadressiert (forum.blobs). Wiederholtes finalize liefert die
+    bereits abgeschlossene Session zurück. sha256 (optional) prüft die
+    vom Client berechnete Prüfsumme der ganzen Datei.
+    """
+    with transaction.atomic():
+        session = UploadSession.objects.select_for_update().filter(pk=session_id, user=user).first()
+        if session is None:
+            return None
+        if session.status == UploadSession.Status.FINALIZED and session.blob_id:
+            return session
+        check_session_open(session)
+
+        received = set(received_chunks(session))
+        missing = [n for n in range(session.chunk_count) if n not in received]
+        if missing:
+            raise ValidationError({"detail": "Es fehlen Chunks.", "missing": missing[:100]})
+
+        directory = chunk_dir(session)
+        assembled = directory / "assembled"
+        digest = hashlib.sha256()
+        with open(assembled, "wb") as out:
+            for number in range(session.chunk_count):
+                with open(directory / f"{number}.part", "rb") as part:
+                    while block := part.read(_BLOCK_SIZE):
+                        digest.update(block)
+                        out.write(block)
+        if assembled.stat().st_size != session.size:
+            raise ValidationError({"detail": "Zusammengesetzte Datei hat nicht die angekündigte Größe."})
+        if sha256 and sha256.lower() != digest.hexdigest():
+            raise ValidationError({"sha256": "Prüfsumme stimmt nicht überein."})
+
+        with open(assembled, "rb") as fh:
+            upload = File(fh, name=session.filename)
+            ext = validate_image(upload)
+            session.blob = store_upload(strip_image_metadata(upload), ext=ext)
+        session.status = UploadSession.Status.FINALIZED
+        session.save(update_fields=["blob", "status"])
+        transaction.on_commit(lambda: shutil.rmtree(directory, ignore_errors=True))
+    return session
+
+
+def abort_session(session) -> None:
+    directory = chunk_dir(session)
+    session.delete()
+    shutil.rmtree(directory, ignore_errors=True)
+
+
+def expire_upload_sessions(batch_size: int = 500, stdout=None) -> int:
+    """Löscht abgelaufene Sessions samt Chunk-Verzeichnissen. Gibt die Anzahl zurück."""
+    total = 0
+    now = timezone.now()
+    while True:
+        ids = list(
+            UploadSession.objects.filter(expires_at__lte=now)
+            .order_by("expires_at")
+            .values_list("pk", flat=True)[:batch_size]
+        )
+        if not ids:
+            break
+        UploadSession.objects.filter(pk__in=ids).delete()
+        for session_id in ids:
+            shutil.rmtree(Path(settings.UPLOAD_CHUNK_DIR) / str(session_id), ignore_errors=True)
+        total += len(ids)
+        if stdout is not None:
+            stdout.write(f"… {total} Sessions gelöscht")
+    return total
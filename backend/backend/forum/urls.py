@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import CommunityViewSet, MembershipViewSet, PostViewSet, ManagedCommunityListView, upload_community_image, upload_post_images, CommentViewSet, post_vote
+from .views import CommunityViewSet, MembershipViewSet, PostViewSet, ManagedCommunityListView, HomeFeedView, SearchView, upload_community_image, upload_post_images, upload_session_create, upload_session_detail, upload_session_chunk, upload_session_finalize, CommentViewSet, post_vote, vote_batch, cache_metrics
 
 router = DefaultRouter()
 router.register(r"communities", CommunityViewSet, basename="community")
@@ -10,8 +10,16 @@ router.register(r"comments", CommentViewSet, basename="comment")
 
 urlpatterns = [
     path("communities/manage/", ManagedCommunityListView.as_view(), name="community-managed"),
+    path("feed/", HomeFeedView.as_view(), name="home-feed"),
+    path("search/", SearchView.as_view(), name="search"),
     path("upload_post_images/", upload_post_images, name="upload_post_images"),
     path("uploads/community-image/", upload_community_image, name="upload-community-image"),
+    path("uploads/sessions/", upload_session_create, name="upload-session-create"),
+    path("uploads/sessions/<uuid:session_id>/", upload_session_detail, name="upload-session-detail"),
+    path("uploads/sessions/<uuid:session_id>/chunks/<int:number>/", upload_session_chunk, name="upload-session-chunk"),
+    path("uploads/sessions/<uuid:session_id>/finalize/", upload_session_finalize, name="upload-session-finalize"),
     path("posts/<int:pk>/vote/", post_vote, name="post-vote"),
+    path("votes/batch/", vote_batch, name="vote-batch"),
+    path("metrics/cache/", cache_metrics, name="cache-metrics"),
     path("", include(router.urls))
     ]
@@ -0,0 +1,96 @@
+from rest_framework import serializers
+
+from .models import Membership, PostVote
+
+
+class ViewerState:
+    """
+    Zustand des anfragenden Users für die Objekte einer Seite:
+    eigener Vote pro Post, eigene Rolle pro Community.
+    """
+
+    def __init__(self, votes=None, roles=None):
+        self.votes = votes or {}
+        self.roles = roles or {}
+
+    def vote(self, post_id) -> int:
+        return self.votes.get(post_id, 0)
+
+    def role(self, community_id):
+        return self.roles.get(community_id)
+
+
+def load_viewer_state(user, post_ids=(), community_ids=()) -> ViewerState:
+    """
+    Lädt Votes und Rollen des Users für die übergebenen ids – je eine
+    Abfrage über den Primärschlüssel-Bereich der Seite, unabhängig von
+    der Seitengröße. Anonyme User bekommen einen leeren Zustand.
+    """
+    if user is None or not user.is_authenticated:
+        return ViewerState()
+
+    post_ids = list(post_ids)
+    community_ids = list(community_ids)
+    votes = {}
+    roles = {}
+    if post_ids:
+        votes = dict(
+            PostVote.objects.filter(user=user, post_id__in=post_ids)
+            .values_list("post_id", "value")
+        )
+    if community_ids:
+        roles = dict(
+            Membership.objects.filter(user=user, community_id__in=community_ids)
+            .values_list("community_id", "role")
+        )
+    return ViewerState(votes=votes, roles=roles)
+
+
+class PagePreloadListSerializer(serializers.ListSerializer):
+    """
+    Lädt vor dem Serialisieren einer Seite einmalig, was alle Einträge
+    brauchen: den ViewerState (child.load_viewer_state, als
+    context["viewer"]) und weitere seitenweise Daten (child.preload_page,
+    z.B. Bild-Assets aus forum.media). Ein von der View bereits gesetzter
+    ViewerState wird übernommen. child.finish_page läuft nach der Seite
+    (z.B. gesammeltes Schreiben der Fragmente aus forum.fragments).
+    """
+
+    def to_representation(self, data):
+        items = list(data.all() if hasattr(data, "all") else data)
+        if "viewer" not in self.context and hasattr(self.child, "load_viewer_state"):
+            self.context["viewer"] = self.child.load_viewer_state(items)
+        if hasattr(self.child, "preload_page"):
+            self.child.preload_page(items)
+        data = super().to_representation(items)
+        if hasattr(self.child, "finish_page"):
+            self.child.finish_page(items)
+        return data
+
+
+class ViewerStateMixin:
+    """
+    Für Serializer mit my_vote/my_role. Ohne context["viewer"] (Einzelobjekt,
+    z.B. retrieve/create) wird der Zustand für genau dieses Objekt geladen.
+    Standard: my_vote -> Votes der Objekte als Posts, my_role -> Rollen der
+    Objekte als Communities; nicht ausgegebene Felder werden nicht geladen.
+    """
+
+    def load_viewer_state(self, objs) -> ViewerState:
+        ids = [obj.pk for obj in objs]
+        fields = self.fields
+        return load_viewer_state(
+            self._viewer_user(),
+            post_ids=ids if "my_vote" in fields else (),
+            community_ids=ids if "my_role" in fields else (),
+        )
+
+    def get_viewer_state(self, obj) -> ViewerState:
+        viewer = self.context.get("viewer")
+        if viewer is None:
+            viewer = self.load_viewer_state([obj])
+        return viewer
+
+    def _viewer_user(self):
+        request = self.context.get("request")
+        return request.user if request else None
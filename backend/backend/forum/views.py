@@ -1,12 +1,13 @@
-from django.db import models
+from django.db import transaction
 from rest_framework import generics
-from django.db.models import Count, Q, Subquery, Sum, OuterRef, IntegerField, Value as V
-from django.db.models.functions import Coalesce
+from django.db.models import Count, Q
 from rest_framework import viewsets, permissions, decorators, response, status, filters
 from rest_framework.exceptions import PermissionDenied, ValidationError
+import hashlib
 import os
-import uuid
+from django.core.cache import cache
 from django.core.files.storage import default_storage
+from django.utils.cache import patch_cache_control
 from django.conf import settings
 from rest_framework.decorators import api_view, permission_classes, parser_classes
 from rest_framework.parsers import MultiPartParser, FormParser
@@ -14,22 +15,60 @@ from rest_framework.response import Response
 from rest_framework import permissions
 from django.shortcuts import get_object_or_404
 
-from .models import Community, Membership, Post, PostVote, PostImage, Comment
+from .models import Community, Membership, Post, PostVote, PostImage, Comment, UploadSession
 from .serializers import (
     CommunitySerializer,
     MembershipSerializer,
     PostSerializer,
-    CommentSerializer
+    CommentSerializer,
+    PostSearchResultSerializer,
+    CommentSearchResultSerializer,
 )
 from .permissions import IsOwner, IsModOrOwnerForCommunity, IsAuthorOrModOrOwner, IsCommentAuthorOrModOrOwner
+from .pagination import FeedPagination, MergedFeedPagination, SearchPagination
+from .search import (
+    AUTOCOMPLETE_LIMIT, AUTOCOMPLETE_MAX_LIMIT, autocomplete_communities, build_query,
+    comment_headlines, lookup_members, normalize_term, post_headlines, ranked,
+)
+from .feed import MERGE_SORT_FIELDS, home_feed_ids, schedule_membership_change
+from .ranking import apply_feed_ordering
+from .roles import get_role_resolver
+from .blobs import store_upload
+from .uploads import (
+    abort_session, create_session, finalize_session, received_chunks, store_uploads, write_chunk,
+)
+from .media import register_image, strip_image_metadata, validate_image
+from .metrics import all_cache_stats, cache_stats, request_timings
+from .fieldsets import SparseFieldsetViewMixin, apply_fieldset
+from .projections import comment_projection, paginated_projection, post_projection
+from .response_cache import (
+    bump_versions, cache_anonymous_response, community_slug_scopes, directory_scopes,
+    post_community_scopes,
+)
+from .votes import VOTE_VALUES, cast_votes
+from .threads import (
+    THREAD_DEFAULT_DEPTH, THREAD_DEFAULT_LIMIT, THREAD_MAX_DEPTH, THREAD_MAX_LIMIT,
+    COMMENT_ORDERING_FIELDS, build_thread, decode_thread_cursor, thread_rows,
+)
+from .counters import (
+    adjust_comment_count,
+    adjust_members_count,
+    adjust_posts_count,
+    apply_reply_deleted,
+    membership_delta,
+    refresh_post_counters,
+)
+
+autocomplete_cache_stats = cache_stats("autocomplete")
 
 
-class CommunityViewSet(viewsets.ModelViewSet):
+class CommunityViewSet(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     """
     Directory + CRUD.
     """
     serializer_class = CommunitySerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    pagination_class = FeedPagination
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ["slug", "name", "description"]
     ordering_fields = ["created_at", "members_count", "name"]
@@ -39,47 +78,14 @@ class CommunityViewSet(viewsets.ModelViewSet):
     lookup_url_kwarg = "slug"
 
     def get_queryset(self):
-        qs = Community.objects.all().annotate(
-            members_count=Count(
-                "memberships",
-                filter=Q(memberships__role__in=[
-                    Membership.Role.MEMBER,
-                    Membership.Role.MODERATOR,
-                    Membership.Role.OWNER
-                ]),
-                distinct=True,
-            ),
-            posts_count=Count(
-                "posts",
-                filter=Q(posts__is_deleted=False),
-                distinct=True,
-            ),
-        )
-        return qs
-
+        return Community.objects.all()
 
+    @cache_anonymous_response(directory_scopes)
     def list(self, request, *args, **kwargs):
-        qs = self.filter_queryset(self.get_queryset())
-        my_map = {}
-        if request.user.is_authenticated:
-            for m in Membership.objects.filter(user=request.user, community__in=qs):
-                my_map[m.community_id] = m
-        for c in qs:
-            setattr(c, "_my_membership", my_map.get(c.id))
-        page = self.paginate_queryset(qs)
-        if page is not None:
-            for c in page:
-                setattr(c, "_my_membership", my_map.get(c.id))
-            ser = self.get_serializer(page, many=True)
-            return self.get_paginated_response(ser.data)
-        ser = self.get_serializer(qs, many=True)
-        return response.Response(ser.data)
+        return super().list(request, *args, **kwargs)
 
+    @cache_anonymous_response(community_slug_scopes)
     def retrieve(self, request, *args, **kwargs):
-        obj = self.get_object()
-        if request.user.is_authenticated:
-            m = Membership.objects.filter(community=obj, user=request.user).first()
-            setattr(obj, "_my_membership", m)
         return super().retrieve(request, *args, **kwargs)
 
     def perform_create(self, serializer):
@@ -206,7 +212,10 @@ class CommunityViewSet(viewsets.ModelViewSet):
                     status=status.HTTP_400_BAD_REQUEST,
                 )
 
-        m.delete()
+        with transaction.atomic():
+            m.delete()
+            adjust_members_count(community.pk, membership_delta(m.role, None))
+            schedule_membership_change(m.user_id, community.pk, is_member=False)
         return response.Response(status=status.HTTP_204_NO_CONTENT)
 
     
@@ -233,6 +242,10 @@ class CommunityViewSet(viewsets.ModelViewSet):
             )
             .order_by("user__username")
         )
+        # ?q=: Username-Lookup, sortiert nach Ähnlichkeit
+        term = request.query_params.get("q")
+        if term and term.strip():
+            qs = lookup_members(qs, term)
 
         page = self.paginate_queryset(qs)
         if page is not None:
@@ -269,8 +282,13 @@ class CommunityViewSet(viewsets.ModelViewSet):
                 status=404,
             )
 
-        m.role = Membership.Role.MEMBER
-        m.save(update_fields=["role"])
+        with transaction.atomic():
+            m.role = Membership.Role.MEMBER
+            m.save(update_fields=["role"])
+            adjust_members_count(
+                community.pk, membership_delta(Membership.Role.PENDING, m.role)
+            )
+            schedule_membership_change(m.user_id, community.pk, is_member=True)
 
         ser = MembershipSerializer(m, context={"request": request})
         return response.Response(ser.data, status=200)
@@ -302,22 +320,31 @@ class CommunityViewSet(viewsets.ModelViewSet):
                 status=404,
             )
 
-        m.delete()
+        with transaction.atomic():
+            m.delete()
+            adjust_members_count(community.pk, membership_delta(m.role, None))
         return response.Response(status=204)
 
     @decorators.action(detail=True, methods=["post"], permission_classes=[permissions.IsAuthenticated])
     def join(self, request, slug=None):
         community = self.get_object()
         user = request.user
-        m, created = Membership.objects.get_or_create(community=community, user=user)
+        role = (Membership.Role.MEMBER
+                if community.visibility == Community.Visibility.PUBLIC
+                else Membership.Role.PENDING)
+        with transaction.atomic():
+            m, created = Membership.objects.get_or_create(
+                community=community, user=user, defaults={"role": role}
+            )
+            if created:
+                adjust_members_count(community.pk, membership_delta(None, m.role))
+                if m.role != Membership.Role.PENDING:
+                    schedule_membership_change(user.pk, community.pk, is_member=True)
+        get_role_resolver(request).remember(community.pk, m.role)
         if not created:
             if m.role == Membership.Role.PENDING:
                 return response.Response({"detail": "Anfrage bereits gestellt."}, status=200)
             return response.Response({"detail": "Bereits Mitglied."}, status=409)
-        m.role = (Membership.Role.MEMBER
-                  if community.visibility == Community.Visibility.PUBLIC
-                  else Membership.Role.PENDING)
-        m.save(update_fields=["role"])
         return response.Response(MembershipSerializer(m).data, status=201)
 
     @decorators.action(detail=True, methods=["post"], permission_classes=[permissions.IsAuthenticated])
@@ -337,9 +364,49 @@ class CommunityViewSet(viewsets.ModelViewSet):
                     {"detail": "Letzter Owner kann nicht verlassen. Übertrage Ownership."},
                     status=400,
                 )
-        m.delete()
+        with transaction.atomic():
+            m.delete()
+            adjust_members_count(community.pk, membership_delta(m.role, None))
+            schedule_membership_change(user.pk, community.pk, is_member=False)
+        get_role_resolver(request).forget(community.pk)
         return response.Response(status=204)
 
+    @decorators.action(detail=False, methods=["get"], url_path="autocomplete")
+    def autocomplete(self, request):
+        """
+        Typeahead: /api/communities/autocomplete/?q=<eingabe>[&limit=N]
+        Antwort ist eine schlanke Liste ohne Viewer-Felder und damit für alle
+        gleich – pro normalisierter Eingabe gecacht (Server + Cache-Control).
+        """
+        term = normalize_term(request.query_params.get("q") or "")
+        try:
+            limit = int(request.query_params.get("limit") or AUTOCOMPLETE_LIMIT)
+        except ValueError:
+            raise ValidationError({"limit": "Ungültiger Wert."})
+        limit = max(1, min(limit, AUTOCOMPLETE_MAX_LIMIT))
+
+        data = []
+        if term:
+            # Eingabe gehasht: Leerzeichen/Steuerzeichen und Länge sind für
+            # Cache-Backends wie Memcached keine gültigen Schlüssel
+            digest = hashlib.sha1(term.encode()).hexdigest()
+            key = f"forum:ac:communities:{limit}:{digest}"
+            data = cache.get(key)
+            if data is not None:
+                autocomplete_cache_stats.hit()
+            else:
+                autocomplete_cache_stats.miss()
+                data = list(
+                    autocomplete_communities(term, limit).values(
+                        "id", "slug", "name", "icon_url", "visibility", "members_count",
+                    )
+                )
+                cache.set(key, data, settings.AUTOCOMPLETE_CACHE_SECONDS)
+
+        resp = response.Response(data)
+        patch_cache_control(resp, public=True, max_age=settings.AUTOCOMPLETE_CACHE_SECONDS)
+        return resp
+
     @decorators.action(
         detail=True,
         methods=["get"],
@@ -347,12 +414,7 @@ class CommunityViewSet(viewsets.ModelViewSet):
     def members(self, request, slug=None):
         community = self.get_object()
 
-        is_ok = Membership.objects.filter(
-            community=community,
-            user=request.user,
-            role__in=[Membership.Role.MODERATOR, Membership.Role.OWNER],
-        ).exists()
-        if not is_ok:
+        if not get_role_resolver(request).is_mod_or_owner(community.pk):
             raise PermissionDenied("Moderator- oder Owner-Rechte erforderlich.")
 
         qs = (
@@ -371,6 +433,10 @@ class CommunityViewSet(viewsets.ModelViewSet):
             )
             .order_by("user__username")
         )
+        # ?q=: Username-Lookup wie bei members_pending
+        term = request.query_params.get("q")
+        if term and term.strip():
+            qs = lookup_members(qs, term)
 
         page = self.paginate_queryset(qs)
         if page is not None:
@@ -386,66 +452,34 @@ class CommunityViewSet(viewsets.ModelViewSet):
         methods=["get", "post"],
         url_path="posts",
         permission_classes=[permissions.IsAuthenticatedOrReadOnly])
+    @cache_anonymous_response(community_slug_scopes)
     def posts(self, request, slug=None):
         community = self.get_object()
 
         if request.method.lower() == "get":
-            vote_score_sub = (
-                PostVote.objects
-                .filter(post=OuterRef("pk"))
-                .values("post")              
-                .annotate(s=Coalesce(Sum("value"), V(0)))
-                .values("s")[:1]
-            )
-
             qs = (
                 Post.objects
                 .select_related("community", "author")
+                .prefetch_related("images")
                 .filter(
                     is_deleted=False,
                     community=community,
                 )
-                .annotate(
-                    score=Coalesce(
-                        Subquery(vote_score_sub, output_field=IntegerField()),
-                        V(0),
-                    ),
-                    comment_count=Count(
-                        "comments",
-                        filter=Q(comments__is_deleted=False),
-                        distinct=True,
-                    ),
-                )
             )
 
-            if request.user.is_authenticated:
-                sub = PostVote.objects.filter(
-                    post=OuterRef("pk"),
-                    user=request.user,
-                ).values("value")[:1]
-                qs = qs.annotate(
-                    my_vote=Coalesce(
-                        Subquery(sub, output_field=IntegerField()),
-                        V(0),
-                    )
-                )
-            else:
-                qs = qs.annotate(
-                    my_vote=V(0, output_field=IntegerField())
-                )
-
-            ordering = request.query_params.get("ordering") or "-created_at"
-            if ordering.lstrip("-") in ["created_at", "score"]:
-                qs = qs.order_by("-is_pinned", ordering)
-            else:
-                qs = qs.order_by("-is_pinned", "-created_at")
+            qs = apply_feed_ordering(qs, request.query_params)
+            fieldset = self.get_fieldset()
+            if settings.PROJECTION_LISTS_ENABLED:
+                return paginated_projection(self, qs, post_projection, fieldset)
+            qs = apply_fieldset(qs, PostSerializer, fieldset)
 
+            context = self.get_serializer_context()
             page = self.paginate_queryset(qs)
             if page is not None:
-                ser = PostSerializer(page, many=True, context={"request": request})
+                ser = PostSerializer(page, many=True, context=context)
                 return self.get_paginated_response(ser.data)
 
-            ser = PostSerializer(qs, many=True, context={"request": request})
+            ser = PostSerializer(qs, many=True, context=context)
             return response.Response(ser.data)
 
         data = request.data.copy()
@@ -456,7 +490,7 @@ class CommunityViewSet(viewsets.ModelViewSet):
         return response.Response(ser.data, status=status.HTTP_201_CREATED)
     
 
-class ManagedCommunityListView(generics.ListAPIView):
+class ManagedCommunityListView(SparseFieldsetViewMixin, generics.ListAPIView):
     """
     Gibt alle Communities zurück, in denen der aktuelle User
     Owner oder Moderator ist.
@@ -471,32 +505,104 @@ class ManagedCommunityListView(generics.ListAPIView):
     def get_queryset(self):
         user = self.request.user
 
-        qs = Community.objects.annotate(
-            members_count=Count(
-                "memberships",
-                filter=Q(memberships__role__in=[
-                    Membership.Role.MEMBER,
-                    Membership.Role.MODERATOR,
-                    Membership.Role.OWNER,
-                ]),
-                distinct=True,
-            ),
-            posts_count=Count(
-                "posts",
-                filter=Q(posts__is_deleted=False),
-                distinct=True,
-            ),
-        ).filter(
+        qs = Community.objects.filter(
             memberships__user=user,
             memberships__role__in=[
                 Membership.Role.OWNER,
                 Membership.Role.MODERATOR,
             ],
-        ).distinct()
+        )
 
         return qs
 
 
+class HomeFeedView(SparseFieldsetViewMixin, generics.ListAPIView):
+    """
+    Persönlicher Feed: Posts aus allen Communities, in denen der User
+    Member/Moderator/Owner ist, als ein Cursor-paginierter Stream.
+    Ordering: -created_at (Default), created_at, -score, score
+    Angepinnte Posts werden hier nicht bevorzugt.
+    Mit FEED_FANOUT_ENABLED liest -created_at aus der FeedEntry-Timeline.
+    """
+    serializer_class = PostSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = MergedFeedPagination
+    filter_backends = []
+
+    def get_feed_page_ids(self, ordering, after, limit):
+        return home_feed_ids(self.request.user, ordering, after, limit)
+
+    def get_queryset(self):
+        qs = Post.objects.select_related("community", "author").prefetch_related("images")
+
+        ordering = self.request.query_params.get("ordering") or "-created_at"
+        if ordering.lstrip("-") not in MERGE_SORT_FIELDS:
+            ordering = "-created_at"
+        return qs.order_by(ordering)
+
+
+class SearchView(SparseFieldsetViewMixin, generics.ListAPIView):
+    """
+    Volltextsuche (Postgres tsvector + GIN).
+      - ?q=<text> (websearch-Syntax: "phrase", -wort, OR)
+      - ?type=posts (Default) | comments
+      - ?community=<slug> (optional)
+    Sortiert nach ts_rank, Cursor-paginiert, mit <mark>-Snippets in "highlight".
+    """
+    permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    pagination_class = SearchPagination
+    filter_backends = []
+
+    def get_search_type(self):
+        return "comments" if self.request.query_params.get("type") == "comments" else "posts"
+
+    def get_serializer_class(self):
+        if self.get_search_type() == "comments":
+            return CommentSearchResultSerializer
+        return PostSearchResultSerializer
+
+    def get_queryset(self):
+        slug = self.request.query_params.get("community")
+        if self.get_search_type() == "comments":
+            qs = Comment.objects.select_related("author", "post", "post__community").filter(
+                is_deleted=False,
+                post__is_deleted=False,
+            )
+            if slug:
+                qs = qs.filter(post__community__slug=slug)
+        else:
+            qs = (
+                Post.objects.select_related("community", "author")
+                .prefetch_related("images")
+                .filter(is_deleted=False)
+            )
+            if slug:
+                qs = qs.filter(community__slug=slug)
+        return ranked(qs, self.query)
+
+    def list(self, request, *args, **kwargs):
+        text = (request.query_params.get("q") or "").strip()
+        if not text:
+            return response.Response(
+                {"detail": "Suchbegriff (q) erforderlich."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        self.query = build_query(text)
+
+        qs = apply_fieldset(self.get_queryset(), self.get_serializer_class(), self.get_fieldset())
+        page = self.paginate_queryset(qs)
+        ids = [obj.pk for obj in page]
+        if self.get_search_type() == "comments":
+            headlines = comment_headlines(ids, self.query)
+        else:
+            headlines = post_headlines(ids, self.query)
+
+        context = self.get_serializer_context()
+        context["headlines"] = headlines
+        ser = self.get_serializer_class()(page, many=True, context=context)
+        return self.get_paginated_response(ser.data)
+
+
 class MembershipViewSet(viewsets.ReadOnlyModelViewSet):
     """Optional: Übersicht mit ?community=<id>"""
     serializer_class = MembershipSerializer
@@ -510,68 +616,33 @@ class MembershipViewSet(viewsets.ReadOnlyModelViewSet):
         return qs
 
 
-class PostViewSet(viewsets.ModelViewSet):
+class PostViewSet(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     """
     CRUD für Posts. Lesen öffentlich.
     Erstellen: nur Mitglieder (Membership check in Serializer.validate)
     Update/Delete: Autor oder Mod/Owner.
     Extras:
       - Filter: ?community=<id> | ?community_slug=<slug>
-      - Ordering: created_at, score
+      - Ordering: created_at, score, hot, rising, top (+ ?t=day|week|month|all)
+      - Keyset-Paginierung: ?pagination=cursor, danach ?cursor=<token>
       - POST /posts/{id}/vote/  body: {"value": 1|-1|0}
       - POST /posts/{id}/restore/  (soft-deleted rückgängig)
     """
     serializer_class = PostSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly, IsAuthorOrModOrOwner]
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
-    ordering_fields = ["created_at", "score"]
+    pagination_class = FeedPagination
+    # Sortierung übernimmt apply_feed_ordering in get_queryset
+    filter_backends = [filters.SearchFilter]
     search_fields = ["title", "body"]
-    ordering = ["-created_at"]
 
     def get_queryset(self):
-        user = self.request.user
-
-        vote_score_sub = (
-            PostVote.objects
-            .filter(post=OuterRef("pk"))
-            .values("post")
-            .annotate(s=Coalesce(Sum("value"), V(0)))
-            .values("s")[:1]
-        )
-
         qs = (
             Post.objects
             .select_related("community", "author")
+            .prefetch_related("images")
             .filter(is_deleted=False)
-            .annotate(
-                score=Coalesce(
-                    Subquery(vote_score_sub, output_field=IntegerField()),
-                    V(0),
-                ),
-                comment_count=Count(
-                    "comments",
-                    filter=Q(comments__is_deleted=False),
-                    distinct=True,
-                ),
-            )
         )
 
-        if user.is_authenticated:
-            sub = PostVote.objects.filter(
-                post=OuterRef("pk"),
-                user=user,
-            ).values("value")[:1]
-            qs = qs.annotate(
-                my_vote=Coalesce(
-                    Subquery(sub, output_field=IntegerField()),
-                    V(0),
-                )
-            )
-        else:
-            qs = qs.annotate(
-                my_vote=V(0, output_field=IntegerField())
-            )
-
         cid = self.request.query_params.get("community")
         cslug = self.request.query_params.get("community_slug")
         if cid:
@@ -579,13 +650,15 @@ class PostViewSet(viewsets.ModelViewSet):
         if cslug:
             qs = qs.filter(community__slug=cslug)
 
-        ordering = self.request.query_params.get("ordering") or "-created_at"
-        if ordering.lstrip("-") in ["created_at", "score"]:
-            qs = qs.order_by("-is_pinned", ordering)
-        else:
-            qs = qs.order_by("-is_pinned", "-created_at")
+        return apply_feed_ordering(qs, self.request.query_params)
+
+    def list(self, request, *args, **kwargs):
+        if settings.PROJECTION_LISTS_ENABLED:
+            return paginated_projection(
+                self, self.filter_queryset(self.get_queryset()), post_projection, self.get_fieldset()
+            )
+        return super().list(request, *args, **kwargs)
 
-        return qs
     def perform_create(self, serializer):
         if not self.request.user.is_authenticated:
             raise PermissionDenied("Login erforderlich.")
@@ -593,8 +666,13 @@ class PostViewSet(viewsets.ModelViewSet):
 
     def destroy(self, request, *args, **kwargs):
         post = self.get_object()
-        post.is_deleted = True
-        post.save(update_fields=["is_deleted"])
+        with transaction.atomic():
+            updated = Post.objects.filter(pk=post.pk, is_deleted=False).update(
+                is_deleted=True
+            )
+            if updated:
+                adjust_posts_count(post.community_id, -1)
+                bump_versions([post.community_id], directory=True)
         return response.Response(status=204)
 
     @decorators.action(detail=True, methods=["post"], permission_classes=[permissions.IsAuthenticated])
@@ -604,15 +682,19 @@ class PostViewSet(viewsets.ModelViewSet):
             return response.Response(status=404)
         if not (
             post.author_id == request.user.id or
-            Membership.objects.filter(
-                community=post.community,
-                user=request.user,
-                role__in=[Membership.Role.MODERATOR, Membership.Role.OWNER],
-            ).exists()
+            get_role_resolver(request).is_mod_or_owner(post.community_id)
         ):
             raise PermissionDenied("Keine Rechte zum Wiederherstellen.")
-        post.is_deleted = False
-        post.save(update_fields=["is_deleted"])
+        with transaction.atomic():
+            updated = Post.objects.filter(pk=post.pk, is_deleted=True).update(
+                is_deleted=False
+            )
+            if updated:
+                adjust_posts_count(post.community_id, 1)
+                bump_versions([post.community_id], directory=True)
+            # Während der Löschung können Votes/Kommentare ohne Zähler-Pflege
+            # entfernt worden sein (z.B. Kaskaden) – beim Restore neu abgleichen.
+            refresh_post_counters([post.pk])
         ser = self.get_serializer(self.get_queryset().filter(pk=pk).first())
         return response.Response(ser.data, status=200)
     
@@ -621,14 +703,18 @@ class PostViewSet(viewsets.ModelViewSet):
         methods=["get", "post"],
         url_path="comments",
         permission_classes=[permissions.IsAuthenticatedOrReadOnly])
+    @cache_anonymous_response(post_community_scopes)
     def comments(self, request, pk=None):
         post = self.get_object()
 
         if request.method.lower() == "get":
+            ordering = request.query_params.get("ordering") or "created_at"
+            if ordering.lstrip("-") not in COMMENT_ORDERING_FIELDS:
+                ordering = "created_at"
             qs = Comment.objects.select_related("author").filter(
                 post=post,
                 is_deleted=False,
-            ).order_by("created_at")
+            ).order_by(ordering)
 
             parent_id = request.query_params.get("parent")
             if parent_id is not None:
@@ -636,13 +722,15 @@ class PostViewSet(viewsets.ModelViewSet):
                     qs = qs.filter(parent__isnull=True)
                 else:
                     qs = qs.filter(parent_id=parent_id)
+            qs = apply_fieldset(qs, CommentSerializer, self.get_fieldset())
 
+            context = self.get_serializer_context()
             page = self.paginate_queryset(qs)
             if page is not None:
-                ser = CommentSerializer(page, many=True, context={"request": request})
+                ser = CommentSerializer(page, many=True, context=context)
                 return self.get_paginated_response(ser.data)
 
-            ser = CommentSerializer(qs, many=True, context={"request": request})
+            ser = CommentSerializer(qs, many=True, context=context)
             return response.Response(ser.data)
         data = request.data.copy()
         data["post"] = post.pk
@@ -651,13 +739,62 @@ class PostViewSet(viewsets.ModelViewSet):
         ser.save()
         return response.Response(ser.data, status=status.HTTP_201_CREATED)
 
+    @decorators.action(
+        detail=True,
+        methods=["get"],
+        url_path="thread",
+        permission_classes=[permissions.IsAuthenticatedOrReadOnly])
+    def thread(self, request, pk=None):
+        """
+        Ganzer Kommentarbaum (bzw. Ausschnitt) in einem rekursiven CTE.
+          - ?depth=N  Ebenen (Default 6, max. 20)
+          - ?limit=N  Antworten pro Knoten (Default 20, max. 100)
+          - ?cursor=  Fortsetzung aus "more" eines Knotens bzw. der Antwort
+        Antwort: {"post", "comments": [... {"replies": [...], "reply_count",
+        "depth", "more"}], "more"}
+        """
+        post = self.get_object()
+        depth = _bounded_int(request, "depth", THREAD_DEFAULT_DEPTH, THREAD_MAX_DEPTH)
+        limit = _bounded_int(request, "limit", THREAD_DEFAULT_LIMIT, THREAD_MAX_LIMIT)
+
+        parent_id, after = None, None
+        token = request.query_params.get("cursor")
+        if token:
+            parent_id, after = decode_thread_cursor(token)
+
+        rows, depth = thread_rows(post.pk, parent_id, after, depth, limit)
+        ids = [row["id"] for row in rows if row["rn"] <= limit]
+        comments = Comment.objects.select_related("author").filter(pk__in=ids)
+        serialized = CommentSerializer(comments, many=True, context={"request": request}).data
+
+        top, more = build_thread(rows, serialized, parent_id, depth, limit)
+        return response.Response({
+            "post": post.pk,
+            "parent": parent_id,
+            "comments": top,
+            "more": more,
+        })
+
+
+def _bounded_int(request, name, default, maximum):
+    value = request.query_params.get(name)
+    if value in (None, ""):
+        return default
+    try:
+        value = int(value)
+    except ValueError:
+        raise ValidationError({name: "Ungültiger Wert."})
+    return max(1, min(value, maximum))
+
 @api_view(["POST"])
 @permission_classes([permissions.IsAuthenticated])
 @parser_classes([MultiPartParser, FormParser])
 def upload_community_image(request):
     """
-    Nimmt eine Bilddatei entgegen, speichert sie unter MEDIA_ROOT
-    und gibt die absolute URL zurück.
+    Nimmt eine Bilddatei entgegen, speichert sie inhaltsadressiert unter
+    MEDIA_ROOT (forum.blobs, gleiche Datei = gleiche URL) und gibt die
+    absolute URL zurück.
+    Thumbnails/WebP-Größen entstehen danach im Hintergrund (forum.media).
     """
     file = request.FILES.get("file")
     if not file:
@@ -666,10 +803,9 @@ def upload_community_image(request):
     if not file.content_type.startswith("image/"):
         return Response({"detail": "Nur Bilddateien sind erlaubt."}, status=400)
 
-    ext = os.path.splitext(file.name)[1]
-    filename = f"community_banners/{uuid.uuid4().hex}{ext}"
-
-    saved_path = default_storage.save(filename, file)
+    ext = validate_image(file)
+    saved_path = store_upload(strip_image_metadata(file), ext=ext).name
+    register_image(saved_path)
     relative_url = default_storage.url(saved_path) 
 
     absolute_url = request.build_absolute_uri(relative_url)
@@ -682,28 +818,109 @@ def upload_community_image(request):
 def upload_post_images(request):
     """
     Nimmt mehrere Bilddateien (Feldname 'files') entgegen,
-    speichert sie und gibt eine Liste von URLs zurück.
+    prüft alle per Dekodierung, speichert sie inhaltsadressiert
+    (forum.blobs) und gibt eine Liste von URLs zurück. Dauer pro Datei
+    steht im Server-Timing-Header.
+    Thumbnails/WebP-Größen entstehen danach im Hintergrund (forum.media).
     """
     files = request.FILES.getlist("files")
     if not files:
         return Response({"detail": "Keine Dateien hochgeladen."}, status=400)
+    if len(files) > settings.UPLOAD_MAX_FILES:
+        return Response({"detail": f"Maximal {settings.UPLOAD_MAX_FILES} Dateien pro Upload."}, status=400)
+    if any(not file.content_type.startswith("image/") for file in files):
+        return Response({"detail": "Nur Bilddateien sind erlaubt."}, status=400)
+
+    # alles-oder-nichts, Dekodieren/Schreiben parallel (forum.uploads)
+    blobs = store_uploads(files, request_timings(request))
 
     urls = []
-    for file in files:
-        if not file.content_type.startswith("image/"):
-            return Response({"detail": "Nur Bilddateien sind erlaubt."}, status=400)
+    for blob in blobs:
+        register_image(blob.name)
+        urls.append(request.build_absolute_uri(default_storage.url(blob.name)))
+
+    return Response({"urls": urls}, status=201)
 
-        ext = os.path.splitext(file.name)[1]
-        filename = f"post_images/{uuid.uuid4().hex}{ext}"
 
-        saved_path = default_storage.save(filename, file)
-        relative_url = default_storage.url(saved_path)
-        absolute_url = request.build_absolute_uri(relative_url)
-        urls.append(absolute_url)
+def _upload_session_data(request, session):
+    data = {
+        "id": str(session.pk),
+        "filename": session.filename,
+        "size": session.size,
+        "chunk_size": session.chunk_size,
+        "chunk_count": session.chunk_count,
+        "received": received_chunks(session),
+        "status": session.status,
+        "expires_at": session.expires_at,
+        "url": None,
+    }
+    if session.blob_id:
+        data["url"] = request.build_absolute_uri(default_storage.url(session.blob.name))
+    return data
+
+
+@api_view(["POST"])
+@permission_classes([permissions.IsAuthenticated])
+def upload_session_create(request):
+    """
+    Resumable Upload, Schritt 1: {"filename", "size", "content_type"}.
+    Antwort enthält chunk_size/chunk_count; danach
+    PUT /uploads/sessions/<id>/chunks/<n>/ (roher Body, n ab 0) und
+    POST /uploads/sessions/<id>/finalize/ ({"sha256"} optional).
+    GET auf die Session zeigt die bereits empfangenen Chunks zum Fortsetzen.
+    """
+    try:
+        size = int(request.data.get("size"))
+    except (TypeError, ValueError):
+        raise ValidationError({"size": "Ungültiger Wert."})
+    session = create_session(
+        request.user,
+        filename=str(request.data.get("filename") or ""),
+        size=size,
+        content_type=str(request.data.get("content_type") or ""),
+    )
+    return Response(_upload_session_data(request, session), status=201)
+
+
+@api_view(["GET", "DELETE"])
+@permission_classes([permissions.IsAuthenticated])
+def upload_session_detail(request, session_id):
+    session = get_object_or_404(UploadSession, pk=session_id, user=request.user)
+    if request.method == "DELETE":
+        abort_session(session)
+        return Response(status=204)
+    return Response(_upload_session_data(request, session))
+
+
+@api_view(["PUT"])
+@permission_classes([permissions.IsAuthenticated])
+def upload_session_chunk(request, session_id, number):
+    """
+    Ein Chunk als roher Request-Body (Content-Length = chunk_size, beim
+    letzten Chunk der Rest). Der Body wird nicht geparst, sondern blockweise
+    auf die Platte geschrieben; erneutes PUT desselben Chunks ersetzt ihn.
+    Damit langsame Clients keinen Worker blockieren, sollte der Frontproxy
+    Request-Bodies puffern (nginx proxy_request_buffering, Default an).
+    """
+    session = get_object_or_404(UploadSession, pk=session_id, user=request.user)
+    try:
+        length = int(request.META.get("CONTENT_LENGTH") or 0)
+    except ValueError:
+        length = -1
+    write_chunk(session, number, request.stream, length)
+    return Response({"number": number, "received": received_chunks(session)})
 
-    return Response({"urls": urls}, status=201)
 
-class CommentViewSet(viewsets.ModelViewSet):
+@api_view(["POST"])
+@permission_classes([permissions.IsAuthenticated])
+def upload_session_finalize(request, session_id):
+    session = finalize_session(session_id, request.user, sha256=request.data.get("sha256"))
+    if session is None:
+        return Response({"detail": "Nicht gefunden."}, status=404)
+    register_image(session.blob.name)
+    return Response(_upload_session_data(request, session))
+
+class CommentViewSet(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     """
     CRUD für Kommentare.
     Lesen öffentlich.
@@ -713,11 +930,15 @@ class CommentViewSet(viewsets.ModelViewSet):
       - ?post=<id>
       - ?post_slug=<slug>
       - ?parent=<id> (für Threading/Top-Level)
+    Ordering: created_at, reply_count, descendant_count
+      (z.B. ?parent=null&ordering=-descendant_count: meistdiskutiert zuerst)
+    Keyset-Paginierung: ?pagination=cursor, danach ?cursor=<token>
     """
     serializer_class = CommentSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly, IsCommentAuthorOrModOrOwner]
+    pagination_class = FeedPagination
     filter_backends = [filters.OrderingFilter]
-    ordering_fields = ["created_at"]
+    ordering_fields = COMMENT_ORDERING_FIELDS
     ordering = ["created_at"]
 
     def get_queryset(self):
@@ -740,6 +961,13 @@ class CommentViewSet(viewsets.ModelViewSet):
 
         return qs
 
+    def list(self, request, *args, **kwargs):
+        if settings.PROJECTION_LISTS_ENABLED:
+            return paginated_projection(
+                self, self.filter_queryset(self.get_queryset()), comment_projection, self.get_fieldset()
+            )
+        return super().list(request, *args, **kwargs)
+
     def perform_create(self, serializer):
         if not self.request.user.is_authenticated:
             raise PermissionDenied("Login erforderlich.")
@@ -747,14 +975,19 @@ class CommentViewSet(viewsets.ModelViewSet):
 
     def destroy(self, request, *args, **kwargs):
         comment = self.get_object()
-        comment.is_deleted = True
-        comment.save(update_fields=["is_deleted"])
+        with transaction.atomic():
+            updated = Comment.objects.filter(pk=comment.pk, is_deleted=False).update(
+                is_deleted=True
+            )
+            if updated:
+                adjust_comment_count(comment.post_id, -1)
+                apply_reply_deleted(comment)
+                bump_versions([comment.post.community_id])
         return response.Response(status=204)
 
 @api_view(["POST"])
 @permission_classes([permissions.IsAuthenticated])
 def post_vote(request, pk: int):
-    post = get_object_or_404(Post, pk=pk)
     try:
         value = int(request.data.get("value", 0))
     except (TypeError, ValueError):
@@ -762,41 +995,87 @@ def post_vote(request, pk: int):
             {"detail": "Ungültiger Vote-Wert."},
             status=status.HTTP_400_BAD_REQUEST,
         )
-    if value not in (-1, 0, 1):
+    if value not in VOTE_VALUES:
         return Response(
             {"detail": "Vote-Wert muss -1, 0 oder 1 sein."},
             status=status.HTTP_400_BAD_REQUEST,
         )
 
-    existing = PostVote.objects.filter(post=post, user=request.user).first()
-
-    if value == 0:
-        if existing:
-            existing.delete()
-        my_vote = 0
-    else:
-        if existing:
-            if existing.value == value:
-                existing.delete()
-                my_vote = 0
-            else:
-                existing.value = value
-                existing.save(update_fields=["value"])
-                my_vote = value
-        else:
-            PostVote.objects.create(post=post, user=request.user, value=value)
-            my_vote = value
-
-    agg = PostVote.objects.filter(post=post).aggregate(
-        score=Coalesce(models.Sum("value"), 0),
-    )
-    score = agg["score"] or 0
+    result = cast_votes(request.user.pk, [(pk, value)], toggle=True)
+    if pk not in result:
+        return Response({"detail": "Nicht gefunden."}, status=status.HTTP_404_NOT_FOUND)
+    score, my_vote = result[pk]
 
     return Response(
         {
-            "id": post.id,
+            "id": pk,
             "score": score,
             "my_vote": my_vote,
         },
         status=status.HTTP_200_OK,
-    )
\ No newline at end of file
+    )
+
+
+@api_view(["POST"])
+@permission_classes([permissions.IsAuthenticated])
+def vote_batch(request):
+    """
+    Mehrere Votes in einer Transaktion (ein Statement), z.B. Offline-Sync.
+    Body: {"votes": [{"post": <id>, "value": -1|0|1}, ...]}
+    Setzt den Wert (kein Toggle); bei doppelten Posts gilt der letzte Eintrag.
+    Existiert ein Post nicht, wird nichts übernommen (404).
+    """
+    items = request.data.get("votes") if isinstance(request.data, dict) else None
+    if not isinstance(items, list) or not items:
+        return Response(
+            {"detail": "votes muss eine nicht-leere Liste sein."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    if len(items) > settings.VOTE_BATCH_MAX:
+        return Response(
+            {"detail": f"Maximal {settings.VOTE_BATCH_MAX} Votes pro Request."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    pairs = []
+    for item in items:
+        try:
+            pair = (int(item["post"]), int(item.get("value", 0)))
+        except (TypeError, ValueError, KeyError, AttributeError):
+            return Response(
+                {"detail": "Jeder Eintrag braucht post und value."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if pair[1] not in VOTE_VALUES:
+            return Response(
+                {"detail": "Vote-Wert muss -1, 0 oder 1 sein."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        pairs.append(pair)
+
+    with transaction.atomic():
+        result = cast_votes(request.user.pk, pairs)
+        missing = sorted({post_id for post_id, _ in pairs} - set(result))
+        if missing:
+            transaction.set_rollback(True)
+            return Response(
+                {"detail": "Post nicht gefunden.", "missing": missing},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+
+    return Response(
+        {
+            "results": [
+                {"id": post_id, "score": score, "my_vote": my_vote}
+                for post_id, (score, my_vote) in result.items()
+            ],
+        },
+        status=status.HTTP_200_OK,
+    )
+
+
+@api_view(["GET"])
+@permission_classes([permissions.IsAdminUser])
+def cache_metrics(request):
+    """Trefferquoten der Caches dieses Worker-Prozesses (Zähler seit Start)."""
+    return Response({"pid": os.getpid(), "caches": all_cache_stats()})
@@ -0,0 +1,115 @@
+from django.db import connection, transaction
+
+from .models import Post, PostVote
+from .response_cache import bump_versions
+
+VOTE_VALUES = (-1, 0, 1)
+
+# Die Post-Zeilen werden vorab in einem eigenen Statement gesperrt
+# (_LOCK_SQL, id-Reihenfolge: keine Deadlocks zwischen überlappenden Batches).
+# Erst danach läuft _CAST_SQL – mit einem Snapshot, der alle Votes enthält,
+# die vor dem Lock committed wurden. Im selben Statement würden del/ins nach
+# dem Warten auf das Lock noch den alten Snapshot sehen und z.B. einen
+# inzwischen gelöschten Vote ein zweites Mal abziehen.
+_LOCK_SQL = """
+    SELECT id FROM {post} WHERE id = ANY(%(post_ids)s::bigint[]) ORDER BY id FOR NO KEY UPDATE
+""".format(post=Post._meta.db_table)
+
+# Ein Statement pro Aufruf (Einzel-Vote wie Batch):
+#   locked  – die (bereits gesperrten) Post-Zeilen
+#   del     – value 0 bzw. (toggle) gleicher Wert: bestehenden Vote löschen
+#   ins     – sonst Upsert; ON CONFLICT aktualisiert nur bei geändertem Wert
+#   change  – (old, new) pro tatsächlich geändertem Vote; bei einem Update
+#             war der alte Wert -new, da nur -1/1 gespeichert werden
+#   upd     – Zähler des Posts inkrementell anpassen
+# Ergebnis: pro existierendem Post (post_id, score, my_vote, community_id)
+_CAST_SQL = """
+    WITH input AS (
+        SELECT * FROM unnest(%(post_ids)s::bigint[], %(values)s::smallint[]) AS i(post_id, value)
+    ),
+    locked AS (
+        SELECT p.id, p.score, p.community_id FROM {post} p
+        WHERE p.id IN (SELECT post_id FROM input)
+        ORDER BY p.id
+        FOR NO KEY UPDATE
+    ),
+    del AS (
+        DELETE FROM {vote} v
+        USING input i
+        WHERE v.post_id = i.post_id
+          AND v.user_id = %(user_id)s
+          AND v.post_id IN (SELECT id FROM locked)
+          AND (i.value = 0 OR (%(toggle)s AND v.value = i.value))
+        RETURNING v.post_id, v.value
+    ),
+    ins AS (
+        INSERT INTO {vote} (post_id, user_id, value, created_at, updated_at)
+        SELECT i.post_id, %(user_id)s, i.value, now(), now()
+        FROM input i
+        JOIN locked l ON l.id = i.post_id
+        WHERE i.value <> 0
+          AND NOT EXISTS (SELECT 1 FROM del d WHERE d.post_id = i.post_id)
+        ORDER BY i.post_id
+        ON CONFLICT (post_id, user_id) DO UPDATE
+            SET value = EXCLUDED.value, updated_at = EXCLUDED.updated_at
+            WHERE {vote}.value <> EXCLUDED.value
+        RETURNING post_id, value, (xmax = 0) AS inserted
+    ),
+    change AS (
+        SELECT post_id, value AS old, 0 AS new FROM del
+        UNION ALL
+        SELECT post_id, CASE WHEN inserted THEN 0 ELSE -value END, value FROM ins
+    ),
+    upd AS (
+        UPDATE {post} p
+        SET score = p.score + c.new - c.old,
+            upvotes = p.upvotes + (c.new = 1)::int - (c.old = 1)::int,
+            downvotes = p.downvotes + (c.new = -1)::int - (c.old = -1)::int
+        FROM change c
+        WHERE p.id = c.post_id
+        RETURNING p.id, p.score
+    )
+    SELECT i.post_id, COALESCE(u.score, l.score), COALESCE(c.new, i.value), l.community_id
+    FROM input i
+    JOIN locked l ON l.id = i.post_id
+    LEFT JOIN change c ON c.post_id = i.post_id
+    LEFT JOIN upd u ON u.id = i.post_id
+    ORDER BY i.post_id
+""".format(post=Post._meta.db_table, vote=PostVote._meta.db_table)
+
+
+def cast_votes(user_id: int, votes, toggle: bool = False) -> dict:
+    """
+    Setzt Votes eines Users in einer Transaktion (Lock + ein Statement) und
+    passt score/upvotes/downvotes der Posts inkrementell an.
+
+    votes:  Iterable von (post_id, value) mit value in -1/0/1; bei doppelten
+            post_ids gilt der letzte Wert.
+    toggle: gleicher Wert wie der bestehende Vote hebt ihn auf (Klick-Verhalten
+            von POST /posts/{id}/vote/), sonst wird der Wert einfach gesetzt.
+
+    Gibt {post_id: (score, my_vote)} für alle existierenden Posts zurück;
+    nicht existierende post_ids fehlen im Ergebnis.
+    """
+    wanted = {}
+    for post_id, value in votes:
+        if value not in VOTE_VALUES:
+            raise ValueError(f"Ungültiger Vote-Wert: {value}")
+        wanted[int(post_id)] = int(value)
+    if not wanted:
+        return {}
+
+    post_ids = sorted(wanted)
+    params = {
+        "post_ids": post_ids,
+        "values": [wanted[pid] for pid in post_ids],
+        "user_id": user_id,
+        "toggle": toggle,
+    }
+    with transaction.atomic(), connection.cursor() as cur:
+        cur.execute(_LOCK_SQL, params)
+        cur.execute(_CAST_SQL, params)
+        rows = cur.fetchall()
+    # Scores in gecachten Post-Listen (forum.response_cache)
+    bump_versions({community_id for *_, community_id in rows})
+    return {post_id: (score, my_vote) for post_id, score, my_vote, _ in rows}